@@ -0,0 +1,83 @@
+"""Скорость копирования файлов разного размера разными примитивами ядра.
+
+Запуск из каталога file_manager:
+    python benchmarks/bench_copy.py --sizes 1K,1M,100M,1G,10G --dir /mnt/data
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import copy_engine
+
+
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def make_file(path, size):
+    block = os.urandom(min(size, 1024 * 1024))
+    with open(path, 'wb') as f:
+        written = 0
+        while written < size:
+            chunk = block[:size - written]
+            f.write(chunk)
+            written += len(chunk)
+
+
+def measure(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1K,1M,100M')
+    parser.add_argument('--dir', default=None, help="каталог на проверяемой файловой системе")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(dir=args.dir)
+    try:
+        print(f"{'размер':>8} {'способ':<26} {'время, с':>10} {'МБ/с':>10}")
+        for text in args.sizes.split(','):
+            size = parse_size(text)
+            src = os.path.join(base, 'src')
+            dst = os.path.join(base, 'dst')
+            make_file(src, size)
+
+            candidates = [('shutil.copyfile', lambda: shutil.copyfile(src, dst))]
+            for method in copy_engine.METHODS:
+                candidates.append((method, lambda m=method: copy_engine.copy_file(src, dst, methods=(m, 'buffered'))))
+            candidates.append(('auto', lambda: copy_engine.copy_file(src, dst)))
+
+            for name, func in candidates:
+                elapsed, used = measure(func, args.repeat)
+                label = name if used in (None, name) or name == 'shutil.copyfile' else f"{name}->{used}"
+                if name == 'auto':
+                    label = f"auto ({used})"
+                speed = size / elapsed / 1024 / 1024 if elapsed else float('inf')
+                print(f"{text:>8} {label:<26} {elapsed:10.4f} {speed:10.1f}")
+                os.remove(dst)
+            os.remove(src)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
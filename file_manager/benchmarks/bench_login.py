@@ -0,0 +1,80 @@
+"""Задержка и пропускная способность входа при 1/4/16 параллельных клиентах.
+
+Сравнивает PBKDF2 в вызывающем потоке с пулом процессов UserManager
+и вход по токену сессии. Запуск из каталога file_manager:
+    python benchmarks/bench_login.py --logins 32
+"""
+import os
+import sys
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.auth import UserManager, PBKDF2_ITERATIONS
+
+
+def inline_login(user_manager, username, password):
+    """Исходная схема: PBKDF2 на вызывающем потоке"""
+    user = user_manager.get_user(username)
+    key = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), bytes.fromhex(user['salt']),
+                              PBKDF2_ITERATIONS)
+    return key.hex() == user['key']
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(login, concurrency, total):
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        assert login()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    return total / elapsed, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=32, help="число входов на каждый прогон")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp()
+    try:
+        config = {'workspace': base, 'users': {'backend': 'sqlite'}, 'auth': {'workers': args.workers}}
+        user_manager = UserManager(config)
+        with redirect_stdout(open(os.devnull, 'w')):
+            user_manager.register('bench', 'secret')
+        token = user_manager.issue_token('bench')
+
+        modes = [
+            ('inline', lambda: inline_login(user_manager, 'bench', 'secret')),
+            ('pool', lambda: user_manager.verify_password('bench', 'secret')),
+            ('token', lambda: user_manager.verify_token(token) == 'bench'),
+        ]
+        print(f"{args.logins} входов на прогон, пул из {args.workers} процессов")
+        print(f"{'режим':<8} {'клиенты':>8} {'входов/с':>10} {'p50, мс':>10} {'p99, мс':>10}")
+        for name, login in modes:
+            for concurrency in (1, 4, 16):
+                rate, p50, p99 = run(login, concurrency, args.logins)
+                print(f"{name:<8} {concurrency:>8} {rate:10.1f} {p50:10.2f} {p99:10.2f}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Нагрузочный тест сетевого сервиса файлового менеджера.
+
+Поднимает FileService на локальном порту, открывает idle простаивающих
+сессий и active активных клиентов, каждый из которых выполняет серию
+команд. Печатает скорость открытия сессий и задержки команд p50/p99.
+Запуск из каталога file_manager:
+    python benchmarks/bench_service.py --idle 2000 --active 200 --commands 50
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.auth import UserManager
+from src.service import FileService
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def start_server(config, user_manager, workers):
+    """Запустить сервис в отдельном потоке со своим циклом событий"""
+    service = FileService(config, user_manager, workers)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    state = {}
+
+    def run():
+        asyncio.set_event_loop(loop)
+        server = loop.run_until_complete(service.start('127.0.0.1', 0, backlog=4096))
+        state['port'] = server.sockets[0].getsockname()[1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return service, state['port']
+
+
+async def open_session(port, token):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=1024 * 1024)
+    writer.write(f"TOKEN {token}\n".encode())
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    assert reply['ok'], reply
+    return reader, writer
+
+
+async def command(reader, writer, line):
+    writer.write(line.encode('utf-8') + b'\n')
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def active_client(port, token, index, commands, latencies):
+    reader, writer = await open_session(port, token)
+    await command(reader, writer, f"mkdir c{index}")
+    await command(reader, writer, f"cd c{index}")
+    for i in range(commands):
+        name = f"f{i // 4 % 10}.txt"
+        line = (f"write {name} данные {i}", "ls", f"read {name}", "pwd")[i % 4]
+        start = time.perf_counter()
+        reply = await command(reader, writer, line)
+        latencies.append(time.perf_counter() - start)
+        assert reply['ok'], reply
+    writer.close()
+
+
+async def run(port, token, args):
+    start = time.perf_counter()
+    idle = []
+    for batch in range(0, args.idle, 100):
+        idle += await asyncio.gather(*(open_session(port, token) for _ in range(min(100, args.idle - batch))))
+    elapsed = time.perf_counter() - start
+    print(f"Простаивающих сессий: {len(idle)}, открытие: {len(idle) / max(elapsed, 1e-9):.0f} сессий/с")
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(active_client(port, token, i, args.commands, latencies) for i in range(args.active)))
+    elapsed = time.perf_counter() - start
+    print(f"Активных клиентов: {args.active}, команд: {len(latencies)}, "
+          f"{len(latencies) / elapsed:.0f} команд/с")
+    print(f"Задержка команды: p50 {percentile(latencies, 50) * 1000:.2f} мс, "
+          f"p99 {percentile(latencies, 99) * 1000:.2f} мс")
+    for _, writer in idle:
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--idle', type=int, default=1000)
+    parser.add_argument('--active', type=int, default=100)
+    parser.add_argument('--commands', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=32)
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp()
+    try:
+        config = {'workspace': base, 'users': {'backend': 'sqlite'}, 'index_refresh_interval': 0,
+                  'quota': {'default': 1024 ** 3}}
+        user_manager = UserManager(config)
+        with redirect_stdout(open(os.devnull, 'w')):
+            user_manager.register('bench', 'secret')
+        token = user_manager.issue_token('bench')
+        _, port = start_server(config, user_manager, args.workers)
+        asyncio.run(run(port, token, args))
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
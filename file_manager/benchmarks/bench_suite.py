@@ -0,0 +1,315 @@
+"""Набор сценариев нагрузки на FileManager с задержками p50/p99.
+
+Создаёт синтетическую рабочую область (см. workspace_gen.py), затем
+для каждого сценария выполняет ops случайных шагов из взвешенной смеси
+команд напрямую через FileManager.execute, без сети. Для каждой
+команды считаются задержки p50/p99, для сценария - операции в секунду,
+байты чтения и записи (по статистике команд менеджера). Результат
+сохраняется в JSON вместе с коммитом, с которым делался прогон, и
+может быть сравнён с прошлым прогоном через --compare.
+
+Запуск из каталога file_manager:
+    python benchmarks/bench_suite.py --files 20000 --dir /dev/shm --out results/HEAD.json
+    python benchmarks/bench_suite.py --files 20000 --dir /dev/shm --compare results/base.json
+    python benchmarks/bench_suite.py --script my_mix.txt --mix my_mix
+
+Файл --script: строки "<вес> <шаблон>", пустые строки и # пропускаются.
+В шаблоне доступны {dir}, {subdir} (не корень), {leaf}
+(директория нижнего уровня), {file}, {text}, {name}, {word}, {n};
+команды шага через " ; " выполняются подряд с одними подстановками,
+@dirsize <dir> вызывает FileManager.get_directory_size напрямую.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import FileManager
+from src.capture import capture_output, ERROR_PREFIX
+
+import workspace_gen
+
+
+# Сценарий - взвешенная смесь шаблонов команд
+MIXES = {
+    'browse': [
+        (4, 'ls {dir}'),
+        (2, 'ls -l --sort size --limit 50 {dir}'),
+        (3, 'read {text}'),
+        (2, 'head {text} 20'),
+        (2, 'tail {text} 20'),
+        (1, 'range {file} 0 4096'),
+        (1, 'quota'),
+    ],
+    'search': [
+        (3, 'search *.log'),
+        (2, 'search {name}'),
+        (2, 'search *.bin {dir}'),
+        (3, 'find-text {word}'),
+        (1, 'find-text {word} {word}'),
+    ],
+    'size': [
+        (3, '@dirsize {dir}'),
+        (1, '@dirsize .'),
+        (1, 'ls -l {dir}'),
+    ],
+    'mutate': [
+        (3, 'copy {file} scratch/c{n} ; delete scratch/c{n}'),
+        (2, 'write scratch/w{n}.txt {word} ; delete scratch/w{n}.txt'),
+        (1, 'mkdir scratch/d{n} ; rmdir scratch/d{n}'),
+        (1, 'copy -r {leaf} scratch/t{n} ; delete -r scratch/t{n}'),
+    ],
+    'archive': [
+        (1, 'zip -r {leaf} scratch/a{n}.zip ; delete scratch/a{n}.zip'),
+    ],
+}
+
+# Шаги, вызывающие методы менеджера напрямую, в обход разбора команды
+DIRECT = {
+    '@dirsize': lambda manager, args: manager.get_directory_size(manager.process_path_args(args)),
+}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def load_script(path):
+    """Смесь из файла: строки "<вес> <шаблон>" """
+    mix = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            weight, _, template = line.partition(' ')
+            mix.append((float(weight), template.strip()))
+    if not mix:
+        raise ValueError(f"В сценарии нет шагов: {path}")
+    return mix
+
+
+class Placeholders:
+    """Случайные подстановки в шаблоны из описания рабочей области"""
+
+    def __init__(self, workspace, rng):
+        self.rng = rng
+        self.dirs = workspace['dirs']
+        self.files = [path for path, _, _ in workspace['files']]
+        self.subdirs = [path for path in self.dirs if path != '.'] or self.dirs
+        # Нижние директории с файлами: zip пустой директории - ошибка команды
+        used = {os.path.dirname(path) for path in self.files}
+        candidates = [path for path in self.subdirs if path in used] or self.subdirs
+        depth = max(path.count(os.sep) for path in candidates)
+        self.leaves = [path for path in candidates if path.count(os.sep) == depth]
+        self.texts = [path for path, _, text in workspace['files'] if text] or self.files
+        self.words = workspace['words']
+
+    def fill(self, template, n):
+        rng = self.rng
+        # Каждое вхождение {word} получает своё слово
+        while '{word}' in template:
+            template = template.replace('{word}', rng.choice(self.words), 1)
+        values = {'n': n}
+        if '{dir}' in template:
+            values['dir'] = rng.choice(self.dirs)
+        if '{subdir}' in template:
+            values['subdir'] = rng.choice(self.subdirs)
+        if '{leaf}' in template:
+            values['leaf'] = rng.choice(self.leaves)
+        if '{file}' in template:
+            values['file'] = rng.choice(self.files)
+        if '{text}' in template:
+            values['text'] = rng.choice(self.texts)
+        if '{name}' in template:
+            values['name'] = os.path.basename(rng.choice(self.files))
+        return template.format(**values)
+
+
+def run_step(manager, command):
+    """Выполнить одну команду, вернуть (имя, секунды, успешна ли)"""
+    name = command.split(' ', 1)[0]
+    start = time.perf_counter()
+    ok = True
+    with capture_output() as buffer:
+        try:
+            if name in DIRECT:
+                DIRECT[name](manager, manager.split_command(command)[1:])
+            else:
+                manager.execute(command)
+        except Exception as e:
+            print(f"{ERROR_PREFIX}: {e}")
+    elapsed = time.perf_counter() - start
+    if any(line.startswith(ERROR_PREFIX) for line in buffer.getvalue().splitlines()):
+        ok = False
+    return name, elapsed, ok
+
+
+def run_mix(manager, mix, placeholders, ops, rng):
+    """Выполнить ops шагов смеси, вернуть итог сценария"""
+    weights = [weight for weight, _ in mix]
+    templates = [template for _, template in mix]
+    latencies = {}
+    errors = {}
+    first_errors = []
+    manager.stats.reset()
+    start = time.perf_counter()
+    for n in range(ops):
+        step = placeholders.fill(rng.choices(templates, weights)[0], n)
+        for command in step.split(' ; '):
+            name, elapsed, ok = run_step(manager, command.strip())
+            latencies.setdefault(name, []).append(elapsed)
+            if not ok:
+                errors[name] = errors.get(name, 0) + 1
+                if len(first_errors) < 5:
+                    first_errors.append(command)
+    seconds = time.perf_counter() - start
+    io = manager.stats.snapshot()
+    commands = {}
+    for name, values in sorted(latencies.items()):
+        commands[name] = {
+            'count': len(values),
+            'errors': errors.get(name, 0),
+            'mean_ms': sum(values) / len(values) * 1000,
+            'p50_ms': percentile(values, 50) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'max_ms': max(values) * 1000,
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        'ops': total,
+        'seconds': seconds,
+        'ops_per_s': total / seconds if seconds else 0.0,
+        'bytes_read': sum(row['bytes_read'] for row in io.values()),
+        'bytes_written': sum(row['bytes_written'] for row in io.values()),
+        'errors': sum(errors.values()),
+        'first_errors': first_errors,
+        'commands': commands,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    for name, scenario in results['scenarios'].items():
+        print(f"\n{name}: {scenario['ops']} команд за {scenario['seconds']:.2f} с "
+              f"({scenario['ops_per_s']:.1f} оп/с), чтение {scenario['bytes_read'] / 1024 / 1024:.1f} MB, "
+              f"запись {scenario['bytes_written'] / 1024 / 1024:.1f} MB, ошибок {scenario['errors']}")
+        for command in scenario['first_errors']:
+            print(f"  ошибка: {command}")
+        print(f"  {'команда':<10} {'число':>7} {'p50, мс':>9} {'p99, мс':>9} {'max, мс':>9}")
+        for command, row in scenario['commands'].items():
+            print(f"  {command:<10} {row['count']:>7} {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f} {row['max_ms']:>9.3f}")
+
+
+def print_comparison(results, base):
+    """Изменение p50/p99 и оп/с относительно прошлого прогона"""
+    def change(new, old):
+        return f"{(new - old) * 100 / old:+7.1f}%" if old else "      -"
+
+    print(f"\nСравнение с {base.get('commit') or 'базой'} ({base.get('started', '')}):")
+    for name, scenario in results['scenarios'].items():
+        old = base.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        print(f"  {name:<10} оп/с {change(scenario['ops_per_s'], old['ops_per_s'])}")
+        for command, row in scenario['commands'].items():
+            old_row = old['commands'].get(command)
+            if old_row is not None:
+                print(f"    {command:<10} p50 {change(row['p50_ms'], old_row['p50_ms'])}  "
+                      f"p99 {change(row['p99_ms'], old_row['p99_ms'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    workspace_gen.add_arguments(parser)
+    parser.add_argument('--mix', action='append', help=f"сценарии ({', '.join(MIXES)}), по умолчанию все")
+    parser.add_argument('--script', help="файл со своей смесью команд (сценарий с именем --mix или script)")
+    parser.add_argument('--ops', type=int, default=200, help="шагов на сценарий")
+    parser.add_argument('--warmup', type=int, default=50, help="шагов прогрева перед замером")
+    parser.add_argument('--dir', default=None, help="каталог для рабочей области (tmpfs или диск)")
+    parser.add_argument('--out', default=None, help="файл результатов JSON")
+    parser.add_argument('--compare', default=None, help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    mixes = dict(MIXES)
+    if args.script:
+        name = (args.mix or ['script'])[0]
+        mixes = {name: load_script(args.script)}
+    names = args.mix or list(mixes)
+    unknown = [name for name in names if name not in mixes]
+    if unknown:
+        sys.exit(f"Неизвестные сценарии: {', '.join(unknown)}")
+
+    base = tempfile.mkdtemp(dir=args.dir)
+    try:
+        config = {
+            'workspace': os.path.join(base, 'ws'),
+            'index_refresh_interval': 0,
+            'quota': {'default': 1 << 50},
+            # Удалённое в сценариях сразу очищается, а не копится в корзине
+            'trash': {'retention': 0},
+        }
+        root = os.path.join(config['workspace'], 'bench')
+        start = time.perf_counter()
+        workspace = workspace_gen.generate_from_args(root, args)
+        print(f"Рабочая область: {len(workspace['files'])} файлов, {len(workspace['dirs'])} директорий, "
+              f"{workspace['total_bytes'] / 1024 / 1024:.1f} MB, дубликатов {workspace['duplicates']} "
+              f"({time.perf_counter() - start:.1f} с)")
+
+        with capture_output():
+            manager = FileManager(config, 'bench')
+        manager.size_index.reconcile()
+        os.makedirs(os.path.join(root, 'scratch'), exist_ok=True)
+        manager.track_change(os.path.join(root, 'scratch'))
+
+        results = {
+            'commit': git_commit(),
+            'started': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': vars(args),
+            'workspace': {key: workspace[key] for key in ('total_bytes', 'duplicates')}
+                         | {'files': len(workspace['files']), 'dirs': len(workspace['dirs'])},
+            'scenarios': {},
+        }
+        for name in names:
+            rng = random.Random(args.seed)
+            placeholders = Placeholders(workspace, rng)
+            if args.warmup:
+                run_mix(manager, mixes[name], placeholders, args.warmup, rng)
+            results['scenarios'][name] = run_mix(manager, mixes[name], placeholders, args.ops, rng)
+        with capture_output():
+            manager.close()
+
+        print_results(results)
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                print_comparison(results, json.load(f))
+        if args.out:
+            os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+            with open(args.out, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"\nРезультаты сохранены: {args.out}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Записанные байты и время: дельта-синхронизация против полной копии.
+
+Дерево из файлов одного размера копируется в зеркало, затем в 1%
+данных источника вносятся правки на месте, и зеркало обновляется
+двумя способами: полной перезаписью и sync (только изменённые блоки).
+
+Запуск из каталога file_manager:
+    python benchmarks/bench_sync.py --total 5G --file-size 256M --changes 0.01 --dir /mnt/data
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import bulk
+from src import copy_engine
+from src import delta_sync
+
+
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def make_tree(root, total, file_size):
+    os.makedirs(root)
+    paths = []
+    for i in range(max(total // file_size, 1)):
+        path = os.path.join(root, f"part{i:05}.bin")
+        with open(path, 'wb') as f:
+            written = 0
+            while written < file_size:
+                chunk = os.urandom(min(1024 * 1024, file_size - written))
+                f.write(chunk)
+                written += len(chunk)
+        paths.append(path)
+    return paths
+
+
+def mutate(paths, file_size, ratio, rng, write_size=4096):
+    """Правки на месте: ratio от объёма дерева кусками по write_size байт.
+
+    Возвращает изменённые файлы и число изменённых байт.
+    """
+    changes = max(int(len(paths) * file_size * ratio) // write_size, 1)
+    changed = set()
+    for _ in range(changes):
+        path = rng.choice(paths)
+        with open(path, 'r+b') as f:
+            f.seek(rng.randrange(0, max(file_size - write_size, 1)))
+            f.write(os.urandom(write_size))
+        changed.add(path)
+    # Правка в ту же наносекунду, что и копия, не должна выглядеть неизменённой
+    later = time.time_ns() + 10 ** 9
+    for path in changed:
+        os.utime(path, ns=(later, later))
+    return changed, changes * write_size
+
+
+def full_copy(pair):
+    os.makedirs(os.path.dirname(pair[1]), exist_ok=True)
+    copy_engine.copy_file(*pair)
+    shutil.copystat(*pair)
+    return os.path.getsize(pair[1])
+
+
+def delta_copy(pair):
+    return delta_sync.sync_file(*pair)[1]
+
+
+def run(name, func, src, dest, workers, total):
+    result = bulk.run_bulk(delta_sync.iter_pairs(src, dest), func, workers)
+    mb = result.bytes / (1024 * 1024)
+    speed = total / (1024 * 1024) / result.seconds if result.seconds else float('inf')
+    print(f"{name:<14} {mb:12.1f} {result.bytes * 100 / total:9.2f}% {result.seconds:9.2f} {speed:10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--total', default='256M', help="объём дерева (для замера из задачи - 5G)")
+    parser.add_argument('--file-size', default='32M')
+    parser.add_argument('--changes', type=float, default=0.01, help="доля изменённых байт")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--dir', default=None, help="каталог на проверяемой файловой системе")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    total = parse_size(args.total)
+    file_size = parse_size(args.file_size)
+    base = tempfile.mkdtemp(dir=args.dir)
+    try:
+        src = os.path.join(base, 'src')
+        paths = make_tree(src, total, file_size)
+        total = len(paths) * file_size
+        # Два одинаковых устаревших зеркала, затем правки в источнике
+        for mirror in ('full', 'delta'):
+            bulk.run_bulk(delta_sync.iter_pairs(src, os.path.join(base, mirror)), full_copy, args.workers)
+        changed, nbytes = mutate(paths, file_size, args.changes, random.Random(args.seed))
+        print(f"Дерево: {len(paths)} файлов по {file_size / 1024 / 1024:.0f} MB, "
+              f"{total / 1024 / 1024:.0f} MB; изменено {nbytes / 1024 / 1024:.1f} MB в {len(changed)} файлах")
+        print(f"{'способ':<14} {'записано, MB':>12} {'от объёма':>10} {'время, с':>9} {'МБ/с':>10}")
+        run('полная копия', full_copy, src, os.path.join(base, 'full'), args.workers, total)
+        run('sync', delta_copy, src, os.path.join(base, 'delta'), args.workers, total)
+        run('sync повторно', delta_copy, src, os.path.join(base, 'delta'), args.workers, total)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
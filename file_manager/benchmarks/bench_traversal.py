@@ -0,0 +1,102 @@
+"""Сравнение последовательного и параллельного обхода дерева.
+
+Запуск из каталога file_manager:
+    python benchmarks/bench_traversal.py --files 1000000 --workers 16
+"""
+import os
+import sys
+import time
+import shutil
+import fnmatch
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import traversal
+
+
+def make_tree(root, files, fanout, per_dir):
+    """Синтетическое дерево: files файлов по per_dir в директории"""
+    created = 0
+    level = [root]
+    while created < files:
+        next_level = []
+        for parent in level:
+            for i in range(fanout):
+                if created >= files:
+                    break
+                path = os.path.join(parent, f"d{i}")
+                os.makedirs(path, exist_ok=True)
+                next_level.append(path)
+                for j in range(min(per_dir, files - created)):
+                    with open(os.path.join(path, f"f{j}.txt" if j % 3 else f"f{j}.log"), 'wb') as f:
+                        f.write(b'x' * (j % 64))
+                    created += 1
+        level = next_level
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:8.3f} с")
+    return elapsed, result
+
+
+def serial_size(root):
+    total = 0
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            total += os.path.getsize(os.path.join(dirpath, name))
+    return total
+
+
+def serial_search(root, pattern):
+    return [os.path.join(dirpath, name)
+            for dirpath, _, files in os.walk(root)
+            for name in fnmatch.filter(files, pattern)]
+
+
+def parallel_search(root, pattern, workers):
+    return [os.path.join(dirpath, name)
+            for dirpath, _, files in traversal.walk(root, workers)
+            for name in fnmatch.filter(files, pattern)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=100000)
+    parser.add_argument('--fanout', type=int, default=10)
+    parser.add_argument('--per-dir', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=traversal.DEFAULT_WORKERS)
+    parser.add_argument('--dir', default=None, help="где создавать дерево (по умолчанию временный каталог)")
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(dir=args.dir)
+    try:
+        tree = os.path.join(base, 'tree')
+        print(f"Создание дерева из {args.files} файлов в {tree}...")
+        make_tree(tree, args.files, args.fanout, args.per_dir)
+
+        t1, size1 = timed("size: os.walk + getsize", lambda: serial_size(tree))
+        t2, size2 = timed(f"size: scan_tree ({args.workers} потоков)", lambda: traversal.tree_size(tree, args.workers))
+        assert size1 == size2
+        print(f"  ускорение: {t1 / t2:.2f}x")
+
+        t1, found1 = timed("search: os.walk + fnmatch", lambda: serial_search(tree, '*.log'))
+        t2, found2 = timed(f"search: walk ({args.workers} потоков)", lambda: parallel_search(tree, '*.log', args.workers))
+        assert sorted(found1) == sorted(found2)
+        print(f"  ускорение: {t1 / t2:.2f}x")
+
+        copy = os.path.join(base, 'copy')
+        shutil.copytree(tree, copy)
+        t1, _ = timed("rmdir: shutil.rmtree", lambda: shutil.rmtree(tree))
+        t2, _ = timed(f"rmdir: rmtree ({args.workers} потоков)", lambda: traversal.rmtree(copy, args.workers))
+        print(f"  ускорение: {t1 / t2:.2f}x")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Пропускная способность и пиковая память загрузки файлов.
+
+Для каждого размера файл загружается двумя способами: целиком в память
+и одной записью (как прежний write) и блоками через upload.Upload
+с фиксацией и атомарным rename. Каждый замер идёт в отдельном процессе,
+поэтому пиковый RSS (getrusage) относится только к нему: у блочной
+загрузки он не зависит от размера файла. С --resume загрузка
+прерывается на середине и продолжается с зафиксированного смещения.
+
+Запуск из каталога file_manager:
+    python benchmarks/bench_upload.py --sizes 1M,100M,1G,10G --dir /mnt/data --resume
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import upload
+
+
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def make_source(path, size):
+    block = os.urandom(1024 * 1024)
+    with open(path, 'wb') as f:
+        for offset in range(0, size, len(block)):
+            f.write(block[:size - offset])
+
+
+def peak_rss_mb():
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+class Interrupt(Exception):
+    pass
+
+
+def run_whole(src, dest, state_dir, chunk_size):
+    with open(src, 'rb') as f:
+        data = f.read()
+    with open(dest, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def run_chunked(src, dest, state_dir, chunk_size):
+    size = os.path.getsize(src)
+    transfer = upload.Upload(state_dir, dest, size)
+    with open(src, 'rb') as f:
+        transfer.write_stream(f, chunk_size)
+    transfer.commit()
+
+
+def run_resume(src, dest, state_dir, chunk_size):
+    """Прервать загрузку на середине, затем продолжить; вернуть смещение продолжения"""
+    size = os.path.getsize(src)
+    transfer = upload.Upload(state_dir, dest, size, commit_bytes=max(size // 8, chunk_size))
+
+    def progress(files, nbytes):
+        if transfer.offset >= size // 2:
+            raise Interrupt()
+
+    try:
+        with open(src, 'rb') as f:
+            transfer.write_stream(f, chunk_size, progress)
+    except Interrupt:
+        transfer.suspend()
+    transfer = upload.Upload(state_dir, dest, size)
+    resumed = transfer.offset
+    with open(src, 'rb') as f:
+        f.seek(resumed)
+        transfer.write_stream(f, chunk_size)
+    transfer.commit()
+    return resumed
+
+
+MODES = {'whole': run_whole, 'chunked': run_chunked, 'resume': run_resume}
+
+
+def child(args):
+    """Один замер в отдельном процессе, результат - JSON в stdout"""
+    start = time.perf_counter()
+    resumed = MODES[args.child](args.src, args.dest, args.state_dir, args.chunk)
+    seconds = time.perf_counter() - start
+    if os.path.getsize(args.dest) != os.path.getsize(args.src):
+        raise SystemExit("Размер результата не совпадает с источником")
+    print(json.dumps({'seconds': seconds, 'rss_mb': peak_rss_mb(), 'resumed': resumed}))
+
+
+def measure(mode, src, dest, state_dir, chunk_size):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', mode, '--src', src, '--dest', dest,
+         '--state-dir', state_dir, '--chunk', str(chunk_size)],
+        check=True, capture_output=True, text=True).stdout
+    os.remove(dest)
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1M,64M,256M', help="размеры файлов через запятую, до 10G")
+    parser.add_argument('--chunk', type=parse_size, default=upload.CHUNK_SIZE, help="размер блока")
+    parser.add_argument('--dir', default=None, help="каталог для файлов (по умолчанию временный)")
+    parser.add_argument('--resume', action='store_true', help="замер прерванной и продолженной загрузки")
+    parser.add_argument('--no-whole', action='store_true',
+                        help="пропустить загрузку целиком (для файлов больше памяти)")
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--src', help=argparse.SUPPRESS)
+    parser.add_argument('--dest', help=argparse.SUPPRESS)
+    parser.add_argument('--state-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    modes = ['whole', 'chunked'] if not args.no_whole else ['chunked']
+    if args.resume:
+        modes.append('resume')
+    base = tempfile.mkdtemp(prefix='bench_upload_', dir=args.dir)
+    try:
+        src = os.path.join(base, 'source.bin')
+        dest = os.path.join(base, 'dest.bin')
+        state_dir = os.path.join(base, 'uploads')
+        print(f"Блок {args.chunk / 1024 / 1024:.0f} MB, фиксация каждые "
+              f"{upload.COMMIT_BYTES / 1024 / 1024:.0f} MB")
+        print(f"{'размер':>8} {'способ':>8} {'время, с':>9} {'MB/s':>8} {'пик RSS, MB':>12}")
+        for text in args.sizes.split(','):
+            size = parse_size(text)
+            make_source(src, size)
+            for mode in modes:
+                result = measure(mode, src, dest, state_dir, args.chunk)
+                mb = size / 1024 / 1024
+                note = ""
+                if mode == 'resume':
+                    note = f"  продолжено с {result['resumed'] / 1024 / 1024:.0f} MB"
+                print(f"{text:>8} {mode:>8} {result['seconds']:9.2f} "
+                      f"{mb / result['seconds'] if result['seconds'] else 0:8.1f} "
+                      f"{result['rss_mb']:12.1f}{note}")
+            os.remove(src)
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
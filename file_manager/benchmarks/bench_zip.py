@@ -0,0 +1,87 @@
+"""Пропускная способность zip/unzip: последовательный zipfile против конвейера.
+
+Запуск из каталога file_manager:
+    python benchmarks/bench_zip.py --files 200 --size 1048576 --workers 8
+"""
+import os
+import sys
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import archive
+
+
+def make_files(root, count, size):
+    """Файлы с частично сжимаемым содержимым"""
+    os.makedirs(root)
+    for i in range(count):
+        with open(os.path.join(root, f"file{i}.dat"), 'wb') as f:
+            block = os.urandom(size // 4) + bytes(size - size // 4)
+            f.write(block)
+
+
+def serial_zip(entries, archive_path, method, level):
+    with zipfile.ZipFile(archive_path, 'w', method, compresslevel=level) as zipf:
+        for path, arcname in entries:
+            zipf.write(path, arcname)
+
+
+def serial_unzip(archive_path, target):
+    with zipfile.ZipFile(archive_path) as zipf:
+        zipf.extractall(target)
+
+
+def measure(func, total_bytes):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    return elapsed, total_bytes / elapsed / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=64)
+    parser.add_argument('--size', type=int, default=4 * 1024 * 1024)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--level', type=int, default=None)
+    parser.add_argument('--methods', default='stored,deflate,bzip2,lzma')
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp()
+    try:
+        src = os.path.join(base, 'src')
+        make_files(src, args.files, args.size)
+        entries = archive.collect_entries([src])
+        total = args.files * args.size
+        print(f"{args.files} файлов по {args.size} байт, {args.workers} потоков/процессов")
+        print(f"{'метод':<8} {'операция':<8} {'zipfile МБ/с':>14} {'конвейер МБ/с':>14} {'ускорение':>10}")
+
+        for name in args.methods.split(','):
+            method = archive.resolve_method(name)
+            serial_path = os.path.join(base, f"serial_{name}.zip")
+            parallel_path = os.path.join(base, f"parallel_{name}.zip")
+
+            t1, mb1 = measure(lambda: serial_zip(entries, serial_path, method, args.level), total)
+            t2, mb2 = measure(lambda: archive.create_archive(entries, parallel_path, method, args.level,
+                                                             args.workers), total)
+            print(f"{name:<8} {'zip':<8} {mb1:14.1f} {mb2:14.1f} {t1 / t2:9.2f}x")
+
+            t1, mb1 = measure(lambda: serial_unzip(serial_path, os.path.join(base, 'out1')), total)
+            t2, mb2 = measure(lambda: archive.extract_archive(parallel_path, os.path.join(base, 'out2'),
+                                                              args.workers), total)
+            print(f"{name:<8} {'unzip':<8} {mb1:14.1f} {mb2:14.1f} {t1 / t2:9.2f}x")
+            for path in (serial_path, parallel_path):
+                os.remove(path)
+            shutil.rmtree(os.path.join(base, 'out1'))
+            shutil.rmtree(os.path.join(base, 'out2'))
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Генератор синтетической рабочей области для бенчмарков.
+
+Дерево глубины depth с fanout поддиректориями на уровень, файлы
+распределены по всем директориям. Размеры берутся из распределения
+(fixed:4K, uniform:1K-1M, lognormal:16K[,sigma]), доля dup_ratio файлов
+повторяет содержимое ранее созданных, text_ratio файлов - текст из
+словаря (для find-text), остальные - случайные байты. При одном seed
+дерево получается одинаковым, поэтому прогоны сравнимы между коммитами.
+Для замеров без диска укажите каталог на tmpfs (например /dev/shm).
+
+Запуск из каталога file_manager:
+    python benchmarks/workspace_gen.py /dev/shm/ws --files 100000 --depth 4 --sizes lognormal:16K --dup-ratio 0.2
+"""
+import os
+import sys
+import math
+import random
+import argparse
+
+
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+TEXT_EXTENSIONS = ('.txt', '.log', '.md')
+BINARY_EXTENSIONS = ('.bin', '.dat')
+CORPUS_SIZE = 256 * 1024
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def size_sampler(spec, max_size=None):
+    """Функция rng -> размер файла по описанию распределения"""
+    kind, _, params = spec.partition(':')
+    if kind == 'fixed':
+        size = parse_size(params)
+        sample = lambda rng: size
+    elif kind == 'uniform':
+        low, _, high = params.partition('-')
+        low, high = parse_size(low), parse_size(high)
+        sample = lambda rng: rng.randint(low, high)
+    elif kind == 'lognormal':
+        median, _, sigma = params.partition(',')
+        mu = math.log(parse_size(median))
+        sigma = float(sigma or 1.5)
+        sample = lambda rng: int(rng.lognormvariate(mu, sigma))
+    else:
+        raise ValueError(f"Неизвестное распределение размеров: {spec}")
+    if max_size is None:
+        return sample
+    return lambda rng: min(sample(rng), max_size)
+
+
+def make_words(count, rng):
+    """Словарь псевдослов: частые короткие и редкие длинные"""
+    letters = 'абвгдеёжзийклмнопрстуфхцчшщыэюяabcdefghijklmnopqrstuvwxyz'
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def make_corpus(words, rng):
+    """Текстовый блок, из которого нарезается содержимое текстовых файлов"""
+    lines = []
+    size = 0
+    while size < CORPUS_SIZE:
+        line = ' '.join(rng.choices(words, k=rng.randint(4, 14))) + '\n'
+        lines.append(line)
+        size += len(line.encode())
+    return ''.join(lines).encode()
+
+
+def content(seed, size, text, corpus):
+    """Содержимое файла однозначно задаётся (seed, размер, тип)"""
+    rng = random.Random(seed)
+    if not text:
+        return rng.randbytes(size)
+    # Уникальная первая строка + срез корпуса с повтором до нужного размера
+    header = f"file {seed}\n".encode()
+    start = rng.randrange(len(corpus))
+    body = corpus[start:] + corpus * (size // len(corpus) + 1)
+    return (header + body)[:size]
+
+
+def make_dirs(root, depth, fanout):
+    """Создать дерево директорий, вернуть их относительные пути (с корнем '.')"""
+    dirs = ['.']
+    level = ['.']
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(fanout):
+                rel = os.path.normpath(os.path.join(parent, f"dir{i}"))
+                os.makedirs(os.path.join(root, rel), exist_ok=True)
+                next_level.append(rel)
+        dirs.extend(next_level)
+        level = next_level
+    return dirs
+
+
+def generate(root, files=1000, depth=3, fanout=4, sizes='lognormal:16K', max_size='64M',
+             dup_ratio=0.1, text_ratio=0.6, seed=1):
+    """Создать рабочую область в root и вернуть её описание.
+
+    Описание - словарь: dirs, files [(путь, размер, текст?)], words,
+    total_bytes, duplicates. Пути относительны root.
+    """
+    rng = random.Random(seed)
+    sample = size_sampler(sizes, parse_size(max_size) if max_size else None)
+    os.makedirs(root, exist_ok=True)
+    dirs = make_dirs(root, depth, fanout)
+    words = make_words(2000, rng)
+    corpus = make_corpus(words, rng)
+    created = []
+    originals = []  # (seed, размер, текст?) уникальных файлов
+    total = 0
+    duplicates = 0
+    for i in range(files):
+        if originals and rng.random() < dup_ratio:
+            file_seed, size, text = rng.choice(originals)
+            duplicates += 1
+        else:
+            file_seed, size, text = rng.getrandbits(32), sample(rng), rng.random() < text_ratio
+            originals.append((file_seed, size, text))
+        extension = rng.choice(TEXT_EXTENSIONS if text else BINARY_EXTENSIONS)
+        rel = os.path.normpath(os.path.join(rng.choice(dirs), f"file{i}{extension}"))
+        with open(os.path.join(root, rel), 'wb') as f:
+            f.write(content(file_seed, size, text, corpus))
+        created.append((rel, size, text))
+        total += size
+    return {
+        'dirs': dirs,
+        'files': created,
+        'words': words,
+        'total_bytes': total,
+        'duplicates': duplicates,
+    }
+
+
+def add_arguments(parser):
+    """Параметры генератора (общие с бенчмарком)"""
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=4)
+    parser.add_argument('--sizes', default='lognormal:16K',
+                        help="fixed:4K | uniform:1K-1M | lognormal:16K[,sigma]")
+    parser.add_argument('--max-size', default='64M', help="ограничение размера одного файла")
+    parser.add_argument('--dup-ratio', type=float, default=0.1, help="доля файлов-дубликатов")
+    parser.add_argument('--text-ratio', type=float, default=0.6, help="доля текстовых файлов")
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def generate_from_args(root, args):
+    return generate(root, args.files, args.depth, args.fanout, args.sizes, args.max_size,
+                    args.dup_ratio, args.text_ratio, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root', help="каталог рабочей области (создаётся)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if os.path.exists(args.root) and os.listdir(args.root):
+        sys.exit(f"Каталог не пуст: {args.root}")
+    workspace = generate_from_args(args.root, args)
+    print(f"Создано: {len(workspace['files'])} файлов в {len(workspace['dirs'])} директориях, "
+          f"{workspace['total_bytes'] / 1024 / 1024:.1f} MB, дубликатов {workspace['duplicates']}")
+
+
+if __name__ == '__main__':
+    main()
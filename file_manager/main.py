@@ -1,5 +1,8 @@
 import os
+import sys
 import json
+import argparse
+from contextlib import redirect_stdout
 from getpass import getpass
 from src.core import FileManager
 from src.auth import UserManager
@@ -12,10 +15,59 @@ def load_config():
         return json.load(f)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Файловый менеджер")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="выполнить команды из файла ('-' - из stdin) без интерактивного режима")
+    parser.add_argument('--user', help="имя пользователя для пакетного режима")
+    parser.add_argument('--stop-on-error', action='store_true',
+                        help="остановить пакет на первой ошибке")
+    parser.add_argument('--token', default=os.environ.get('FM_TOKEN'),
+                        help="токен сессии вместо пароля (или переменная FM_TOKEN)")
+    parser.add_argument('--issue-token', action='store_true',
+                        help="после входа вывести в stderr токен для следующих запусков")
+    return parser.parse_args()
+
+
+def run_batch(config, user_manager, args):
+    """Пакетный режим: один вход, затем команды из файла или stdin.
+
+    Результаты пишутся в stdout JSON-строками, служебные сообщения -
+    в stderr. Вход по токену сессии (--token) не требует PBKDF2, иначе
+    пароль берётся из переменной окружения FM_PASSWORD или запрашивается
+    один раз.
+    """
+    with redirect_stdout(sys.stderr):
+        if args.token:
+            username = user_manager.login_token(args.token)
+            if username is None:
+                return 2
+        else:
+            username = args.user or input("Имя пользователя: ")
+            password = os.environ.get('FM_PASSWORD')
+            if password is None:
+                password = getpass("Пароль: ")
+            if not user_manager.login(username, password):
+                return 2
+        if args.issue_token:
+            print(f"Токен: {user_manager.issue_token(username)}")
+        plan = user_manager.get_user(username).get('plan', 'default')
+        manager = FileManager(config, username, plan)
+
+    if args.batch == '-':
+        return manager.run_batch(sys.stdin, sys.stdout, args.stop_on_error)
+    with open(args.batch, 'r', encoding='utf-8') as script:
+        return manager.run_batch(script, sys.stdout, args.stop_on_error)
+
+
 def main():
+    args = parse_args()
     config = load_config()
     user_manager = UserManager(config)
 
+    if args.batch:
+        sys.exit(run_batch(config, user_manager, args))
+
     print("┌──────────────────────────────────────┐")
     print("│           ФАЙЛОВЫЙ МЕНЕДЖЕР          │")
     print("└──────────────────────────────────────┘")
@@ -28,7 +80,8 @@ def main():
             username = input("Имя пользователя: ")
             password = getpass("Пароль: ")
             if user_manager.login(username, password):
-                manager = FileManager(config, username)
+                plan = user_manager.get_user(username).get('plan', 'default')
+                manager = FileManager(config, username, plan)
                 manager.run()
         elif choice == '2':
             username = input("Новое имя пользователя: ")
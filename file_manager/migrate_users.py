@@ -0,0 +1,33 @@
+import os
+import sys
+import json
+import argparse
+from src.user_store import migrate_json
+
+
+def load_config():
+    """Загрузка конфигурации из файла"""
+    config_path = os.path.join('config', 'config.json')
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос пользователей из .users.json в SQLite")
+    parser.add_argument('--source', help="путь к .users.json (по умолчанию из config.json)")
+    parser.add_argument('--target', help="путь к базе .users.db (по умолчанию из config.json)")
+    args = parser.parse_args()
+
+    workspace = load_config()['workspace'] if not (args.source and args.target) else None
+    source = args.source or os.path.join(workspace, '.users.json')
+    target = args.target or os.path.join(workspace, '.users.db')
+    if not os.path.exists(source):
+        print(f"Файл не найден: {source}")
+        sys.exit(1)
+
+    added, total = migrate_json(source, target)
+    print(f"Перенесено пользователей: {added} из {total} (остальные уже были в {target})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+import json
+import asyncio
+import argparse
+from src.auth import UserManager
+from src.service import FileService
+
+
+def load_config():
+    """Загрузка конфигурации из файла"""
+    config_path = os.path.join('config', 'config.json')
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    config = load_config()
+    service_config = config.get('service', {})
+    parser = argparse.ArgumentParser(description="Сетевой сервис файлового менеджера")
+    parser.add_argument('--host', default=service_config.get('host', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=service_config.get('port', 8765))
+    parser.add_argument('--backlog', type=int, default=service_config.get('backlog', 1024))
+    args = parser.parse_args()
+
+    service = FileService(config, UserManager(config))
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port, args.backlog))
+    except KeyboardInterrupt:
+        print("\nСервис остановлен")
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+import os
+import bz2
+import sys
+import zlib
+import shutil
+import zipfile
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from . import stats
+from . import tiering
+
+
+CHUNK_SIZE = 1024 * 1024
+SMALL_FILE = 64 * 1024  # мелкие файлы сжимаются без передачи в пул
+
+METHODS = {
+    'stored': zipfile.ZIP_STORED,
+    'deflate': zipfile.ZIP_DEFLATED,
+    'bzip2': zipfile.ZIP_BZIP2,
+    'lzma': zipfile.ZIP_LZMA,
+}
+
+
+# Запись готовых сжатых данных (_write_raw_entry) опирается на внутренние
+# поля zipfile; проверена на этих версиях CPython. В остальных архив
+# пишется через zipf.write без пула процессов.
+RAW_WRITE_VERSIONS = ((3, 8), (3, 13))
+
+
+def raw_write_supported():
+    """Можно ли сжимать записи в пуле и дописывать готовые данные"""
+    low, high = RAW_WRITE_VERSIONS
+    return low <= sys.version_info[:2] <= high and \
+        hasattr(zipfile.ZipInfo, 'FileHeader') and hasattr(zipfile, 'LZMACompressor')
+
+
+def check_level(method, level):
+    """zipfile не передаёт уровень сжатия в lzma - не теряем его молча"""
+    if method == zipfile.ZIP_LZMA and level is not None:
+        raise ValueError("Для метода lzma уровень сжатия не задаётся")
+
+
+def resolve_method(name):
+    try:
+        return METHODS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный метод сжатия: {name}. Доступны: {', '.join(METHODS)}")
+
+
+def collect_entries(paths, base=None):
+    """Список (путь, имя в архиве) с рекурсивным обходом директорий.
+
+    Файлы кладутся в корень архива, директории - со своим именем и
+    относительной структурой, пустые директории сохраняются. С base
+    имена строятся относительно base (структура совпадений шаблона).
+    """
+    entries = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if not os.path.isdir(path):
+            arcname = os.path.relpath(path, base) if base else os.path.basename(path)
+            entries.append((path, arcname.replace(os.sep, '/')))
+            continue
+        parent = base or os.path.dirname(path)
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            entries.append((root, os.path.relpath(root, parent).replace(os.sep, '/') + '/'))
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                entries.append((full, os.path.relpath(full, parent).replace(os.sep, '/')))
+    return entries
+
+
+def _make_compressor(method, level):
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if level is None else level,
+                                zlib.DEFLATED, -15)
+    if method == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Compressor(9 if level is None else level)
+    if method == zipfile.ZIP_LZMA:
+        return zipfile.LZMACompressor()
+    return None
+
+
+def compress_entry(src, tmp_dir, method, level, chunk_size=CHUNK_SIZE):
+    """Сжать файл блоками во временный файл (выполняется в процессе пула).
+
+    Возвращает (путь к сжатым данным, CRC32, размер, сжатый размер).
+    """
+    compressor = _make_compressor(method, level)
+    crc = 0
+    file_size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    with tiering.open_read(src) as fin, os.fdopen(fd, 'wb') as fout:
+        while True:
+            chunk = fin.read(chunk_size)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            fout.write(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            fout.write(compressor.flush())
+        compress_size = fout.tell()
+    return tmp_path, crc, file_size, compress_size
+
+
+def _write_raw_entry(zipf, zinfo, data_path):
+    """Дописать в архив уже сжатые данные записи.
+
+    Повторяет то, что делает ZipFile.open(..., 'w') при закрытии записи,
+    но без повторного сжатия: заголовок пишется сразу с готовыми CRC
+    и размерами. Использует внутренние поля ZipFile, вызывается только
+    при raw_write_supported().
+    """
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    zinfo.flag_bits = 0
+    if zinfo.compress_type == zipfile.ZIP_LZMA:
+        zinfo.flag_bits |= 0x02  # в данных есть маркер конца потока
+    zipf.fp.seek(zipf.start_dir)
+    zinfo.header_offset = zipf.fp.tell()
+    zipf.fp.write(zinfo.FileHeader(zip64))
+    with open(data_path, 'rb') as f:
+        shutil.copyfileobj(f, zipf.fp, CHUNK_SIZE)
+    zipf.start_dir = zipf.fp.tell()
+    zipf.filelist.append(zinfo)
+    zipf.NameToInfo[zinfo.filename] = zinfo
+    zipf._didModify = True
+
+
+def create_archive(entries, archive_path, method=zipfile.ZIP_DEFLATED, level=None,
+                   workers=None, progress=None):
+    """Создать архив, сжимая записи параллельно в пуле процессов.
+
+    В работе одновременно не больше 2 * workers записей, поэтому
+    временные данные и память ограничены. Записи пишутся в архив
+    в исходном порядке. progress(файлы, байты) вызывается после записи
+    каждого файла.
+    """
+    check_level(method, level)
+    workers = workers or os.cpu_count() or 1
+    tmp_dir = tempfile.mkdtemp(prefix='.zip-', dir=os.path.dirname(os.path.abspath(archive_path)))
+    try:
+        _write_archive(entries, archive_path, method, level, workers, progress, tmp_dir)
+    except BaseException:
+        # Недописанный архив (ошибка или отмена задачи) не оставляем
+        try:
+            os.remove(archive_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _write_archive(entries, archive_path, method, level, workers, progress, tmp_dir):
+    with zipfile.ZipFile(archive_path, 'w', method, compresslevel=level) as zipf:
+        if method == zipfile.ZIP_STORED or not raw_write_supported():
+            # Без сжатия распараллеливать нечего - zipfile копирует блоками
+            for path, arcname in entries:
+                if not arcname.endswith('/') and tiering.is_cold(path):
+                    _write_cold_entry(zipf, path, arcname, tmp_dir)
+                else:
+                    zipf.write(path, arcname)
+                if progress and not arcname.endswith('/'):
+                    progress(1, os.path.getsize(path))
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            queue = deque(entries)
+
+            def write_next():
+                zinfo, result = pending.popleft()
+                data_path, crc, file_size, compress_size = result.result()
+                if not isinstance(result, _Done):
+                    # Сжатие шло в другом процессе - его чтение и запись считаем сами
+                    stats.add_io(stats.current_ops(), file_size, compress_size)
+                try:
+                    zinfo.CRC = crc
+                    zinfo.file_size = file_size
+                    zinfo.compress_size = compress_size
+                    _write_raw_entry(zipf, zinfo, data_path)
+                finally:
+                    os.remove(data_path)
+                if progress:
+                    progress(1, file_size)
+
+            while queue or pending:
+                while queue and len(pending) < 2 * workers:
+                    path, arcname = queue.popleft()
+                    if arcname.endswith('/'):
+                        # Директории пишем сразу, дождавшись предыдущих записей
+                        while pending:
+                            write_next()
+                        zipf.write(path, arcname)
+                        continue
+                    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                    zinfo.compress_type = method
+                    if zinfo.file_size < SMALL_FILE:
+                        result = compress_entry(path, tmp_dir, method, level)
+                        pending.append((zinfo, _Done(result)))
+                    else:
+                        pending.append((zinfo, pool.submit(compress_entry, path, tmp_dir, method, level)))
+                if pending:
+                    write_next()
+
+
+def _write_cold_entry(zipf, path, arcname, tmp_dir):
+    """Записать холодный файл: без сжатия - распаковывая на лету,
+    иначе через распакованную временную копию"""
+    if zipf.compression != zipfile.ZIP_STORED:
+        tmp_path = tiering.decompress_to(path, os.path.join(tmp_dir, 'cold'))
+        try:
+            zipf.write(tmp_path, arcname)
+        finally:
+            os.remove(tmp_path)
+        return
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    zinfo.compress_type = zipfile.ZIP_STORED
+    zinfo.file_size = tiering.logical_size(path)
+    zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT
+    with tiering.open_read(path) as src, zipf.open(zinfo, 'w', force_zip64=zip64) as dest:
+        shutil.copyfileobj(src, dest, CHUNK_SIZE)
+
+
+class _Done:
+    """Уже готовый результат с интерфейсом Future"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+def member_path(target_dir, name):
+    """Путь записи на диске с той же очисткой, что в ZipFile.extract"""
+    name = name.replace('/', os.sep)
+    if os.altsep:
+        name = name.replace(os.altsep, os.sep)
+    name = os.path.splitdrive(name)[1]
+    parts = [part for part in name.split(os.sep) if part not in ('', os.curdir, os.pardir)]
+    return os.path.normpath(os.path.join(target_dir, *parts))
+
+
+def extract_archive(archive_path, target_dir, workers=None, progress=None):
+    """Распаковать архив, извлекая записи параллельно в пуле потоков.
+
+    Каждый поток открывает архив своим дескриптором и пишет запись на
+    диск потоком через ZipFile.extract, который также очищает опасные
+    пути (абсолютные и с '..'). Возвращает список имён записей.
+    """
+    workers = workers or os.cpu_count() or 1
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+    ops = stats.current_ops()
+
+    def extract(info):
+        zipf = getattr(local, 'zipf', None)
+        if zipf is None:
+            zipf = local.zipf = zipfile.ZipFile(archive_path, 'r')
+            with handles_lock:
+                handles.append(zipf)
+        with stats.charge_io(ops):
+            zipf.extract(info, target_dir)
+        if progress:
+            progress(1, info.file_size)
+
+    with zipfile.ZipFile(archive_path, 'r') as zipf:
+        infos = zipf.infolist()
+    # Все директории - заранее: ZipFile.extract создаёт недостающие
+    # родительские директории без exist_ok, и потоки, распаковывающие
+    # соседние файлы, падали бы с FileExistsError. В архиве может не
+    # быть записей директорий, поэтому берём родителей каждой записи.
+    for info in infos:
+        path = member_path(target_dir, info.filename)
+        os.makedirs(path if info.is_dir() else os.path.dirname(path), exist_ok=True)
+    files = [info for info in infos if not info.is_dir()]
+    # Крупные записи первыми - лучше балансировка между потоками
+    files.sort(key=lambda info: info.file_size, reverse=True)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(extract, files))
+    finally:
+        for zipf in handles:
+            zipf.close()
+    return [info.filename for info in infos]
@@ -1,70 +1,144 @@
 import os
-import json
+import hmac
+import time
+import base64
 import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from .user_store import open_user_store
+
+
+PBKDF2_ITERATIONS = 100000
+
+
+def derive_key(password, salt, iterations=PBKDF2_ITERATIONS):
+    """PBKDF2-SHA256 (выполняется в процессе пула)"""
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+
+def valid_username(username):
+    """Имя пользователя - имя его домашней директории в рабочей области.
+
+    Служебные каталоги и файлы рядом с домашними (.blobs, .trash, .index,
+    .users.json) начинаются с точки, поэтому такие имена запрещены, как
+    и пути.
+    """
+    return bool(username) and not username.startswith('.') and \
+        not any(char in username for char in ('/', '\\', '\0'))
 
 
 class UserManager:
+    # Пул процессов для PBKDF2 общий для всех экземпляров
+    _executor = None
+    _executor_lock = threading.Lock()
+
     def __init__(self, config):
         self.config = config
-        self.users_file = os.path.join(config['workspace'], '.users.json')
-        self.load_users()
+        self.store = open_user_store(config)
+        auth_config = config.get('auth', {})
+        self.workers = auth_config.get('workers') or os.cpu_count() or 1
+        self.token_ttl = auth_config.get('token_ttl', 3600)
+        self.secret = self._load_secret()
 
-    def load_users(self):
-        if os.path.exists(self.users_file):
-            with open(self.users_file, 'r') as f:
-                self.users = json.load(f)
-        else:
-            self.users = {}
+    def _load_secret(self):
+        """Ключ подписи токенов сессий (создаётся при первом запуске)"""
+        path = os.path.join(self.config['workspace'], '.session_secret')
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            with open(path, 'rb') as f:
+                return f.read()
+        with os.fdopen(fd, 'wb') as f:
+            secret = os.urandom(32)
+            f.write(secret)
+        return secret
 
-    def save_users(self):
-        with open(self.users_file, 'w') as f:
-            json.dump(self.users, f)
+    def _derive(self, password, salt):
+        """Вычислить ключ в пуле процессов, не занимая вызывающий поток CPU"""
+        with UserManager._executor_lock:
+            if UserManager._executor is None:
+                UserManager._executor = ProcessPoolExecutor(max_workers=self.workers)
+            executor = UserManager._executor
+        return executor.submit(derive_key, password, salt).result()
 
-    def register(self, username, password, is_admin=False):
-        if username in self.users:
+    def get_user(self, username):
+        """Запись пользователя или None"""
+        return self.store.get(username)
+
+    def register(self, username, password, is_admin=False, plan='default'):
+        if not valid_username(username):
+            raise ValueError(f"Недопустимое имя пользователя: {username!r}")
+        if self.store.get(username) is not None:
             raise ValueError("Пользователь уже существует")
 
         salt = os.urandom(32)
-        key = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt,
-            100000
-        )
-
-        self.users[username] = {
+        key = self._derive(password, salt)
+
+        self.store.add(username, {
             'salt': salt.hex(),
             'key': key.hex(),
             'home': username,
-            'is_admin': is_admin
-        }
+            'is_admin': is_admin,
+            'plan': plan
+        })
 
         # Создаем домашнюю директорию
         home_dir = os.path.join(self.config['workspace'], username)
         os.makedirs(home_dir, exist_ok=True)
 
-        self.save_users()
         print("Пользователь успешно зарегистрирован")
 
-    def login(self, username, password):
-        if username not in self.users:
-            print("Пользователь не найден")
-            return False
-
-        user_data = self.users[username]
+    def verify_password(self, username, password):
+        """Проверка пароля без вывода сообщений: True, False или None (нет пользователя)"""
+        # Запись с недопустимым именем могла остаться от старых версий
+        user_data = self.store.get(username) if valid_username(username) else None
+        if user_data is None:
+            return None
         salt = bytes.fromhex(user_data['salt'])
         key = bytes.fromhex(user_data['key'])
+        return hmac.compare_digest(key, self._derive(password, salt))
 
-        new_key = hashlib.pbkdf2_hmac(
-            'sha256',
-            password.encode('utf-8'),
-            salt,
-            100000
-        )
+    def login(self, username, password):
+        verified = self.verify_password(username, password)
+        if verified is None:
+            print("Пользователь не найден")
+            return False
 
-        if key == new_key:
+        if verified:
             print("Авторизация успешна")
             return True
         else:
             print("Неверный пароль")
-            return False
\ No newline at end of file
+            return False
+
+    def issue_token(self, username, ttl=None):
+        """Подписанный токен сессии вида <данные>.<HMAC>, действует ttl секунд"""
+        expires = int(time.time()) + (self.token_ttl if ttl is None else ttl)
+        payload = f"{username}:{expires}:{os.urandom(8).hex()}".encode('utf-8')
+        encoded = base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+        signature = hmac.new(self.secret, encoded.encode('ascii'), hashlib.sha256).hexdigest()
+        return f"{encoded}.{signature}"
+
+    def verify_token(self, token):
+        """Имя пользователя из действующего токена или None"""
+        try:
+            encoded, signature = token.strip().rsplit('.', 1)
+            expected = hmac.new(self.secret, encoded.encode('ascii'), hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(expected, signature):
+                return None
+            payload = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode('utf-8')
+            username, expires, _ = payload.rsplit(':', 2)
+        except (ValueError, UnicodeError):
+            return None
+        if int(expires) < time.time() or not valid_username(username) or self.store.get(username) is None:
+            return None
+        return username
+
+    def login_token(self, token):
+        """Вход по токену сессии без вычисления PBKDF2"""
+        username = self.verify_token(token)
+        if username is None:
+            print("Токен недействителен или истёк")
+            return None
+        print("Авторизация по токену успешна")
+        return username
\ No newline at end of file
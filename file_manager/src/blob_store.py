@@ -0,0 +1,190 @@
+import os
+import stat
+import shutil
+import uuid
+import hashlib
+import tempfile
+import threading
+from . import copy_engine
+
+
+class BlobStore:
+    """Хранилище содержимого файлов по хешу с дедупликацией.
+
+    Содержимое хранится один раз в <workspace>/.blobs/<xx>/<sha256>, а
+    файлы пользователей являются жёсткими ссылками на блоб. Копирование
+    внутри хранилища становится созданием ссылки, число ссылок (st_nlink)
+    служит счётчиком, и блоб без пользовательских ссылок удаляется.
+    Квота по-прежнему начисляется каждому владельцу по размеру его файлов.
+
+    Ссылки на блоб делят один inode, а значит права, владельца и mtime.
+    Поэтому файл связывается только с блобом с теми же правами и
+    владельцем, иначе остаётся собственной копией.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, workspace_root):
+        """Получить общее хранилище для корня рабочих областей"""
+        root = os.path.abspath(os.path.join(workspace_root, '.blobs'))
+        with cls._instances_lock:
+            store = cls._instances.get(root)
+            if store is None:
+                store = cls(root)
+                cls._instances[root] = store
+            return store
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.RLock()
+        self.by_inode = {}
+        os.makedirs(root, exist_ok=True)
+        self.load()
+
+    def load(self):
+        """Построить карту inode -> блоб по содержимому хранилища"""
+        with self.lock:
+            self.by_inode = {}
+            for prefix in os.scandir(self.root):
+                if not prefix.is_dir(follow_symlinks=False):
+                    continue
+                for entry in os.scandir(prefix.path):
+                    if entry.is_file(follow_symlinks=False):
+                        self.by_inode[entry.inode()] = entry.path
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def hash_file(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def blob_for(self, path):
+        """Блоб, на который ссылается файл, или None"""
+        try:
+            st = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return None
+        with self.lock:
+            return self.by_inode.get(st.st_ino)
+
+    @staticmethod
+    def _owner_mode(st):
+        return stat.S_IMODE(st.st_mode), st.st_uid, st.st_gid
+
+    @staticmethod
+    def _replace_with_link(target, path):
+        """Атомарно заменить path жёсткой ссылкой на target"""
+        tmp_path = os.path.join(os.path.dirname(path), f".link-{uuid.uuid4().hex}")
+        os.link(target, tmp_path)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    def ingest(self, path):
+        """Перевести обычный файл в хранилище, вернуть путь блоба.
+
+        None - файл не обычный или блоб с тем же содержимым имеет
+        другие права или владельца.
+        """
+        if not os.path.isfile(path) or os.path.islink(path):
+            return None
+        blob = self.blob_for(path)
+        if blob is not None:
+            return blob
+        digest = self.hash_file(path)
+        blob = self.blob_path(digest)
+        with self.lock:
+            if os.path.exists(blob):
+                if self._owner_mode(os.stat(blob)) != self._owner_mode(os.stat(path)):
+                    return None
+                # Такое содержимое уже есть - файл становится ссылкой на него
+                self._replace_with_link(blob, path)
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.link(path, blob)
+            self.by_inode[os.stat(blob).st_ino] = blob
+        return blob
+
+    def ingest_tree(self, path):
+        for root, _, files in os.walk(path):
+            for name in files:
+                self.ingest(os.path.join(root, name))
+
+    def link_copy(self, src, dest):
+        """Копирование за O(1): dest становится ещё одной ссылкой на блоб.
+
+        Метаданные у ссылки те же, что у src (как после copy2), и на
+        общий inode они не копируются. Если src нельзя связать с блобом,
+        делается обычная копия.
+        """
+        if os.path.isdir(dest):
+            dest = os.path.join(dest, os.path.basename(src))
+        # Сравниваются пути: две копии одного содержимого - это один inode
+        if os.path.realpath(src) == os.path.realpath(dest):
+            raise shutil.SameFileError(f"{src} и {dest} - один и тот же файл")
+        blob = self.ingest(src)
+        if blob is None:
+            # Копия не должна писать в inode, общий с другими файлами
+            self.detach(dest)
+            return copy_engine.copy2(src, dest)
+        released = self.blob_for(dest)
+        self._replace_with_link(blob, dest)
+        if released is not None and released != blob:
+            self.release(released)
+        return dest
+
+    def detach(self, path, keep_content=False):
+        """Отвязать файл от блоба перед изменением на месте.
+
+        Без keep_content ссылка просто удаляется (содержимое будет
+        перезаписано), иначе файл заменяется собственной копией.
+        """
+        blob = self.blob_for(path)
+        if blob is None:
+            return
+        if keep_content:
+            fd, tmp_path = tempfile.mkstemp(prefix='.detach-', dir=os.path.dirname(path))
+            os.close(fd)
+            shutil.copy2(path, tmp_path)
+            os.replace(tmp_path, path)
+        else:
+            os.unlink(path)
+        self.release(blob)
+
+    def refcount(self, blob):
+        """Число пользовательских ссылок на блоб"""
+        try:
+            return os.stat(blob).st_nlink - 1
+        except OSError:
+            return 0
+
+    def release(self, blob):
+        """Удалить блоб, если на него больше нет ссылок"""
+        with self.lock:
+            try:
+                st = os.stat(blob)
+            except OSError:
+                return
+            if st.st_nlink <= 1:
+                os.unlink(blob)
+                self.by_inode.pop(st.st_ino, None)
+
+    def collect(self):
+        """Сборка мусора: удалить все блобы без ссылок, вернуть их число"""
+        removed = 0
+        with self.lock:
+            for blob in list(self.by_inode.values()):
+                if self.refcount(blob) <= 0:
+                    self.release(blob)
+                    removed += 1
+        return removed
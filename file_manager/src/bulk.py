@@ -0,0 +1,200 @@
+import os
+import glob
+import time
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from . import stats
+
+
+WILDCARDS = '*?['
+MAX_REPORTED_FAILURES = 10
+
+
+def has_wildcards(path):
+    return any(char in path for char in WILDCARDS)
+
+
+def pattern_base(pattern):
+    """Директория шаблона до первого компонента с подстановками.
+
+    Относительно неё сохраняется структура при копировании и в архиве.
+    """
+    parts = pattern.split(os.sep)
+    for i, part in enumerate(parts):
+        if has_wildcards(part):
+            return os.sep.join(parts[:i]) or os.sep
+    return os.path.dirname(pattern)
+
+
+def recursive_pattern(pattern):
+    """Шаблон для флага -r: имя ищется во всех поддиректориях базы,
+    у директории без подстановок берётся всё дерево"""
+    if '**' in pattern:
+        return pattern
+    if not has_wildcards(pattern) and os.path.isdir(pattern):
+        return os.path.join(pattern, '**')
+    head, tail = os.path.split(pattern)
+    return os.path.join(head, '**', tail)
+
+
+def _match_name(name, part):
+    if not has_wildcards(part):
+        return os.path.normcase(name) == os.path.normcase(part)
+    # Как в glob: подстановки не находят скрытые имена, если сам компонент не с точки
+    if name.startswith('.') and not part.startswith('.'):
+        return False
+    return fnmatch.fnmatch(name, part)
+
+
+def _match_parts(names, i, parts, j, is_dir):
+    while j < len(parts):
+        if parts[j] == '**':
+            # Любое число компонентов, кроме скрытых; последний ** без
+            # компонентов glob выдаёт только для директории
+            for k in range(i, len(names) + 1):
+                if k == len(names) and j == len(parts) - 1:
+                    return k > i or is_dir
+                if _match_parts(names, k, parts, j + 1, is_dir):
+                    return True
+                if k < len(names) and names[k].startswith('.'):
+                    return False
+            return False
+        if i == len(names) or not _match_name(names[i], parts[j]):
+            return False
+        i += 1
+        j += 1
+    return i == len(names)
+
+
+def match_pattern(path, pattern, is_dir=False):
+    """Выдал бы glob.iglob(pattern, recursive=True) этот путь"""
+    return _match_parts(os.path.normpath(path).split(os.sep), 0,
+                        os.path.normpath(pattern).split(os.sep), 0, is_dir)
+
+
+def iter_matches(patterns, recursive=False, files_only=True):
+    """Потоково выдавать (путь, база шаблона) для каждого совпадения.
+
+    Шаблоны раскрываются через glob.iglob, поэтому список совпадений
+    целиком в памяти не собирается. Путь без подстановок выдаётся как
+    есть, даже если его нет (ошибка попадёт в итог операции). Путь,
+    подходящий к нескольким шаблонам, выдаётся один раз; повторы внутри
+    одного шаблона (glob выдаёт их, например, для "**/**") не убираются.
+    """
+    expanded = []
+    for pattern in patterns:
+        base = None
+        if recursive:
+            if not has_wildcards(pattern) and os.path.isdir(pattern):
+                # Дерево директории сохраняется вместе с её именем
+                base = os.path.dirname(pattern)
+            pattern = recursive_pattern(pattern)
+        expanded.append((pattern, base))
+    for index, (pattern, base) in enumerate(expanded):
+        if not has_wildcards(pattern):
+            paths = [] if files_only and os.path.isdir(pattern) else [pattern]
+            base = os.path.dirname(pattern)
+        else:
+            paths = glob.iglob(pattern, recursive=True)
+            if base is None:
+                base = pattern_base(pattern)
+        earlier = [previous for previous, _ in expanded[:index]]
+        for path in paths:
+            is_dir = os.path.isdir(path)
+            if files_only and is_dir:
+                continue
+            # Пересекающиеся шаблоны не должны обработать файл дважды: путь,
+            # подходящий к предыдущему шаблону, уже выдан (память не растёт
+            # с числом совпадений)
+            matched = [previous for previous in earlier if match_pattern(path, previous, is_dir)]
+            if matched and not is_dir and not os.path.lexists(path):
+                # Несуществующий путь (его выдаёт и glob для "нет/**") шаблоны
+                # с подстановками выдать не могли
+                matched = [previous for previous in matched if not has_wildcards(previous)]
+            if matched:
+                continue
+            yield path, base
+
+
+def run_bulk(items, func, workers=8, progress=None):
+    """Выполнить func(item) для каждого элемента на ограниченном пуле.
+
+    В работе одновременно не больше 2 * workers элементов, поэтому
+    итератор items читается по мере выполнения. func возвращает число
+    обработанных байт. Возвращает BulkResult; progress(файлы, байты)
+    вызывается после каждого успешного элемента.
+    """
+    result = BulkResult()
+    workers = max(int(workers or 1), 1)
+    items = iter(items)
+    ops = stats.current_ops()
+
+    def counted(item):
+        with stats.charge_io(ops):
+            return func(item)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        exhausted = False
+        while not exhausted or pending:
+            while not exhausted and len(pending) < 2 * workers:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(counted, item)] = item
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    nbytes = future.result()
+                except Exception as e:
+                    result.fail(item, e)
+                    continue
+                result.files += 1
+                result.bytes += nbytes or 0
+                if progress:
+                    progress(1, nbytes or 0)
+    result.seconds = time.perf_counter() - start
+    # Элементы выполнялись в потоках пула - засчитываем их команде здесь
+    stats.touch(result.files)
+    return result
+
+
+class BulkResult:
+    """Итог групповой операции: файлы, байты, ошибки, время"""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self.failures = []
+        self.seconds = 0.0
+
+    def fail(self, item, error):
+        self.failed += 1
+        if len(self.failures) < MAX_REPORTED_FAILURES:
+            path = item[0] if isinstance(item, tuple) else item
+            self.failures.append((path, error))
+
+    def report(self, action):
+        """Вывести итог одной строкой и первые ошибки"""
+        mb = self.bytes / (1024 * 1024)
+        speed = mb / self.seconds if self.seconds > 0 else 0.0
+        print(f"{action}: {self.files} файлов, {mb:.1f} MB за {self.seconds:.2f} с "
+              f"({speed:.1f} MB/s), ошибок: {self.failed}")
+        self.report_failures()
+
+    def report_failures(self, message="не обработано файлов", base=None):
+        """Вывести число ошибок и первые из них (пути относительно base)"""
+        if not self.failed:
+            return
+        print(f"Ошибка: {message}: {self.failed}")
+        for path, error in self.failures:
+            print(f"  - {os.path.relpath(path, base) if base else path}: {error}")
+        if self.failed > len(self.failures):
+            print(f"  ... и ещё {self.failed - len(self.failures)}")
@@ -0,0 +1,86 @@
+import io
+import sys
+import threading
+from contextlib import contextmanager
+
+
+# Операции сообщают о сбоях строкой, начинающейся с этого слова
+ERROR_PREFIX = 'Ошибка'
+
+
+class _ThreadLocalStdout:
+    """Подмена sys.stdout, направляющая вывод потока в его буфер.
+
+    Операции менеджера пишут результат через print, поэтому перехват
+    должен работать отдельно для каждого потока: contextlib.redirect_stdout
+    меняет sys.stdout глобально и не подходит для параллельных сессий.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def _target(self):
+        buffer = getattr(self.local, 'buffer', None)
+        return self.default if buffer is None else buffer
+
+    def write(self, text):
+        errors = getattr(self.local, 'errors', None)
+        if errors is not None and text.startswith(ERROR_PREFIX):
+            errors.count += 1
+        return self._target().write(text)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.default, name)
+
+
+_install_lock = threading.Lock()
+
+
+def _proxy():
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadLocalStdout):
+            sys.stdout = _ThreadLocalStdout(sys.stdout)
+        return sys.stdout
+
+
+def real_stdout():
+    """Исходный stdout процесса (в обход перехвата)"""
+    stdout = sys.stdout
+    return stdout.default if isinstance(stdout, _ThreadLocalStdout) else stdout
+
+
+@contextmanager
+def capture_output(buffer=None):
+    """Перехватить вывод текущего потока в буфер (по умолчанию StringIO)"""
+    proxy = _proxy()
+    buffer = io.StringIO() if buffer is None else buffer
+    previous = getattr(proxy.local, 'buffer', None)
+    proxy.local.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        proxy.local.buffer = previous
+
+
+class _ErrorCounter:
+    def __init__(self):
+        self.count = 0
+
+
+@contextmanager
+def watch_errors():
+    """Считать строки об ошибках, выведенные текущим потоком"""
+    proxy = _proxy()
+    counter = _ErrorCounter()
+    previous = getattr(proxy.local, 'errors', None)
+    proxy.local.errors = counter
+    try:
+        yield counter
+    finally:
+        proxy.local.errors = previous
+        if previous is not None:
+            previous.count += counter.count
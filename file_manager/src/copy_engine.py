@@ -0,0 +1,148 @@
+import os
+import errno
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # не Linux/Unix
+    fcntl = None
+
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) из linux/fs.h
+CHUNK_SIZE = 8 * 1024 * 1024
+METHODS = ('reflink', 'copy_file_range', 'sendfile', 'buffered')
+
+# Ошибки, означающие "примитив не поддерживается здесь" - пробуем следующий
+_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EINVAL,
+                errno.ENOSYS, errno.ENOTTY, errno.EBADF, errno.EPERM}
+
+
+def _reflink(src_fd, dst_fd, size, progress):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+    if progress:
+        progress(size, size)
+    return True
+
+
+def _kernel_copy(copy_chunk, size, progress):
+    """Цикл копирования примитивом ядра.
+
+    False, если примитив не поддерживается или скопировал меньше size
+    (файл укоротился во время копирования) - тогда копируем заново
+    следующим способом.
+    """
+    copied = 0
+    while copied < size:
+        try:
+            sent = copy_chunk(copied, min(CHUNK_SIZE, size - copied))
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED:
+                return False
+            raise
+        if sent == 0:
+            return False
+        copied += sent
+        if progress:
+            progress(copied, size)
+    return True
+
+
+def _copy_file_range(src_fd, dst_fd, size, progress):
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    return _kernel_copy(lambda offset, count: os.copy_file_range(src_fd, dst_fd, count, offset, offset),
+                        size, progress)
+
+
+def _sendfile(src_fd, dst_fd, size, progress):
+    if not hasattr(os, 'sendfile'):
+        return False
+    return _kernel_copy(lambda offset, count: os.sendfile(dst_fd, src_fd, offset, count), size, progress)
+
+
+def _buffered(src_fd, dst_fd, size, progress):
+    buffer = bytearray(min(CHUNK_SIZE, max(size, 1)))
+    view = memoryview(buffer)
+    copied = 0
+    with open(src_fd, 'rb', buffering=0, closefd=False) as fin, \
+            open(dst_fd, 'wb', buffering=0, closefd=False) as fout:
+        while True:
+            n = fin.readinto(buffer)
+            if not n:
+                break
+            fout.write(view[:n])
+            copied += n
+            if progress:
+                progress(copied, size)
+    return True
+
+
+_STRATEGIES = {
+    'reflink': _reflink,
+    'copy_file_range': _copy_file_range,
+    'sendfile': _sendfile,
+    'buffered': _buffered,
+}
+
+
+def check_distinct(src, dst):
+    """Ошибка SameFileError, если dst - тот же файл, что и src"""
+    try:
+        same = os.path.samefile(src, dst)
+    except OSError:  # dst ещё нет
+        return
+    if same:
+        raise shutil.SameFileError(f"{src} и {dst} - один и тот же файл")
+
+
+def copy_file(src, dst, progress=None, methods=METHODS):
+    """Скопировать содержимое файла самым дешёвым доступным способом.
+
+    Порядок: клон reflink (FICLONE), copy_file_range, sendfile, буферное
+    копирование. progress(скопировано, всего) вызывается по мере работы.
+    Возвращает название использованного способа.
+    """
+    # Открытие dst на запись обрезало бы сам исходный файл
+    check_distinct(src, dst)
+    with open(src, 'rb') as fsrc:
+        size = os.fstat(fsrc.fileno()).st_size
+        try:
+            with open(dst, 'wb') as fdst:
+                for method in methods:
+                    if _STRATEGIES[method](fsrc.fileno(), fdst.fileno(), size, progress):
+                        return method
+                    # Частично скопированное отбрасываем и начинаем заново с начала
+                    # (sendfile сдвигает позицию в dst)
+                    fdst.truncate(0)
+                    os.lseek(fsrc.fileno(), 0, os.SEEK_SET)
+                    os.lseek(fdst.fileno(), 0, os.SEEK_SET)
+        except BaseException:
+            # Прерванная копия (ошибка или отмена задачи) не остаётся на диске
+            try:
+                os.remove(dst)
+            except OSError:
+                pass
+            raise
+    raise OSError(f"Не удалось скопировать {src}")
+
+
+def copy2(src, dst, progress=None):
+    """Аналог shutil.copy2 на быстром копировании, возвращает путь копии"""
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    copy_file(src, dst, progress)
+    shutil.copystat(src, dst)
+    return dst
+
+
+def move(src, dst, progress=None):
+    """Перемещение: в пределах файловой системы - только rename,
+    между устройствами - быстрое копирование и удаление исходника"""
+    return shutil.move(src, dst, copy_function=lambda s, d: copy2(s, d, progress))
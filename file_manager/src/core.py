@@ -1,47 +1,187 @@
 import os
-import shutil
+import sys
+import json
+import errno
+import time
+import threading
+import cProfile
+import pstats
 from .file_ops import FileOperations
 from .dir_ops import DirectoryOperations
+from .workspace_index import WorkspaceIndex
+from .quota import QuotaManager
+from .name_index import NameIndex
+from .text_index import TextIndex
+from . import traversal
+from .blob_store import BlobStore
+from .meta_cache import MetaCache
+from .capture import capture_output
+from .jobs import JobQueue
+from .trash import Trash
+from .bulk import has_wildcards
+from .hashing import DigestCache
+from .stats import Stats
+from .tiering import Tiering
+from . import tiering
+from . import stats
+from . import upload
+
+
+# Команды, которые только читают: их фоновые задачи не блокируют друг друга
+READ_ONLY_COMMANDS = {'ls', 'pwd', 'read', 'head', 'tail', 'range', 'search', 'find-text',
+                      'quota', 'cache', 'verify', 'stats'}
+
+# Какие аргументы фоновой задачи - пути для блокировки: срез позиционных
+# аргументов и опции со значением, которые не считаются позиционными.
+# Команды без записи здесь блокируют текущую директорию.
+JOB_PATH_ARGS = {
+    'ls': (slice(None), {'--sort', '--limit', '--offset'}),
+    'mkdir': (slice(None), ()),
+    'rmdir': (slice(None), ()),
+    'create': (slice(None), ()),
+    'read': (slice(None), ()),
+    'head': (slice(0, 1), ()),
+    'tail': (slice(0, 1), ()),
+    'range': (slice(0, 1), ()),
+    'write': (slice(0, 1), ()),
+    'delete': (slice(None), ()),
+    'copy': (slice(None), ()),
+    'move': (slice(None), ()),
+    'rename': (slice(None), ()),
+    'zip': (slice(None), {'-m', '-l'}),
+    'unzip': (slice(None), ()),
+    'search': (slice(1, None), ()),
+    'hash': (slice(None), {'--algo'}),
+    'verify': (slice(None), ()),
+    'sync': (slice(None), ()),
+    'upload': (slice(None), ()),
+    'restore': (slice(1, None), ()),
+}
 
 
 class FileManager:
-    def __init__(self, config, username):
+    def __init__(self, config, username, plan='default'):
         self.username = username
         self.workspace = os.path.abspath(os.path.join(config['workspace'], username))
         os.makedirs(self.workspace, exist_ok=True)
+        # Фоновая задача работает со своей текущей директорией
+        self._local = threading.local()
         self.current_dir = self.workspace
+        # Запрет путей вне рабочей области (включается сетевым сервисом)
+        self.confined = False
+        # Служебные индексы пользователя хранятся рядом с .users.json
+        self.index_dir = os.path.join(config['workspace'], '.index', username)
+        # Незавершённые загрузки (upload) - до продолжения, отмены или истечения срока
+        self.upload_dir = os.path.join(self.index_dir, 'uploads')
+        upload.expire(self.upload_dir, config.get('uploads', {}).get('expire_hours', 24) * 3600)
+        self.workers = config.get('workers', traversal.DEFAULT_WORKERS)
+        self.size_index = WorkspaceIndex.open(self.workspace, os.path.join(self.index_dir, 'sizes.json'),
+                                              self.workers)
+        self.name_index = NameIndex.open(self.size_index)
+        self.text_index = TextIndex.open(self.size_index, os.path.join(self.index_dir, 'text.json'))
+        self.digest_cache = DigestCache.open(self.size_index, os.path.join(self.index_dir, 'digests.json'))
+        self.size_index.start_refresh(config.get('index_refresh_interval', 30))
+        cache_settings = config.get('meta_cache', {})
+        self.meta_cache = MetaCache.open(config['workspace'],
+                                         cache_settings.get('max_mb', 64) * 1024 * 1024,
+                                         cache_settings.get('inotify', True))
         self.file_ops = FileOperations(self)
         self.dir_ops = DirectoryOperations(self)
-        self.quota = config.get('quota', {}).get('default', 1024 * 1024 * 100)  # 100MB по умолчанию
+        quotas = config.get('quota', {})
+        self.quota = quotas.get(plan, quotas.get('default', 1024 * 1024 * 100))  # 100MB по умолчанию
+        self.quota_manager = QuotaManager.open(self.size_index, self.quota)
+        self.archive_settings = config.get('archive', {})
+        # Режим хранения: plain - обычные файлы, dedup - ссылки на блобы
+        storage_mode = config.get('storage', {}).get('mode', 'plain')
+        self.blob_store = BlobStore.open(config['workspace']) if storage_mode == 'dedup' else None
+        # Корзина пользователя рядом с рабочей областью (та же файловая система)
+        trash_settings = config.get('trash', {})
+        self.trash = Trash.open(os.path.join(config['workspace'], '.trash', username),
+                                trash_settings.get('retention', 300),
+                                trash_settings.get('batch', 1000),
+                                trash_settings.get('pause_ms', 10) / 1000,
+                                self.blob_store.collect if self.blob_store is not None else None)
+        self.quota_manager.trash = self.trash
+        # Холодное хранилище: фоновое сжатие давно не читавшихся файлов
+        tier_settings = config.get('tiering', {})
+        self.tiering = Tiering.open(self.workspace, tier_settings, self._tier_changed) \
+            if tier_settings.get('enabled') else None
+        self.jobs = JobQueue(self.execute, config.get('jobs', {}).get('workers', 2))
+        # Задержки и ввод-вывод команд, общие для всех сессий процесса
+        stats_enabled = config.get('stats', {}).get('enabled', True)
+        self.stats = Stats.open(config['workspace']) if stats_enabled else None
         self.setup_commands()
 
+    @property
+    def current_dir(self):
+        return getattr(self._local, 'current_dir', None) or self._current_dir
+
+    @current_dir.setter
+    def current_dir(self, path):
+        if getattr(self._local, 'current_dir', None) is not None:
+            self._local.current_dir = path
+        else:
+            self._current_dir = path
+
     def show_help(self):
         """Показать справку по командам"""
         print("\nДоступные команды:")
         print("  help - показать эту справку")
         print("  exit - выход из программы")
         print("  cd <dir> - перейти в директорию")
-        print("  ls - список файлов и папок")
+        print("  ls [-l] [--sort name|size|mtime|none] [-r] [--limit N] [--offset M] [dir] - список файлов и папок")
         print("  pwd - текущий путь")
         print("  mkdir <name> - создать директорию")
         print("  rmdir <name> - удалить директорию")
         print("  create <file> - создать файл")
         print("  read <file> - прочитать файл")
+        print("  head <file> [n] - первые n строк файла")
+        print("  tail <file> [n] - последние n строк файла")
+        print("  range <file> <offset> <len> [--mmap] - прочитать диапазон байтов")
         print("  write <file> <content> - записать в файл")
-        print("  delete <file> - удалить файл")
-        print("  copy <src> <dest> - копировать файл")
-        print("  move <src> <dest> - переместить файл")
+        print("  delete [-r] <file|шаблон...> - удалить файл(ы)")
+        print("  copy [-r] <src|шаблон...> <dest> - копировать файл(ы), например copy **/*.log logs/")
+        print("  move [-r] <src|шаблон...> <dest> - переместить файл(ы)")
         print("  rename <old> <new> - переименовать файл")
-        print("  zip <files> <archive> - создать архив")
+        print("  zip [-m stored|deflate|bzip2|lzma] [-l level] [-r] <files|шаблоны> <archive> - создать архив")
         print("  unzip <archive> - распаковать архив")
         print("  quota - показать квоту диска")
         print("  search <pattern> - поиск файлов")
+        print("  find-text <query> - поиск по содержимому файлов")
+        print("  cache [clear] - статистика кэша метаданных")
+        print("  stats [reset|dump <file>] - задержки и ввод-вывод команд")
+        print("  profile [--out file.prof] <команда> - выполнить команду под cProfile")
+        print("  hash [--algo sha256|blake2b] [-r] [--out manifest] <path|шаблон...> - контрольные суммы")
+        print("  verify [--no-cache] <manifest> - проверить файлы по манифесту")
+        print("  sync [--dry-run] <src> <dest> - дельта-синхронизация файла или директории")
+        print("  upload [<файл> <dest>] - загрузка блоками с продолжением после сбоя (без аргументов - незавершённые)")
+        print("  upload --abort <dest> - отменить незавершённую загрузку")
+        print("  trash - содержимое корзины")
+        print("  restore <id|путь> [dest] - восстановить из корзины")
+        print("  purge [id|путь|all] - очистить корзину сейчас")
+        print("  <команда> & - выполнить команду в фоне (кроме write)")
+        print("  jobs - список фоновых задач")
+        print("  wait <id> - дождаться задачи и показать её вывод")
+        print("  cancel <id> - отменить задачу")
 
     def exit(self):
         """Выход из программы"""
         print("\nЗавершение работы файлового менеджера...")
+        self.close()
         raise SystemExit
 
+    def close(self):
+        """Сохранить индексы и освободить ресурсы сессии"""
+        active = self.jobs.active()
+        if active:
+            print(f"Ожидание фоновых задач: {len(active)}")
+        self.jobs.shutdown()
+        self.size_index.close()
+        self.text_index.close()
+        self.digest_cache.close()
+        if self.blob_store is not None:
+            self.blob_store.collect()
+
     def process_path_args(self, args):
         """Объединяет аргументы пути и возвращает нормализованный путь"""
         if not args:
@@ -60,10 +200,10 @@ class FileManager:
 
         # Проверяем абсолютный путь
         if os.path.isabs(path):
-            return path
+            return self.confine(path)
 
         # Для относительных путей добавляем текущую директорию
-        return os.path.join(self.current_dir, path)
+        return self.confine(os.path.join(self.current_dir, path))
 
     def get_prompt(self):
         """Генерация приглашения командной строки"""
@@ -89,53 +229,520 @@ class FileManager:
         # Нормализация пути
         try:
             path = os.path.normpath(path)
-            if os.path.isabs(path):
-                return path
-            return os.path.join(self.current_dir, path)
+            if not os.path.isabs(path):
+                path = os.path.join(self.current_dir, path)
         except Exception as e:
             raise ValueError(f"Некорректный путь: {str(e)}")
+        return self.confine(path)
+
+    def confine(self, path):
+        """Проверить, что путь не выходит из рабочей области (если включено)"""
+        if self.confined and not self.in_workspace(path):
+            raise ValueError(f"Доступ запрещён: путь вне рабочей области: {path}")
+        return path
 
     def print_working_dir(self):
         """Показать текущую директорию"""
         print(f"Текущая директория: {self.current_dir}")
 
+    def show_cache(self):
+        """Показать статистику кэша метаданных"""
+        stats = self.meta_cache.stats()
+        print(f"Кэш метаданных ({stats['mode']}): {stats['dirs']} директорий, "
+              f"{stats['bytes'] / 1024:.1f} KB из {stats['max_bytes'] / 1024:.1f} KB")
+        print(f"Попадания: {stats['hits']}, промахи: {stats['misses']} ({stats['hit_rate']:.1%})")
+        print(f"Вытеснения: {stats['evictions']}, сбросы: {stats['invalidations']}, "
+              f"watch: {stats['watches']}")
+
     def show_quota(self):
         """Показать информацию о квоте"""
-        used = self.get_directory_size(self.workspace)
+        used = self.quota_manager.used()
         print(f"\nИспользовано: {used / 1024:.1f} KB из {self.quota / 1024:.1f} KB")
 
     def get_directory_size(self, directory):
         """Вычислить размер директории"""
-        total = 0
-        for root, dirs, files in os.walk(directory):
-            for f in files:
-                fp = os.path.join(root, f)
-                total += os.path.getsize(fp)
-        return total
+        size = self.size_index.total(directory)
+        if size is not None:
+            return size
+
+        # Путь вне рабочей области - считаем параллельным обходом
+        return traversal.tree_size(directory, self.workers)
+
+    def in_workspace(self, path):
+        """Проверка, что путь находится внутри рабочей области"""
+        rel = os.path.relpath(os.path.abspath(path), self.workspace)
+        return rel != '..' and not rel.startswith('..' + os.sep)
+
+    def move_to_trash(self, path):
+        """Удалить путь переносом в корзину за O(1).
+
+        Возвращает False, если путь вне рабочей области или корзина на
+        другой файловой системе - тогда удалять нужно обычным способом.
+        """
+        path = os.path.abspath(path)
+        if not self.in_workspace(path):
+            return False
+        if path == self.workspace:
+            raise ValueError("Нельзя удалить рабочую область целиком")
+        if os.path.isdir(path) and not os.path.islink(path):
+            size = self.size_index.total(path)
+            if size is None:
+                size = traversal.tree_size(path, self.workers)
+        else:
+            size = os.lstat(path).st_size
+        try:
+            self.trash.put(path, size)
+        except OSError as e:
+            if e.errno == errno.EXDEV:
+                return False
+            raise
+        self.track_change(path)
+        return True
+
+    def prepare_write(self, path, keep_content=False):
+        """Подготовить файл к изменению на месте (отвязать от общего блоба)"""
+        if self.blob_store is not None and self.in_workspace(path):
+            self.blob_store.detach(path, keep_content)
+        if keep_content:
+            # Сжатый файл нельзя дописывать или менять на месте
+            tiering.thaw(path)
+
+    def track_change(self, *paths):
+        """Уведомить индексы об изменении путей"""
+        stats.touch(len(paths))
+        self.meta_cache.invalidate(*paths)
+        for path in paths:
+            if self.blob_store is not None and self.in_workspace(path):
+                if os.path.isdir(path):
+                    self.blob_store.ingest_tree(path)
+                else:
+                    self.blob_store.ingest(path)
+            self.size_index.touch(path)
+        self.size_index.maybe_save()
+        self.text_index.maybe_save()
+
+    def _tier_changed(self, path):
+        """Файл сжат в холодное хранилище: поменялся физический размер"""
+        self.meta_cache.invalidate(path)
+        self.size_index.touch(path)
+        self.size_index.maybe_save()
 
     def setup_commands(self):
-        """Настройка доступных команд"""
+        """Настройка доступных команд: имя -> обработчик списка аргументов"""
         self.commands = {
-            'help': self.show_help,
-            'exit': self.exit,
-            'cd': self.dir_ops.change_dir,
-            'ls': self.dir_ops.list_dir,
-            'pwd': self.print_working_dir,
-            'mkdir': self.dir_ops.make_dir,
-            'rmdir': self.dir_ops.remove_dir,
-            'create': self.file_ops.create_file,
-            'read': self.file_ops.read_file,
-            'write': self.file_ops.write_file,
-            'delete': self.file_ops.delete_file,
-            'copy': self.file_ops.copy_file,
-            'move': self.file_ops.move_file,
-            'rename': self.file_ops.rename_file,
-            'zip': self.file_ops.zip_files,
-            'unzip': self.file_ops.unzip_file,
-            'quota': self.show_quota,
-            'search': self.file_ops.search_files,
+            'help': lambda args: self.show_help(),
+            'exit': lambda args: self.exit(),
+            'cd': self.cmd_cd,
+            'ls': self.cmd_ls,
+            'pwd': lambda args: self.print_working_dir(),
+            'mkdir': self.cmd_mkdir,
+            'rmdir': self.cmd_rmdir,
+            'create': self.cmd_create,
+            'read': self.cmd_read,
+            'head': self.cmd_head,
+            'tail': self.cmd_tail,
+            'range': self.cmd_range,
+            'write': self.cmd_write,
+            'delete': self.cmd_delete,
+            'copy': self.cmd_copy,
+            'move': self.cmd_move,
+            'rename': self.cmd_rename,
+            'zip': self.cmd_zip,
+            'unzip': self.cmd_unzip,
+            'quota': lambda args: self.show_quota(),
+            'search': self.cmd_search,
+            'find-text': self.cmd_find_text,
+            'cache': self.cmd_cache,
+            'stats': self.cmd_stats,
+            'profile': self.cmd_profile,
+            'hash': self.cmd_hash,
+            'verify': self.cmd_verify,
+            'sync': self.cmd_sync,
+            'upload': self.cmd_upload,
+            'trash': self.cmd_trash,
+            'restore': self.cmd_restore,
+            'purge': self.cmd_purge,
+            'jobs': self.cmd_jobs,
+            'wait': self.cmd_wait,
+            'cancel': self.cmd_cancel,
         }
 
+    @staticmethod
+    def require(args, count, message):
+        """Проверка количества аргументов команды"""
+        if len(args) < count:
+            raise ValueError(message)
+
+    def cmd_cd(self, args):
+        self.require(args, 1, "Укажите директорию")
+        self.dir_ops.change_dir(self.process_path_args(args))
+
+    def cmd_ls(self, args):
+        options = {'long': False, 'sort': 'name', 'reverse': False, 'limit': None, 'offset': 0}
+        rest = []
+        args = list(args)
+        while args:
+            arg = args.pop(0)
+            if arg == '-l':
+                options['long'] = True
+            elif arg == '-r':
+                options['reverse'] = True
+            elif arg in ('--sort', '--limit', '--offset'):
+                self.require(args, 1, f"Укажите значение для {arg}")
+                value = args.pop(0)
+                options[arg[2:]] = value if arg == '--sort' else int(value)
+            else:
+                rest.append(arg)
+        path = self.process_path_args(rest) if rest else None
+        self.dir_ops.list_dir(path, **options)
+
+    def cmd_mkdir(self, args):
+        self.require(args, 1, "Укажите имя директории")
+        self.dir_ops.make_dir(self.process_path_args(args))
+
+    def cmd_rmdir(self, args):
+        self.require(args, 1, "Укажите имя директории")
+        self.dir_ops.remove_dir(self.process_path_args(args))
+
+    def cmd_create(self, args):
+        self.require(args, 1, "Укажите имя файла")
+        self.file_ops.create_file(self.process_path_args(args))
+
+    def cmd_read(self, args):
+        self.require(args, 1, "Укажите имя файла")
+        self.file_ops.read_file(self.process_path_args(args))
+
+    def _lines_arg(self, args):
+        """Разбор '<file> [n]' для head и tail"""
+        self.require(args, 1, "Укажите имя файла")
+        if len(args) > 1 and args[-1].isdigit():
+            return self.process_path_args(args[:-1]), int(args[-1])
+        return self.process_path_args(args), 10
+
+    def cmd_head(self, args):
+        self.file_ops.head_file(*self._lines_arg(args))
+
+    def cmd_tail(self, args):
+        self.file_ops.tail_file(*self._lines_arg(args))
+
+    def cmd_range(self, args):
+        use_mmap = '--mmap' in args
+        args = [a for a in args if a != '--mmap']
+        self.require(args, 3, "Укажите файл, смещение и длину")
+        path = self.process_path_args(args[:-2])
+        self.file_ops.read_range(path, int(args[-2]), int(args[-1]), use_mmap)
+
+    def cmd_write(self, args):
+        self.require(args, 2, "Укажите имя файла и содержание")
+        path = self.process_path_args([args[0]])
+        self.file_ops.write_file(path, ' '.join(args[1:]))
+
+    @staticmethod
+    def _bulk_args(args):
+        """Отделить флаг -r; групповой режим - при -r или шаблонах в аргументах"""
+        recursive = '-r' in args
+        args = [arg for arg in args if arg != '-r']
+        return args, recursive, recursive or any(has_wildcards(arg) for arg in args)
+
+    def cmd_delete(self, args):
+        args, recursive, is_bulk = self._bulk_args(args)
+        self.require(args, 1, "Укажите имя файла")
+        if is_bulk:
+            self.file_ops.delete_many([self.process_path_args([arg]) for arg in args], recursive)
+        else:
+            self.file_ops.delete_file(self.process_path_args(args))
+
+    def cmd_copy(self, args):
+        args, recursive, is_bulk = self._bulk_args(args)
+        self.require(args, 2, "Укажите источник и назначение")
+        if is_bulk:
+            patterns = [self.process_path_args([arg]) for arg in args[:-1]]
+            self.file_ops.copy_many(patterns, self.process_path_args(args[-1:]), recursive)
+        else:
+            self.file_ops.copy_file(self.process_path_args([args[0]]), self.process_path_args(args[1:]))
+
+    def cmd_move(self, args):
+        args, recursive, is_bulk = self._bulk_args(args)
+        self.require(args, 2, "Укажите источник и назначение")
+        if is_bulk:
+            patterns = [self.process_path_args([arg]) for arg in args[:-1]]
+            self.file_ops.move_many(patterns, self.process_path_args(args[-1:]), recursive)
+        else:
+            self.file_ops.move_file(self.process_path_args([args[0]]), self.process_path_args(args[1:]))
+
+    def cmd_rename(self, args):
+        self.require(args, 2, "Укажите старое и новое имя")
+        self.file_ops.rename_file(self.process_path_args([args[0]]), self.process_path_args(args[1:]))
+
+    def cmd_zip(self, args):
+        method = level = None
+        recursive = False
+        while args and args[0] in ('-m', '-l', '-r'):
+            if args[0] == '-r':
+                recursive = True
+                args = args[1:]
+                continue
+            self.require(args, 2, f"Укажите значение для {args[0]}")
+            if args[0] == '-m':
+                method = args[1]
+            else:
+                level = int(args[1])
+            args = args[2:]
+        self.require(args, 2, "Укажите файлы и имя архива")
+        files = [self.process_path_args([f]) for f in args[:-1]]
+        archive = self.process_path_args(args[-1:])
+        self.file_ops.zip_files(files, archive, method, level, recursive)
+
+    def cmd_unzip(self, args):
+        self.require(args, 1, "Укажите архив")
+        archive = self.process_path_args([args[0]])
+        target = self.process_path_args(args[1:]) if len(args) > 1 else None
+        self.file_ops.unzip_file(archive, target)
+
+    def cmd_search(self, args):
+        self.require(args, 1, "Укажите шаблон поиска")
+        search_dir = self.process_path_args(args[1:]) if len(args) > 1 else None
+        self.file_ops.search_files(args[0], search_dir)
+
+    def cmd_find_text(self, args):
+        self.require(args, 1, "Укажите текст для поиска")
+        self.file_ops.find_text(' '.join(args))
+
+    def cmd_hash(self, args):
+        args, recursive, _ = self._bulk_args(args)
+        algo = 'sha256'
+        out = None
+        rest = []
+        while args:
+            arg = args.pop(0)
+            if arg in ('--algo', '--out'):
+                self.require(args, 1, f"Укажите значение для {arg}")
+                if arg == '--algo':
+                    algo = args.pop(0)
+                else:
+                    out = self.process_path_args([args.pop(0)])
+            else:
+                rest.append(arg)
+        self.require(rest, 1, "Укажите файлы или шаблон")
+        self.file_ops.hash_files([self.process_path_args([arg]) for arg in rest], algo, recursive, out)
+
+    def cmd_verify(self, args):
+        use_cache = '--no-cache' not in args
+        args = [arg for arg in args if arg != '--no-cache']
+        self.require(args, 1, "Укажите манифест")
+        self.file_ops.verify_manifest(self.process_path_args(args), use_cache)
+
+    def cmd_sync(self, args):
+        dry_run = '--dry-run' in args
+        args = [arg for arg in args if arg != '--dry-run']
+        self.require(args, 2, "Укажите источник и назначение")
+        self.file_ops.sync(self.process_path_args([args[0]]), self.process_path_args(args[1:]), dry_run)
+
+    def cmd_upload(self, args):
+        if not args:
+            self.show_uploads()
+            return
+        if args[0] == '--abort':
+            self.require(args, 2, "Укажите назначение загрузки")
+            dest = self.process_path_args(args[1:])
+            if not upload.discard(self.upload_dir, dest):
+                raise ValueError(f"Незавершённой загрузки в {dest} нет")
+            print(f"Загрузка отменена: {dest}")
+            return
+        self.require(args, 2, "Укажите файл и назначение")
+        self.file_ops.upload_file(self.process_path_args([args[0]]), self.process_path_args(args[1:]))
+
+    def show_uploads(self):
+        transfers = upload.pending(self.upload_dir)
+        if not transfers:
+            print("Незавершённых загрузок нет")
+            return
+        for dest, offset, size in transfers:
+            total = f"{size / (1024 * 1024):.1f} MB" if size is not None else "?"
+            print(f"  {dest}: {offset / (1024 * 1024):.1f} MB из {total}")
+
+    def cmd_cache(self, args):
+        if args and args[0] == 'clear':
+            self.meta_cache.clear()
+            print("Кэш метаданных очищен")
+            return
+        self.show_cache()
+
+    def cmd_stats(self, args):
+        if self.stats is None:
+            raise ValueError("Статистика команд отключена в конфигурации")
+        if args and args[0] == 'reset':
+            self.stats.reset()
+            print("Статистика команд сброшена")
+            return
+        if args and args[0] == 'dump':
+            self.require(args, 2, "Укажите файл для выгрузки")
+            path = self.process_path_args(args[1:])
+            print(f"Выгружено команд: {self.stats.dump(path)} -> {path}")
+            return
+        snapshot = self.stats.snapshot()
+        if not snapshot:
+            print("Команды ещё не выполнялись")
+            return
+        print(f"{'команда':<10} {'вызовы':>7} {'ошибки':>6} {'p50, мс':>9} {'p90, мс':>9} {'p99, мс':>9} "
+              f"{'max, мс':>9} {'чтение, MB':>11} {'запись, MB':>11} {'файлы':>7}")
+        for command, row in snapshot.items():
+            print(f"{command:<10} {row['count']:>7} {row['errors']:>6} {row['p50_ms']:>9.2f} "
+                  f"{row['p90_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f} "
+                  f"{row['bytes_read'] / 1024 / 1024:>11.2f} {row['bytes_written'] / 1024 / 1024:>11.2f} "
+                  f"{row['files']:>7}")
+        io = self.stats.process_io()
+        if io is not None:
+            # Счётчики общие для процесса: все сессии и фоновые задачи вместе
+            print(f"Ввод-вывод процесса (все сессии): чтение {io[0] / 1024 / 1024:.2f} MB, "
+                  f"запись {io[1] / 1024 / 1024:.2f} MB")
+
+    def cmd_profile(self, args):
+        out = None
+        if args[:1] == ['--out']:
+            self.require(args, 2, "Укажите файл профиля")
+            out = self.process_path_args([args[1]])
+            args = args[2:]
+        self.require(args, 1, "Укажите команду для профилирования")
+        cmd = args[0].lower()
+        if cmd in ('profile', 'exit'):
+            raise ValueError(f"Команду {cmd} нельзя профилировать")
+        # Профилируется только поток команды, работа пулов потоков в отчёт не попадает
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            self.dispatch(cmd, args[1:])
+        finally:
+            profiler.disable()
+        if out is not None:
+            profiler.dump_stats(out)
+            print(f"Профиль сохранён: {out}")
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(20)
+
+    def cmd_trash(self, args):
+        items = self.trash.list()
+        if not items:
+            print("Корзина пуста")
+            return
+        for item_id, item in items:
+            deleted = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(item['deleted_at']))
+            if item_id == self.trash.reclaiming:
+                status = f"очищается, освобождено {item['reclaimed'] / 1024:.1f} KB"
+            elif item['purge']:
+                status = "ожидает очистки"
+            else:
+                expires = time.localtime(item['deleted_at'] + self.trash.retention)
+                status = f"хранится до {time.strftime('%H:%M:%S', expires)}"
+            print(f"{item_id}  {deleted}  {item['size'] / 1024:>10.1f} KB  {item['original']}  ({status})")
+        print(f"Ожидает очистки: {self.trash.pending_bytes() / 1024:.1f} KB")
+
+    def cmd_restore(self, args):
+        self.require(args, 1, "Укажите элемент корзины")
+        key = args[0] if self.trash.find_exists(args[0]) else self.process_path_args([args[0]])
+        dest = self.process_path_args(args[1:]) if len(args) > 1 else None
+        if dest is not None and not self.in_workspace(dest):
+            raise ValueError("Восстановить можно только в рабочую область")
+        restored = self.trash.restore(key, dest)
+        self.track_change(restored)
+        print(f"Восстановлено: {restored}")
+
+    def cmd_purge(self, args):
+        if not args or args[0] == 'all':
+            count = self.trash.purge()
+        else:
+            key = args[0] if self.trash.find_exists(args[0]) else self.process_path_args(args)
+            count = self.trash.purge(key)
+        print(f"Очистка запущена: {count} элементов")
+
+    def cmd_jobs(self, args):
+        jobs = self.jobs.list()
+        if not jobs:
+            print("Фоновых задач нет")
+        for job in jobs:
+            print(job.summary())
+
+    def _job_arg(self, args):
+        self.require(args, 1, "Укажите номер задачи")
+        return int(args[0].lstrip('%'))
+
+    def cmd_wait(self, args):
+        job = self.jobs.wait(self._job_arg(args))
+        print(job.output.getvalue(), end='')
+        print(job.summary())
+
+    def cmd_cancel(self, args):
+        job = self.jobs.cancel(self._job_arg(args))
+        print(f"Отмена запрошена: {job.summary()}" if job.active else job.summary())
+
+    def submit_job(self, command_line):
+        """Поставить команду в очередь фоновых задач.
+
+        Блокируемые пути - аргументы-пути команды (JOB_PATH_ARGS) в
+        текущей директории на момент постановки; задача выполняется
+        с этой же текущей директорией.
+        """
+        parts = self.split_command(command_line)
+        if not parts:
+            raise ValueError("Укажите команду перед &")
+        cmd = parts[0].lower()
+        if cmd not in self.commands:
+            raise ValueError(f"Неизвестная команда: {cmd}. Введите 'help' для справки")
+        if cmd in ('exit', 'wait', 'jobs', 'cancel', 'cd'):
+            raise ValueError(f"Команду {cmd} нельзя выполнить в фоне")
+        paths = self.job_paths(cmd, parts[1:])
+        cwd = self.current_dir
+
+        def setup():
+            self._local.current_dir = cwd
+
+        job = self.jobs.submit(command_line, paths or [cwd], cmd not in READ_ONLY_COMMANDS, setup)
+        print(f"[{job.id}] {command_line}")
+        return job
+
+    def job_paths(self, cmd, args):
+        """Аргументы-пути команды: опции и их значения пропускаются"""
+        if cmd == 'profile':
+            out = []
+            if args[:1] == ['--out']:
+                out, args = [self.process_path_args(args[1:2])], args[2:]
+            return out + (self.job_paths(args[0].lower(), args[1:]) if args else [])
+        positions, value_options = JOB_PATH_ARGS.get(cmd, (slice(0), ()))
+        positional = []
+        args = iter(args)
+        for arg in args:
+            if arg in value_options:
+                next(args, None)
+            elif arg == '--out':
+                # --out <файл> у hash - записываемый путь
+                positional.append(next(args, ''))
+            elif not arg.startswith('-'):
+                positional.append(arg)
+        return [self.process_path_args([arg]) for arg in positional[positions] if arg]
+
+    def execute(self, command_line):
+        """Разобрать строку и выполнить команду через таблицу self.commands"""
+        command_line = command_line.strip()
+        parts = self.split_command(command_line)
+        if not parts:
+            return
+        # Фоновая задача - только отдельный незакавыченный & в конце;
+        # у write это часть записываемого текста
+        if parts[-1] == '&' and command_line.endswith('&') and parts[0].lower() != 'write':
+            self.submit_job(command_line[:-1].strip())
+            return
+        self.dispatch(parts[0].lower(), parts[1:])
+
+    def dispatch(self, cmd, args):
+        """Вызвать обработчик команды, замеряя время и ввод-вывод"""
+        handler = self.commands.get(cmd)
+        if handler is None:
+            raise ValueError(f"Неизвестная команда: {cmd}. Введите 'help' для справки")
+        if self.stats is None:
+            handler(args)
+            return
+        with self.stats.measure(cmd):
+            handler(args)
+
     def run(self):
         """Основной цикл обработки команд"""
         print(f"\nДобро пожаловать, {self.username}!")
@@ -143,135 +750,60 @@ class FileManager:
 
         while True:
             try:
+                for job in self.jobs.take_finished():
+                    print(job.summary())
                 # Получаем ввод пользователя
                 user_input = input(f"{self.get_prompt()}> ").strip()
                 if not user_input:
                     continue
-
-                # Разбиваем на команду и аргументы
-                parts = self.split_command(user_input)
-                cmd = parts[0].lower()
-                args = parts[1:]
-
-                # Обработка команд
-                if cmd == 'help':
-                    self.show_help()
-
-                elif cmd == 'exit':
-                    self.exit()
-
-                elif cmd == 'cd':
-                    if not args:
-                        print("Укажите директорию")
-                        continue
-                    path = self.process_path_args(args)
-                    self.dir_ops.change_dir(path)
-
-                elif cmd == 'ls':
-                    self.dir_ops.list_dir()
-
-                elif cmd == 'pwd':
-                    self.print_working_dir()
-
-                elif cmd == 'mkdir':
-                    if not args:
-                        print("Укажите имя директории")
-                        continue
-                    path = self.process_path_args(args)
-                    self.dir_ops.make_dir(path)
-
-                elif cmd == 'rmdir':
-                    if not args:
-                        print("Укажите имя директории")
-                        continue
-                    path = self.process_path_args(args)
-                    self.dir_ops.remove_dir(path)
-
-                elif cmd == 'create':
-                    if not args:
-                        print("Укажите имя файла")
-                        continue
-                    path = self.process_path_args(args)
-                    self.file_ops.create_file(path)
-
-                elif cmd == 'read':
-                    if not args:
-                        print("Укажите имя файла")
-                        continue
-                    path = self.process_path_args(args)
-                    self.file_ops.read_file(path)
-
-                elif cmd == 'write':
-                    if len(args) < 2:
-                        print("Укажите имя файла и содержание")
-                        continue
-                    path = self.process_path_args([args[0]])
-                    content = ' '.join(args[1:])
-                    self.file_ops.write_file(path, content)
-
-                elif cmd == 'delete':
-                    if not args:
-                        print("Укажите имя файла")
-                        continue
-                    path = self.process_path_args(args)
-                    self.file_ops.delete_file(path)
-
-                elif cmd == 'copy':
-                    if len(args) < 2:
-                        print("Укажите источник и назначение")
-                        continue
-                    src = self.process_path_args([args[0]])
-                    dest = self.process_path_args(args[1:])
-                    self.file_ops.copy_file(src, dest)
-
-                elif cmd == 'move':
-                    if len(args) < 2:
-                        print("Укажите источник и назначение")
-                        continue
-                    src = self.process_path_args([args[0]])
-                    dest = self.process_path_args(args[1:])
-                    self.file_ops.move_file(src, dest)
-
-                elif cmd == 'rename':
-                    if len(args) < 2:
-                        print("Укажите старое и новое имя")
-                        continue
-                    old = self.process_path_args([args[0]])
-                    new = self.process_path_args(args[1:])
-                    self.file_ops.rename_file(old, new)
-
-                elif cmd == 'zip':
-                    if len(args) < 2:
-                        print("Укажите файлы и имя архива")
-                        continue
-                    files = [self.process_path_args([f]) for f in args[:-1]]
-                    archive = self.process_path_args(args[-1:])
-                    self.file_ops.zip_files(files, archive)
-
-                elif cmd == 'unzip':
-                    if not args:
-                        print("Укажите архив")
-                        continue
-                    archive = self.process_path_args([args[0]])
-                    target = self.process_path_args(args[1:]) if len(args) > 1 else None
-                    self.file_ops.unzip_file(archive, target)
-
-                elif cmd == 'search':
-                    if not args:
-                        print("Укажите шаблон поиска")
-                        continue
-                    search_dir = self.process_path_args(args[1:]) if len(args) > 1 else None
-                    self.file_ops.search_files(args[0], search_dir)
-
-                elif cmd == 'quota':
-                    self.show_quota()
-
-                else:
-                    print(f"Неизвестная команда: {cmd}. Введите 'help' для справки")
-
+                self.execute(user_input)
             except Exception as e:
                 print(f"Ошибка: {str(e)}")
 
+    def run_batch(self, lines, out, stop_on_error=False):
+        """Пакетный режим: выполнить команды и вывести результаты JSON-строками.
+
+        Вывод каждой команды перехватывается, результат пишется в out
+        как {"line", "command", "ok", "output", "ms"}. Команда считается
+        неуспешной, если она выбросила исключение или вывела строку,
+        начинающуюся с "Ошибка". Возвращает код выхода: 0 - все команды
+        успешны, 1 - были ошибки.
+        """
+        failed = False
+        try:
+            for lineno, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                start = time.perf_counter()
+                ok = True
+                stop = False
+                with capture_output() as buffer:
+                    try:
+                        self.execute(line)
+                    except SystemExit:
+                        stop = True
+                    except Exception as e:
+                        print(f"Ошибка: {str(e)}")
+                        ok = False
+                output = buffer.getvalue()
+                if any(row.startswith('Ошибка') for row in output.splitlines()):
+                    ok = False
+                out.write(json.dumps({
+                    'line': lineno,
+                    'command': line,
+                    'ok': ok,
+                    'output': output,
+                    'ms': round((time.perf_counter() - start) * 1000, 3),
+                }, ensure_ascii=False) + '\n')
+                failed = failed or not ok
+                if stop or (stop_on_error and not ok):
+                    break
+        finally:
+            out.flush()
+            self.close()
+        return 1 if failed else 0
+
     def split_command(self, input_str):
         """Умное разделение команд с сохранением любых пробелов в путях"""
         parts = []
@@ -0,0 +1,230 @@
+import os
+import math
+import zlib
+import shutil
+import hashlib
+from . import copy_engine
+from . import tiering
+
+
+MOD_ADLER = 65521
+MIN_BLOCK = 4 * 1024
+MAX_BLOCK = 1024 * 1024
+MAX_LITERAL = 1024 * 1024  # литералы отдаются кусками не больше этого
+COMPACT_AT = 8 * 1024 * 1024  # порог сдвига буфера чтения
+
+
+def block_size_for(size):
+    """Размер блока как в rsync: около sqrt(размер), кратно 4K"""
+    block = int(math.sqrt(size)) // MIN_BLOCK * MIN_BLOCK
+    return max(MIN_BLOCK, min(block, MAX_BLOCK))
+
+
+def strong_checksum(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def roll(weak, out_byte, in_byte, length):
+    """Сдвинуть окно adler32 на байт: убрать out_byte, добавить in_byte.
+
+    Значение совпадает с zlib.adler32 нового окна, поэтому первое окно
+    и окна после совпадений считаются zlib на скорости C.
+    """
+    a = weak & 0xffff
+    b = weak >> 16
+    a = (a - out_byte + in_byte) % MOD_ADLER
+    b = (b - length * out_byte + a - 1) % MOD_ADLER
+    return (b << 16) | a
+
+
+def signature(path, block_size):
+    """Сигнатура базового файла: weak -> [(номер блока, длина, strong)]"""
+    table = {}
+    with tiering.open_read(path) as f:
+        index = 0
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            table.setdefault(zlib.adler32(block), []).append((index, len(block), strong_checksum(block)))
+            index += 1
+    return table
+
+
+def delta(src_path, table, block_size, rolling=True):
+    """Разность файла относительно сигнатуры.
+
+    Выдаёт ('copy', номер блока, длина) для блоков, найденных в базовом
+    файле, и ('data', байты) для остального. Окно сдвигается по одному
+    байту со скользящей суммой adler32 (rolling=True) - так находятся
+    блоки, сдвинутые вставками и удалениями. Без rolling окна проверяются
+    только по границам блоков: для файлов того же размера (правки на
+    месте) это на порядки быстрее, а результат остаётся корректным.
+    """
+    buf = bytearray()
+    shifted = 0  # байт источника, уже убранных из начала буфера
+    p = 0
+    literal_start = 0
+    weak = None
+    eof = False
+    with tiering.open_read(src_path) as f:
+        def fill():
+            nonlocal eof
+            while not eof and len(buf) - p < block_size + 1:
+                chunk = f.read(max(block_size * 16, MAX_LITERAL))
+                if not chunk:
+                    eof = True
+                    break
+                buf.extend(chunk)
+
+        while True:
+            fill()
+            window = min(block_size, len(buf) - p)
+            if window == 0:
+                break
+            view = memoryview(buf)
+            try:
+                if weak is None:
+                    weak = zlib.adler32(view[p:p + window])
+                match = None
+                candidates = table.get(weak)
+                if candidates:
+                    strong = strong_checksum(view[p:p + window])
+                    # Предпочитаем блок на той же позиции - его не нужно переносить
+                    expected = (shifted + p) // block_size
+                    for index, length, digest in candidates:
+                        if length == window and digest == strong:
+                            match = index
+                            if index == expected:
+                                break
+                if match is not None:
+                    if p > literal_start:
+                        yield ('data', bytes(view[literal_start:p]))
+                    yield ('copy', match, window)
+                    p += window
+                    literal_start = p
+                    weak = None
+                elif not rolling or window < block_size or p + window >= len(buf):
+                    # Целое окно - в литерал (без rolling или на хвосте файла)
+                    p += window
+                    weak = None
+                else:
+                    weak = roll(weak, buf[p], buf[p + window], window)
+                    p += 1
+                if p - literal_start >= MAX_LITERAL:
+                    yield ('data', bytes(view[literal_start:p]))
+                    literal_start = p
+            finally:
+                view.release()
+            if literal_start >= COMPACT_AT:
+                del buf[:literal_start]
+                shifted += literal_start
+                p -= literal_start
+                literal_start = 0
+        if p > literal_start:
+            yield ('data', bytes(buf[literal_start:p]))
+
+
+def apply_delta(dest_path, ops, src_path, block_size, src_size, dry_run=False):
+    """Применить разность к базовому файлу на месте, вернуть записанные байты.
+
+    Блок на своей позиции не пишется вовсе. Блок, найденный дальше по
+    файлу, переносится назад (его ещё не перезаписали), найденный ближе
+    к началу мог быть уже перезаписан - он берётся из источника. Файл
+    обрезается до размера источника.
+    """
+    written = 0
+    offset = 0
+    with tiering.open_read(src_path) as src, open(dest_path, 'rb' if dry_run else 'r+b') as dest:
+        for op in ops:
+            if op[0] == 'data':
+                data = len(op[1]) if dry_run else op[1]
+            else:
+                _, index, length = op
+                base = index * block_size
+                if base == offset:
+                    offset += length
+                    continue
+                if dry_run:
+                    data = length
+                elif base > offset:
+                    dest.seek(base)
+                    data = dest.read(length)
+                else:
+                    src.seek(offset)
+                    data = src.read(length)
+            size = data if dry_run else len(data)
+            if not dry_run:
+                dest.seek(offset)
+                dest.write(data)
+            written += size
+            offset += size
+        if not dry_run:
+            dest.truncate(src_size)
+    return written
+
+
+def unchanged(src_path, src_stat, dest_path):
+    """Пропуск по размеру и mtime, как в rsync по умолчанию.
+
+    Если одна из сторон в холодном хранилище, сравниваются размеры
+    содержимого, а не сжатого файла.
+    """
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if dest_stat.st_mtime_ns != src_stat.st_mtime_ns:
+        return False
+    return dest_stat.st_size == src_stat.st_size or \
+        tiering.logical_size(dest_path) == tiering.logical_size(src_path)
+
+
+def sync_file(src, dest, dry_run=False, block_size=None):
+    """Синхронизировать файл. Возвращает (действие, записано байт, размер).
+
+    Действия: 'skip' - не изменился, 'copy' - назначения нет (полная
+    копия), 'delta' - переданы только изменённые блоки.
+    """
+    src_stat = os.stat(src)
+    if unchanged(src, src_stat, dest):
+        return 'skip', 0, src_stat.st_size
+    # Холодный источник передаётся распакованным
+    cold = tiering.is_cold(src)
+    size = tiering.logical_size(src) if cold else src_stat.st_size
+    if not os.path.exists(dest):
+        if not dry_run:
+            os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+            if cold:
+                tiering.decompress_to(src, dest)
+            else:
+                copy_engine.copy_file(src, dest)
+                shutil.copystat(src, dest)
+        return 'copy', size, size
+    if not dry_run:
+        # Блоки пишутся на место - сжатое назначение сначала распаковываем
+        tiering.thaw(dest)
+    dest_size = tiering.logical_size(dest)
+    block_size = block_size or block_size_for(max(size, dest_size))
+    table = signature(dest, block_size)
+    # Тот же размер - скорее всего правки на месте, сдвигов нет
+    ops = delta(src, table, block_size, rolling=size != dest_size)
+    written = apply_delta(dest, ops, src, block_size, size, dry_run)
+    if not dry_run:
+        # mtime ставится последним: прерванная синхронизация будет повторена
+        shutil.copystat(src, dest)
+    return 'delta', written, size
+
+
+def iter_pairs(src, dest):
+    """Пары (файл источника, файл назначения) для файла или дерева"""
+    if not os.path.isdir(src):
+        if os.path.isdir(dest):
+            dest = os.path.join(dest, os.path.basename(src))
+        yield src, dest
+        return
+    for root, dirs, files in os.walk(src):
+        dirs.sort()
+        rel = os.path.relpath(root, src)
+        for name in sorted(files):
+            yield os.path.join(root, name), os.path.normpath(os.path.join(dest, rel, name))
@@ -1,5 +1,9 @@
 import os
-import shutil
+import time
+import heapq
+from itertools import islice
+from . import traversal
+from . import jobs
 
 class DirectoryOperations:
     def __init__(self, manager):
@@ -14,10 +18,11 @@ class DirectoryOperations:
         try:
             new_dir = self.manager.validate_path(dir_name)
 
-            # Проверяем существование директории
-            if not os.path.exists(new_dir):
+            # Проверяем существование директории (по кэшу метаданных)
+            entry = self.manager.meta_cache.stat(new_dir)
+            if entry is None:
                 raise ValueError(f"Директория не существует: {new_dir}")
-            if not os.path.isdir(new_dir):
+            if not entry.is_dir:
                 raise ValueError(f"Это не директория: {new_dir}")
 
             self.manager.current_dir = new_dir
@@ -25,28 +30,78 @@ class DirectoryOperations:
         except Exception as e:
             print(f"Ошибка: {str(e)}")
 
-    def list_dir(self):
-        items = os.listdir(self.manager.current_dir)
-        for item in items:
-            path = os.path.join(self.manager.current_dir, item)
-            if os.path.isdir(path):
-                print(f"{item}/")
+    SORT_KEYS = {
+        'name': lambda entry: entry.name,
+        'size': lambda entry: entry.size,
+        'mtime': lambda entry: entry.mtime_ns,
+    }
+
+    def _format(self, entry, long):
+        name = f"{entry.name}/" if entry.is_dir else entry.name
+        if not long:
+            return name
+        mtime = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.mtime_ns / 1e9))
+        kind = 'd' if entry.is_dir else ('l' if entry.is_symlink else '-')
+        return f"{kind} {entry.size:>12} {mtime} {name}"
+
+    def list_dir(self, path=None, long=False, sort='name', reverse=False, limit=None, offset=0):
+        """Список директории через os.scandir с сортировкой и постраничным выводом.
+
+        Записи берутся из кэша метаданных или читаются потоково и
+        выводятся по мере чтения. При заданном limit сортировка
+        идёт через кучу из offset + limit элементов, поэтому память
+        ограничена размером страницы, а не размером директории.
+        sort='none' выводит записи в порядке файловой системы.
+        """
+        path = path or self.manager.current_dir
+        if sort != 'none' and sort not in self.SORT_KEYS:
+            raise ValueError(f"Неизвестный ключ сортировки: {sort}. Доступны: none, {', '.join(self.SORT_KEYS)}")
+
+        it = self.manager.meta_cache.scan(path)
+        try:
+            if sort == 'none':
+                entries = islice(it, offset, None)
+            elif limit is None:
+                entries = islice(sorted(it, key=self.SORT_KEYS[sort], reverse=reverse), offset, None)
             else:
-                print(item)
+                select = heapq.nlargest if reverse else heapq.nsmallest
+                entries = islice(select(offset + limit + 1, it, key=self.SORT_KEYS[sort]), offset, None)
+
+            shown = 0
+            for entry in entries:
+                if limit is not None and shown >= limit:
+                    print(f"... есть ещё записи, следующая страница: --offset {offset + shown}")
+                    break
+                print(self._format(entry, long))
+                shown += 1
+        finally:
+            it.close()
 
     def make_dir(self, *name_parts):
         """Создание директории с пробелами в имени"""
         dirname = self.manager.validate_path(' '.join(name_parts))
         try:
             os.makedirs(dirname, exist_ok=True)
+            self.manager.track_change(dirname)
             print(f"Директория создана: {dirname}")
         except Exception as e:
             print(f"Ошибка создания директории: {str(e)}")
 
     def remove_dir(self, dir_name):
         dir_path = self.manager.validate_path(dir_name)
-        if os.path.exists(dir_path):
-            shutil.rmtree(dir_path)
+        if self.manager.meta_cache.exists(dir_path):
+            if not self.manager.meta_cache.isdir(dir_path):
+                raise ValueError(f"Это не директория: {dir_name}")
+            if self.manager.move_to_trash(dir_path):
+                print(f"Директория удалена: {dir_name} (в корзине, restore для восстановления)")
+                return
+            try:
+                traversal.rmtree(dir_path, self.manager.workers, jobs.current_progress())
+            finally:
+                # Прерванное удаление тоже меняет дерево
+                self.manager.track_change(dir_path)
+            if self.manager.blob_store is not None:
+                self.manager.blob_store.collect()
             print(f"Директория удалена: {dir_name}")
         else:
             raise ValueError(f"Директория не существует: {dir_name}")
\ No newline at end of file
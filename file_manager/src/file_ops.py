@@ -1,90 +1,388 @@
 import os
-import shutil
+import time
 import zipfile
+import threading
 import fnmatch
+from . import traversal
+from . import reader
+from . import archive
+from . import copy_engine
+from . import jobs
+from . import bulk
+from . import hashing
+from . import delta_sync
+from . import stats
+from . import tiering
+from . import upload
 
 
 class FileOperations:
+    PROGRESS_THRESHOLD = 256 * 1024 * 1024  # прогресс показывается для больших файлов
+
     def __init__(self, manager):
         self.manager = manager
 
+    def _progress(self, path):
+        """Колбэк прогресса копирования (скопировано, всего) или None.
+
+        Для больших файлов выводит проценты по 10%, в фоновой задаче
+        передаёт ей скопированные байты (и проверяет отмену).
+        """
+        job_progress = jobs.current_progress()
+        try:
+            verbose = self.manager.meta_cache.getsize(path) >= self.PROGRESS_THRESHOLD
+        except OSError:
+            verbose = False
+        if not verbose and job_progress is None:
+            return None
+        state = {'shown': 0, 'done': 0}
+
+        def report(done, total):
+            if job_progress is not None:
+                job_progress(1 if done >= total else 0, done - state['done'])
+                state['done'] = done
+            if not verbose:
+                return
+            percent = done * 100 // total if total else 100
+            if percent >= state['shown'] + 10:
+                state['shown'] = percent - percent % 10
+                print(f"  {os.path.basename(path)}: {state['shown']}%")
+
+        return report
+
     def create_file(self, path):
         """Создание файла с автоматическим определением типа"""
         try:
             # Для .doc файлов создаем минимальный заголовок
             if path.lower().endswith('.doc'):
+                self.manager.prepare_write(path)
                 with open(path, 'wb') as f:
                     f.write(b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1')  # Заголовок DOCX
             else:
                 open(path, 'a').close()
+            self.manager.track_change(path)
             print(f"Файл создан: {path}")
         except Exception as e:
             print(f"Ошибка: {e}")
 
+    def _print_chunks(self, chunks, binary=False, offset=0):
+        """Вывод потока блоков: текст по мере декодирования или hex-дамп"""
+        if binary:
+            for line in reader.hexdump(chunks, offset):
+                print(line)
+            return
+        last = ''
+        for text in reader.iter_text(chunks):
+            print(text, end='')
+            last = text
+        if not last.endswith('\n'):
+            print()
+
+    def _check_file(self, path):
+        """Проверка по кэшу метаданных до открытия файла"""
+        entry = self.manager.meta_cache.stat(path)
+        stats.touch()
+        if entry is None:
+            raise FileNotFoundError(f"Файл не существует: {path}")
+        if entry.is_dir:
+            raise IsADirectoryError(f"Это директория: {path}")
+        return entry
+
+    def _open_text(self, path):
+        """Открыть файл для потокового чтения или None для бинарного"""
+        self._check_file(path)
+        f = tiering.open_read(path)
+        if reader.is_binary(f.read(reader.SNIFF_SIZE)):
+            size = f.seek(0, os.SEEK_END)
+            f.close()
+            print(f"Бинарный файл ({size} байт), используйте range для просмотра")
+            return None
+        f.seek(0)
+        return f
+
     def read_file(self, path):
-        """Чтение файла"""
+        """Потоковое чтение файла блоками фиксированного размера"""
+        try:
+            f = self._open_text(path)
+            if f is None:
+                return
+            with f:
+                self._print_chunks(reader.iter_chunks(f))
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
+    def head_file(self, path, lines=10):
+        """Первые строки файла"""
+        try:
+            f = self._open_text(path)
+            if f is None:
+                return
+            with f:
+                end = reader.head_offset(f, lines)
+                f.seek(0)
+                self._print_chunks(reader.iter_chunks(f, end))
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
+    def tail_file(self, path, lines=10):
+        """Последние строки файла, чтение с конца блоками"""
+        try:
+            f = self._open_text(path)
+            if f is None:
+                return
+            with f:
+                f.seek(reader.tail_offset(f, lines))
+                self._print_chunks(reader.iter_chunks(f))
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
+    def read_range(self, path, offset, length, use_mmap=False):
+        """Чтение диапазона байтов, бинарные данные выводятся hex-дампом"""
         try:
-            with open(path, 'r') as f:
-                print(f.read())
+            if offset < 0 or length < 0:
+                raise ValueError("Смещение и длина должны быть неотрицательными")
+            size = self._check_file(path).size
+            cold = tiering.is_cold(path)
+            if offset >= (tiering.logical_size(path) if cold else size):
+                return
+            binary = reader.sniff(path)
+            # Сжатый файл отображать в память бессмысленно - читаем потоком
+            if use_mmap and not cold:
+                self._print_chunks(reader.iter_mmap(path, offset, length), binary, offset)
+                return
+            with tiering.open_read(path) as f:
+                f.seek(offset)
+                self._print_chunks(reader.iter_chunks(f, length), binary, offset)
         except Exception as e:
             print(f"Ошибка: {e}")
 
     def write_file(self, path, content, mode='w'):
         """Запись в файл с поддержкой текстовых и бинарных режимов"""
         try:
-            # Для .doc файлов используем бинарный режим
-            if path.lower().endswith('.doc'):
-                with open(path, 'wb') as f:
-                    if isinstance(content, str):
-                        f.write(content.encode('utf-8'))
-                    else:
+            quota = self.manager.quota_manager
+            is_doc = path.lower().endswith('.doc')
+            nbytes = len(content.encode('utf-8')) if isinstance(content, str) else len(content)
+            delta = quota.write_delta(path, nbytes, append=not is_doc and 'a' in mode)
+
+            with quota.reserve(delta):
+                self.manager.prepare_write(path, keep_content=not is_doc and 'a' in mode)
+                data = content.encode('utf-8') if isinstance(content, str) else content
+                if is_doc or 'a' not in mode:
+                    # Перезапись - через временный файл: при сбое не останется обрезанного файла
+                    upload.atomic_write(path, data)
+                else:
+                    with open(path, mode) as f:
                         f.write(content)
-            else:
-                # Для обычных текстовых файлов
-                with open(path, mode) as f:
-                    f.write(content)
+                self.manager.track_change(path)
             print(f"Записано в: {path}")
         except Exception as e:
             print(f"Ошибка: {str(e)}")
 
+    def upload_file(self, src, dest, chunk_size=upload.CHUNK_SIZE):
+        """Загрузка локального файла блоками с продолжением после сбоя.
+
+        Данные копятся в служебном .part и переносятся на место
+        назначения атомарно. Прерванная загрузка того же файла в то же
+        место (файл источника не менялся) продолжается с последнего
+        зафиксированного смещения.
+        """
+        try:
+            if self.manager.meta_cache.isdir(dest):
+                dest = os.path.join(dest, os.path.basename(src))
+            if os.path.isdir(src):
+                raise IsADirectoryError(f"Это директория: {src}")
+            st = os.stat(src)
+            size = tiering.logical_size(src)
+            source = [os.path.abspath(src), st.st_size, st.st_mtime_ns]
+            quota = self.manager.quota_manager
+            start = time.perf_counter()
+            with quota.reserve(quota.write_delta(dest, size)):
+                transfer = upload.Upload(self.manager.upload_dir, dest, size, source)
+                resumed = transfer.offset
+                try:
+                    with tiering.open_read(src) as f:
+                        f.seek(resumed)
+                        transfer.write_stream(f, chunk_size, jobs.current_progress())
+                    self.manager.prepare_write(dest)
+                    transfer.commit()
+                except BaseException:
+                    # Отмена или сбой: зафиксированное остаётся для продолжения
+                    transfer.suspend()
+                    raise
+                self.manager.track_change(dest)
+            seconds = time.perf_counter() - start
+            mb = (size - resumed) / (1024 * 1024)
+            note = f", продолжено с {resumed / (1024 * 1024):.1f} MB" if resumed else ""
+            print(f"Загружено: {src} → {dest}, {mb:.1f} MB за {seconds:.2f} с "
+                  f"({mb / seconds if seconds else 0:.1f} MB/s){note}")
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
+    def _delete_one(self, path):
+        """Удалить файл, вернуть размер; True вторым значением - в корзину"""
+        if os.path.isdir(path) and not os.path.islink(path):
+            raise IsADirectoryError(f"Это директория, используйте rmdir: {path}")
+        size = os.lstat(path).st_size
+        if self.manager.move_to_trash(path):
+            return size, True
+        store = self.manager.blob_store
+        blob = store.blob_for(path) if store is not None else None
+        os.remove(path)
+        if blob is not None:
+            store.release(blob)
+        self.manager.track_change(path)
+        return size, False
+
     def delete_file(self, path):
-        """Удаление файла"""
+        """Удаление файла: в рабочей области - перенос в корзину"""
         try:
-            os.remove(path)
-            print(f"Удалён: {path}")
+            _, trashed = self._delete_one(path)
+            if trashed:
+                print(f"Удалён: {path} (в корзине, restore для восстановления)")
+            else:
+                print(f"Удалён: {path}")
         except Exception as e:
             print(f"Ошибка: {e}")
 
+    def _copy_one(self, src, dest, progress=True):
+        """Скопировать файл, вернуть число байт"""
+        quota = self.manager.quota_manager
+        store = self.manager.blob_store
+        with quota.reserve(quota.copy_delta(src, dest)):
+            if store is not None and self.manager.in_workspace(src) and self.manager.in_workspace(dest):
+                # Дедупликация: копия - это ещё одна ссылка на блоб
+                copied = store.link_copy(src, dest)
+            else:
+                if self.manager.meta_cache.isdir(dest):
+                    self.manager.prepare_write(os.path.join(dest, os.path.basename(src)))
+                else:
+                    self.manager.prepare_write(dest)
+                if not self.manager.in_workspace(dest) and tiering.is_cold(src):
+                    # Из холодного хранилища наружу копируется содержимое, а не сжатый файл
+                    copied = tiering.decompress_to(src, dest)
+                else:
+                    copied = copy_engine.copy2(src, dest, self._progress(src) if progress else None)
+            self.manager.track_change(copied)
+        return os.path.getsize(copied)
+
     def copy_file(self, src, dest):
         """Копирование файла"""
         try:
-            shutil.copy2(src, dest)
+            self._copy_one(src, dest)
             print(f"Скопировано: {src} → {dest}")
         except Exception as e:
             print(f"Ошибка: {e}")
 
+    def _move_one(self, src, dest, progress=True):
+        """Переместить файл, вернуть число байт"""
+        quota = self.manager.quota_manager
+        size = os.path.getsize(src)
+        # Перемещение внутри рабочей области не меняет занятый объём
+        delta = 0 if self.manager.in_workspace(src) else quota.copy_delta(src, dest)
+        with quota.reserve(delta):
+            if not self.manager.in_workspace(dest) and tiering.is_cold(src):
+                moved = tiering.decompress_to(src, dest)
+                os.remove(src)
+            else:
+                # В пределах файловой системы - только rename
+                moved = copy_engine.move(src, dest, self._progress(src) if progress else None)
+            self.manager.track_change(src, moved)
+        return size
+
     def move_file(self, src, dest):
         """Перемещение файла"""
         try:
-            shutil.move(src, dest)
+            self._move_one(src, dest)
             print(f"Перемещено: {src} → {dest}")
         except Exception as e:
             print(f"Ошибка: {e}")
 
+    def _bulk_target(self, path, base, dest):
+        """Путь в dest с сохранением структуры относительно базы шаблона"""
+        target = os.path.join(dest, os.path.relpath(path, base))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        return target
+
+    @staticmethod
+    def _outside(matches, dest):
+        """Совпадения вне dest: иначе glob находил бы уже сделанные копии"""
+        prefix = os.path.join(os.path.abspath(dest), '')
+        return (match for match in matches if not os.path.abspath(match[0]).startswith(prefix))
+
+    def copy_many(self, patterns, dest, recursive=False):
+        """Групповое копирование файлов по шаблонам в директорию dest"""
+        try:
+            os.makedirs(dest, exist_ok=True)
+            result = bulk.run_bulk(
+                self._outside(bulk.iter_matches(patterns, recursive), dest),
+                lambda match: self._copy_one(match[0], self._bulk_target(match[0], match[1], dest), False),
+                self.manager.workers, jobs.current_progress())
+            result.report("Скопировано")
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
+    def move_many(self, patterns, dest, recursive=False):
+        """Групповое перемещение файлов по шаблонам в директорию dest"""
+        try:
+            os.makedirs(dest, exist_ok=True)
+            result = bulk.run_bulk(
+                self._outside(bulk.iter_matches(patterns, recursive), dest),
+                lambda match: self._move_one(match[0], self._bulk_target(match[0], match[1], dest), False),
+                self.manager.workers, jobs.current_progress())
+            result.report("Перемещено")
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
+    def delete_many(self, patterns, recursive=False):
+        """Групповое удаление файлов по шаблонам"""
+        try:
+            result = bulk.run_bulk(
+                bulk.iter_matches(patterns, recursive),
+                lambda match: self._delete_one(match[0])[0],
+                self.manager.workers, jobs.current_progress())
+            result.report("Удалено")
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
     def rename_file(self, old, new):
         """Переименование файла"""
         try:
             os.rename(old, new)
+            self.manager.track_change(old, new)
             print(f"Переименовано: {old} → {new}")
         except Exception as e:
             print(f"Ошибка: {e}")
 
-    def zip_files(self, files, archive_path):
-        """Создание архива"""
+    def zip_files(self, files, archive_path, method=None, level=None, recursive=False):
+        """Создание архива с параллельным сжатием записей.
+
+        Шаблоны (*.log, **/*.txt) раскрываются, имена в архиве строятся
+        относительно директории шаблона.
+        """
         try:
-            with zipfile.ZipFile(archive_path, 'w') as zipf:
-                for file in files:
-                    zipf.write(file, os.path.basename(file))
+            settings = self.manager.archive_settings
+            method = archive.resolve_method(method or settings.get('method', 'deflate'))
+            if level is None:
+                level = settings.get('level')
+                if method == zipfile.ZIP_LZMA and level is not None:
+                    print("Предупреждение: уровень сжатия из конфигурации для lzma не применяется")
+                    level = None
+            if recursive or any(bulk.has_wildcards(f) for f in files):
+                entries = []
+                for path, base in bulk.iter_matches(files, recursive):
+                    if os.path.abspath(path) != os.path.abspath(archive_path):
+                        entries.extend(archive.collect_entries([path], base))
+                if not entries:
+                    raise ValueError("По шаблонам не найдено ни одного файла")
+            else:
+                entries = archive.collect_entries(files)
+
+            quota = self.manager.quota_manager
+            with quota.reserve(quota.archive_delta(entries, archive_path)):
+                self.manager.prepare_write(archive_path)
+                archive.create_archive(entries, archive_path, method, level, settings.get('workers'),
+                                       jobs.current_progress())
+                self.manager.track_change(archive_path)
             print(f"Архив создан: {archive_path}")
         except Exception as e:
             print(f"Ошибка: {e}")
@@ -95,22 +393,169 @@ class FileOperations:
             if target_dir is None:
                 target_dir = os.path.dirname(archive_path)
 
+            quota = self.manager.quota_manager
             with zipfile.ZipFile(archive_path, 'r') as zipf:
-                zipf.extractall(target_dir)
+                # Проверяем квоту по заявленным размерам до распаковки
+                delta = quota.extract_delta(zipf, target_dir)
+                names = zipf.namelist()
+            targets = [os.path.join(target_dir, name) for name in names if not name.endswith('/')]
+            # Индекс обновляем по верхнеуровневым элементам архива
+            top_level = [os.path.join(target_dir, name) for name in {name.split('/')[0] for name in names}]
+            with quota.reserve(delta):
+                for target in targets:
+                    self.manager.prepare_write(target)
+                try:
+                    archive.extract_archive(archive_path, target_dir,
+                                            self.manager.archive_settings.get('workers'),
+                                            jobs.current_progress())
+                finally:
+                    # Прерванная распаковка тоже меняет дерево
+                    self.manager.track_change(*top_level)
             print(f"Распаковано в: {target_dir}")
         except Exception as e:
             print(f"Ошибка: {e}")
 
+    def _print_throughput(self, action, result, total_bytes, cached):
+        mb = total_bytes / (1024 * 1024)
+        read_mb = result.bytes / (1024 * 1024)
+        speed = mb / result.seconds if result.seconds > 0 else 0.0
+        print(f"{action}: {result.files} файлов, {mb:.1f} MB за {result.seconds:.2f} с ({speed:.1f} MB/s), "
+              f"прочитано {read_mb:.1f} MB, из кэша {cached} файлов")
+
+    def hash_files(self, patterns, algo='sha256', recursive=False, out=None):
+        """Параллельный подсчёт дайджестов файлов по путям и шаблонам.
+
+        Вывод (или манифест out) в формате sha256sum/b2sum, пути
+        относительно текущей директории (директории манифеста).
+        """
+        try:
+            algo = hashing.resolve_algorithm(algo)
+            cache = self.manager.digest_cache
+            # Директория без шаблона - все файлы её дерева
+            patterns = [os.path.join(p, '**', '*') if not bulk.has_wildcards(p) and os.path.isdir(p) else p
+                        for p in patterns]
+            results = []
+
+            def digest(match):
+                hexdigest, nbytes, size = cache.digest(match[0], algo)
+                results.append((match[0], hexdigest, size, nbytes))
+                return nbytes
+
+            matches = bulk.iter_matches(patterns, recursive)
+            if out:
+                # Старый манифест не должен попасть в новый
+                matches = (match for match in matches if os.path.abspath(match[0]) != os.path.abspath(out))
+            result = bulk.run_bulk(matches, digest, self.manager.workers, jobs.current_progress())
+            cache.maybe_save()
+            results.sort()
+            base = os.path.dirname(out) if out else self.manager.current_dir
+            lines = [f"{hexdigest}  {os.path.relpath(path, base)}" for path, hexdigest, _, _ in results]
+            if out:
+                self.write_file(out, ''.join(line + '\n' for line in lines))
+            else:
+                for line in lines:
+                    print(line)
+            self._print_throughput("Хэшировано", result, sum(r[2] for r in results),
+                                   sum(1 for r in results if r[3] == 0 and r[2] > 0))
+            result.report_failures()
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
+    def verify_manifest(self, manifest, use_cache=True):
+        """Проверить файлы по манифесту sha256sum/b2sum"""
+        try:
+            entries = hashing.parse_manifest(manifest)
+            cache = self.manager.digest_cache
+            sizes = []
+
+            def check(entry):
+                path, algo, expected = entry
+                # Пути манифеста (в т.ч. ../..) не должны выводить из рабочей области
+                path = self.manager.confine(path)
+                hexdigest, nbytes, size = cache.digest(path, algo, use_cache)
+                sizes.append((size, nbytes))
+                if hexdigest != expected:
+                    raise ValueError("контрольная сумма не совпадает")
+                return nbytes
+
+            result = bulk.run_bulk(((path, algo, hexdigest) for algo, hexdigest, path in entries), check,
+                                   self.manager.workers, jobs.current_progress())
+            cache.maybe_save()
+            self._print_throughput("Проверено", result, sum(size for size, _ in sizes),
+                                   sum(1 for size, nbytes in sizes if nbytes == 0 and size > 0))
+            if result.failed:
+                result.report_failures(f"не прошли проверку (из {len(entries)})",
+                                       os.path.dirname(os.path.abspath(manifest)))
+            else:
+                print(f"Все {len(entries)} файлов совпадают с манифестом")
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
+    def _sync_one(self, src, dest, dry_run):
+        """Синхронизировать файл с учётом квоты и индексов"""
+        if dry_run or not self.manager.in_workspace(dest):
+            return delta_sync.sync_file(src, dest, dry_run)
+        quota = self.manager.quota_manager
+        with quota.reserve(quota.write_delta(dest, tiering.logical_size(src))):
+            # Блоки меняются на месте - блоб дедупликации отвязываем с содержимым
+            self.manager.prepare_write(dest, keep_content=True)
+            result = delta_sync.sync_file(src, dest)
+            if result[0] != 'skip':
+                self.manager.track_change(dest)
+        return result
+
+    def sync(self, src, dest, dry_run=False):
+        """Дельта-синхронизация файла или дерева src в dest.
+
+        Файлы с теми же размером и mtime пропускаются, у изменённых
+        передаются только отличающиеся блоки (скользящая сумма как в
+        rsync), файлы обрабатываются параллельно.
+        """
+        try:
+            if not os.path.exists(src):
+                raise FileNotFoundError(f"Источник не существует: {src}")
+            counts = {'skip': 0, 'copy': 0, 'delta': 0, 'size': 0}
+            stats_lock = threading.Lock()
+            planned = []
+
+            def sync_pair(pair):
+                action, written, size = self._sync_one(pair[0], pair[1], dry_run)
+                with stats_lock:
+                    counts[action] += 1
+                    counts['size'] += size
+                    if dry_run and action != 'skip':
+                        planned.append((pair[1], action, written, size))
+                return written
+
+            result = bulk.run_bulk(delta_sync.iter_pairs(src, dest), sync_pair,
+                                   self.manager.workers, jobs.current_progress())
+            for path, action, written, size in sorted(planned):
+                print(f"  {action:<5} {path}: {written} из {size} байт")
+            mb = result.bytes / (1024 * 1024)
+            total_mb = counts['size'] / (1024 * 1024)
+            saved = 100 - result.bytes * 100 / counts['size'] if counts['size'] else 0.0
+            print(f"{'План синхронизации' if dry_run else 'Синхронизировано'}: "
+                  f"новых {counts['copy']}, изменённых {counts['delta']}, без изменений {counts['skip']}; "
+                  f"записано {mb:.1f} MB из {total_mb:.1f} MB (экономия {saved:.1f}%) за {result.seconds:.2f} с")
+            result.report_failures("не синхронизировано файлов")
+        except Exception as e:
+            print(f"Ошибка: {e}")
+
     def search_files(self, pattern, search_dir=None):
         """Поиск файлов по шаблону"""
         try:
             if search_dir is None:
                 search_dir = self.manager.current_dir
 
-            matches = []
-            for root, _, files in os.walk(search_dir):
-                for filename in fnmatch.filter(files, pattern):
-                    matches.append(os.path.join(root, filename))
+            if self.manager.in_workspace(search_dir):
+                # Поиск по индексу имён без обхода файловой системы
+                matches = self.manager.name_index.search(pattern, search_dir)
+            else:
+                matches = []
+                for root, _, files in traversal.walk(search_dir, self.manager.workers):
+                    for filename in fnmatch.filter(files, pattern):
+                        matches.append(os.path.join(root, filename))
+                matches.sort()
 
             if not matches:
                 print(f"Файлы по шаблону '{pattern}' не найдены")
@@ -121,4 +566,23 @@ class FileOperations:
                 print(f"- {match}")
 
         except Exception as e:
-            print(f"Ошибка поиска: {str(e)}")
\ No newline at end of file
+            print(f"Ошибка поиска: {str(e)}")
+
+    def find_text(self, query, search_dir=None):
+        """Полнотекстовый поиск по содержимому файлов"""
+        try:
+            if search_dir is None:
+                search_dir = self.manager.current_dir
+            results = self.manager.text_index.search(query, directory=search_dir)
+            if not results:
+                print(f"Текст '{query}' не найден")
+                return
+
+            print("Найдено в файлах:")
+            for path, score, lines in results:
+                shown = ', '.join(str(n) for n in lines[:10])
+                more = f" (+{len(lines) - 10})" if len(lines) > 10 else ""
+                print(f"- {path} [{score:.2f}] строки: {shown}{more}")
+
+        except Exception as e:
+            print(f"Ошибка поиска: {str(e)}")
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from . import tiering
+
+
+ALGORITHMS = ('sha256', 'blake2b')
+CHUNK_SIZE = 1024 * 1024
+# Длина hex-дайджеста -> алгоритм (формат sha256sum / b2sum)
+DIGEST_LENGTHS = {64: 'sha256', 128: 'blake2b'}
+# Файл, изменённый недавно, может измениться ещё раз в пределах того же
+# mtime_ns с тем же размером - такие дайджесты не кэшируем
+RACY_WINDOW = 2.0
+
+
+def resolve_algorithm(name):
+    name = (name or 'sha256').lower()
+    if name not in ALGORITHMS:
+        raise ValueError(f"Неизвестный алгоритм: {name}. Доступны: {', '.join(ALGORITHMS)}")
+    return name
+
+
+def hash_file(path, algo='sha256', chunk_size=CHUNK_SIZE):
+    """Дайджест файла, чтение блоками фиксированного размера.
+
+    hashlib отпускает GIL на больших блоках, поэтому файлы можно
+    хэшировать параллельно в потоках. Возвращает (hex, прочитано байт).
+    """
+    digest = hashlib.new(algo)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    total = 0
+    with tiering.open_read(path, buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+            total += n
+    return digest.hexdigest(), total
+
+
+class DigestCache:
+    """Кэш дайджестов файлов рабочей области (digests.json).
+
+    Запись файла хранит ключ (inode, размер, mtime_ns) и дайджесты по
+    алгоритмам; пока ключ совпадает с текущим stat, файл не читается.
+    Записи удалённых файлов убираются по событиям индекса рабочей
+    области.
+    """
+
+    VERSION = 1
+    SAVE_INTERVAL = 5.0
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, workspace_index, index_path):
+        """Получить общий кэш дайджестов для рабочей области"""
+        with cls._instances_lock:
+            cache = cls._instances.get(workspace_index.root)
+            if cache is None:
+                cache = cls(workspace_index, index_path)
+                cls._instances[workspace_index.root] = cache
+            return cache
+
+    def __init__(self, workspace_index, index_path):
+        self.root = workspace_index.root
+        self.index_path = index_path
+        self.lock = threading.RLock()
+        self.files = {}
+        self.dirty = False
+        self.last_save = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.load()
+        with workspace_index.lock:
+            workspace_index.listeners.append(self.on_change)
+
+    # --- Хранение ---
+
+    def load(self):
+        with self.lock:
+            try:
+                with open(self.index_path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return
+            if data.get('version') == self.VERSION and data.get('root') == self.root:
+                self.files = data.get('files', {})
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': self.VERSION, 'root': self.root, 'files': self.files}, f)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+            self.last_save = time.monotonic()
+
+    def maybe_save(self):
+        with self.lock:
+            if self.dirty and time.monotonic() - self.last_save >= self.SAVE_INTERVAL:
+                self.save()
+
+    def close(self):
+        with self.lock:
+            if self.dirty:
+                self.save()
+
+    def on_change(self, event, rel):
+        """Обработчик событий индекса рабочей области"""
+        if event == 'remove':
+            with self.lock:
+                if self.files.pop(rel, None) is not None:
+                    self.dirty = True
+
+    # --- Дайджесты ---
+
+    def _rel(self, path):
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == '..' or rel.startswith('..' + os.sep):
+            return None
+        return rel
+
+    def digest(self, path, algo='sha256', use_cache=True):
+        """Дайджест файла: (hex, прочитано байт, размер файла).
+
+        При попадании в кэш прочитано 0 байт.
+        """
+        st = os.stat(path)
+        key = [st.st_ino, st.st_size, st.st_mtime_ns]
+        rel = self._rel(path)
+        if rel is not None and use_cache:
+            with self.lock:
+                record = self.files.get(rel)
+                if record is not None and record['key'] == key and algo in record['digests']:
+                    self.hits += 1
+                    return record['digests'][algo], 0, st.st_size
+        with self.lock:
+            self.misses += 1
+        hexdigest, nbytes = hash_file(path, algo)
+        if rel is not None and time.time() - st.st_mtime_ns / 1e9 > RACY_WINDOW:
+            # Файл мог измениться во время чтения - сохраняем, только если stat тот же
+            after = os.stat(path)
+            if [after.st_ino, after.st_size, after.st_mtime_ns] == key:
+                with self.lock:
+                    record = self.files.get(rel)
+                    if record is None or record['key'] != key:
+                        record = self.files[rel] = {'key': key, 'digests': {}}
+                    record['digests'][algo] = hexdigest
+                    self.dirty = True
+        return hexdigest, nbytes, st.st_size
+
+
+def parse_manifest(path):
+    """Строки манифеста "<hex>  <путь>" (формат sha256sum/b2sum).
+
+    Пути относительны директории манифеста. Возвращает список
+    (алгоритм, hex, абсолютный путь).
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('#'):
+                continue
+            hexdigest, sep, name = line.partition(' ')
+            algo = DIGEST_LENGTHS.get(len(hexdigest))
+            if not sep or algo is None:
+                raise ValueError(f"Строка {lineno} манифеста не распознана: {line}")
+            # Второй символ - режим: пробел (текст) или '*' (бинарный)
+            name = name[1:] if name[:1] in (' ', '*') else name
+            entries.append((algo, hexdigest.lower(), os.path.join(base, name)))
+    return entries
@@ -0,0 +1,221 @@
+import os
+import io
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .capture import capture_output
+
+
+class JobCancelled(BaseException):
+    """Задача отменена командой cancel.
+
+    Наследуется от BaseException, чтобы пройти сквозь обработчики
+    except Exception в операциях и остановить команду целиком.
+    """
+
+
+_local = threading.local()
+
+
+def current_progress():
+    """Колбэк progress(файлы, байты) задачи текущего потока или None.
+
+    Операции вызывают его по ходу работы, он же проверяет отмену,
+    поэтому колбэк можно передавать в потоки пула операции.
+    """
+    job = getattr(_local, 'job', None)
+    return job.progress if job is not None else None
+
+
+class Job:
+    """Фоновая задача: команда менеджера, её вывод и прогресс"""
+
+    def __init__(self, job_id, command, paths, exclusive):
+        self.id = job_id
+        self.command = command
+        self.paths = paths
+        self.exclusive = exclusive
+        self.status = 'queued'
+        self.files = 0
+        self.bytes = 0
+        self.output = io.StringIO()
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.reported = False
+        self.cancel_requested = threading.Event()
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+    def progress(self, files=0, nbytes=0):
+        with self.lock:
+            self.files += files
+            self.bytes += nbytes
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self.cancel_requested.is_set():
+            raise JobCancelled(f"Задача {self.id} отменена")
+
+    @property
+    def active(self):
+        return not self.done.is_set()
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def summary(self):
+        mb = self.bytes / (1024 * 1024)
+        return (f"[{self.id}] {self.status:<9} {self.files} файлов, {mb:.1f} MB, "
+                f"{self.elapsed():.1f} с  {self.command}")
+
+
+class PathLocks:
+    """Блокировки путей для задач.
+
+    Пути конфликтуют, если совпадают или один вложен в другой.
+    Читающие задачи совместимы между собой, изменяющие - ни с кем.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.held = []  # (пути, exclusive)
+
+    @staticmethod
+    def _overlap(a, b):
+        return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+    def _conflicts(self, paths, exclusive):
+        for held_paths, held_exclusive in self.held:
+            if not (exclusive or held_exclusive):
+                continue
+            if any(self._overlap(a, b) for a in paths for b in held_paths):
+                return True
+        return False
+
+    def acquire(self, paths, exclusive=True, cancelled=None):
+        """Дождаться, пока пути освободятся; None, если задачу отменили"""
+        record = (paths, exclusive)
+        with self.condition:
+            while self._conflicts(paths, exclusive):
+                if cancelled is not None and cancelled.is_set():
+                    return None
+                self.condition.wait(0.5)
+            self.held.append(record)
+        return record
+
+    def release(self, record):
+        with self.condition:
+            self.held.remove(record)
+            self.condition.notify_all()
+
+
+class JobQueue:
+    """Очередь фоновых задач на пуле потоков.
+
+    run(command) - функция, выполняющая строку команды в текущем потоке;
+    её вывод перехватывается в буфер задачи. Задача считается неуспешной,
+    если выбросила исключение или вывела строку, начинающуюся с "Ошибка".
+    """
+
+    def __init__(self, run, workers=2):
+        self.run = run
+        self.executor = ThreadPoolExecutor(max_workers=max(int(workers or 1), 1),
+                                           thread_name_prefix='job')
+        self.locks = PathLocks()
+        self.jobs = {}
+        self.next_id = 1
+        self.lock = threading.Lock()
+
+    def submit(self, command, paths, exclusive=True, setup=None):
+        """Поставить команду в очередь; setup() вызывается в потоке задачи"""
+        with self.lock:
+            job = Job(self.next_id, command, [os.path.abspath(p) for p in paths], exclusive)
+            self.jobs[job.id] = job
+            self.next_id += 1
+        self.executor.submit(self._execute, job, setup)
+        return job
+
+    def _execute(self, job, setup):
+        record = None
+        try:
+            if job.cancel_requested.is_set():
+                job.status = 'cancelled'
+                return
+            job.status = 'waiting'
+            record = self.locks.acquire(job.paths, job.exclusive, job.cancel_requested)
+            if record is None:
+                job.status = 'cancelled'
+                return
+            job.status = 'running'
+            job.started = time.time()
+            _local.job = job
+            ok = True
+            with capture_output(job.output):
+                try:
+                    if setup is not None:
+                        setup()
+                    self.run(job.command)
+                except JobCancelled:
+                    job.status = 'cancelled'
+                    return
+                except SystemExit:
+                    pass
+                except Exception as e:
+                    print(f"Ошибка: {str(e)}")
+                    ok = False
+            if job.cancel_requested.is_set():
+                job.status = 'cancelled'
+                return
+            output = job.output.getvalue()
+            if any(row.startswith('Ошибка') for row in output.splitlines()):
+                ok = False
+            job.status = 'done' if ok else 'failed'
+        finally:
+            _local.job = None
+            if record is not None:
+                self.locks.release(record)
+            job.finished = time.time()
+            job.done.set()
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Нет задачи с номером {job_id}")
+        return job
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def active(self):
+        return [job for job in self.list() if job.active]
+
+    def wait(self, job_id, timeout=None):
+        job = self.get(job_id)
+        job.done.wait(timeout)
+        job.reported = True
+        return job
+
+    def cancel(self, job_id):
+        """Запросить отмену: задача в очереди не запустится, выполняющаяся
+        остановится на ближайшей проверке прогресса"""
+        job = self.get(job_id)
+        if job.active:
+            job.cancel_requested.set()
+        return job
+
+    def take_finished(self):
+        """Завершившиеся задачи, о которых ещё не сообщали"""
+        finished = []
+        for job in self.list():
+            if not job.active and not job.reported:
+                job.reported = True
+                finished.append(job)
+        return finished
+
+    def shutdown(self):
+        """Дождаться выполнения всех задач и остановить пул"""
+        self.executor.shutdown(wait=True)
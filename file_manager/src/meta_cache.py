@@ -0,0 +1,352 @@
+import os
+import sys
+import stat
+import errno
+import struct
+import ctypes
+import ctypes.util
+import threading
+from collections import OrderedDict, namedtuple
+
+
+Entry = namedtuple('Entry', 'name is_dir is_symlink size mtime_ns')
+
+# Маски inotify из linux/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+ENTRY_OVERHEAD = 200  # примерный размер записи в памяти без имени, байт
+
+
+class Inotify:
+    """Минимальная обёртка над inotify через ctypes (только Linux)"""
+
+    def __init__(self):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify доступен только в Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Блокирующее чтение пачки событий: список (wd, mask, name)"""
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+
+class MetaCache:
+    """Кэш метаданных директорий в памяти процесса.
+
+    Для каждой директории хранится снимок её записей (тип, размер,
+    mtime), по нему отвечают ls, cd и проверки существования файлов без
+    повторных системных вызовов. Вытеснение - LRU с ограничением по
+    оценке занимаемой памяти. Снимки сбрасываются по событиям inotify,
+    а если inotify недоступен или кончились watch-дескрипторы - по
+    изменению mtime директории при каждом обращении (такая проверка не
+    замечает изменения содержимого файлов без изменения директории).
+    Собственные изменения менеджер сбрасывает сразу через invalidate().
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, root, max_bytes=64 * 1024 * 1024, use_inotify=True):
+        """Получить общий кэш для корня рабочих областей"""
+        root = os.path.abspath(root)
+        with cls._instances_lock:
+            cache = cls._instances.get(root)
+            if cache is None:
+                cache = cls(root, max_bytes, use_inotify)
+                cls._instances[root] = cache
+            return cache
+
+    def __init__(self, root, max_bytes=64 * 1024 * 1024, use_inotify=True):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # путь -> {'entries': {имя: Entry}, 'mtime_ns', 'wd', 'bytes'}
+        self.dirs = OrderedDict()
+        self.watches = {}  # wd -> путь
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError):
+                self.inotify = None
+            else:
+                threading.Thread(target=self._watch_loop, daemon=True, name='meta-cache-inotify').start()
+
+    @property
+    def mode(self):
+        return 'inotify' if self.inotify is not None else 'mtime'
+
+    def covers(self, path):
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    # --- inotify ---
+
+    def _watch_loop(self):
+        while True:
+            try:
+                events = self.inotify.read_events()
+            except InterruptedError:
+                continue
+            except OSError:
+                return
+            with self.lock:
+                for wd, mask, _ in events:
+                    if mask & IN_Q_OVERFLOW:
+                        # События потеряны - доверять снимкам нельзя
+                        for path in list(self.dirs):
+                            self._drop(path)
+                        continue
+                    path = self.watches.get(wd)
+                    if path is None:
+                        continue
+                    if mask & IN_IGNORED:
+                        self.watches.pop(wd, None)
+                        record = self.dirs.get(path)
+                        if record is not None:
+                            record['wd'] = None
+                    self.invalidations += 1
+                    self._drop(path)
+
+    def _watch(self, path):
+        if self.inotify is None:
+            return None
+        try:
+            wd = self.inotify.add_watch(path)
+        except OSError:
+            # Например, ENOSPC: исчерпан лимит watch - проверяем по mtime
+            return None
+        self.watches[wd] = path
+        return wd
+
+    # --- хранение ---
+
+    def _drop(self, path):
+        record = self.dirs.pop(path, None)
+        if record is None:
+            return
+        self.bytes -= record['bytes']
+        wd = record['wd']
+        if wd is not None and self.watches.get(wd) == path:
+            del self.watches[wd]
+            self.inotify.rm_watch(wd)
+
+    def _store(self, path, entries, mtime_ns, size):
+        with self.lock:
+            self._drop(path)
+            wd = self._watch(path)
+            # Изменение между чтением и установкой watch не попало бы в события
+            try:
+                changed = os.stat(path).st_mtime_ns != mtime_ns
+            except OSError:
+                changed = True
+            if changed:
+                if wd is not None:
+                    del self.watches[wd]
+                    self.inotify.rm_watch(wd)
+                return
+            self.dirs[path] = {'entries': entries, 'mtime_ns': mtime_ns, 'wd': wd, 'bytes': size}
+            self.bytes += size
+            while self.bytes > self.max_bytes and self.dirs:
+                self._drop(next(iter(self.dirs)))
+                self.evictions += 1
+
+    def _lookup(self, path):
+        """Снимок директории из кэша или None (с проверкой актуальности)"""
+        with self.lock:
+            record = self.dirs.get(path)
+            if record is None:
+                self.misses += 1
+                return None
+            wd = record['wd']
+        if wd is None:
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if mtime_ns != record['mtime_ns']:
+                with self.lock:
+                    if self.dirs.get(path) is record:
+                        self._drop(path)
+                    self.misses += 1
+                return None
+        with self.lock:
+            self.hits += 1
+            if path in self.dirs:
+                self.dirs.move_to_end(path)
+        return record['entries']
+
+    @staticmethod
+    def _entry(dir_entry):
+        try:
+            st = dir_entry.stat(follow_symlinks=False)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        except OSError:
+            size, mtime_ns = 0, 0
+        try:
+            is_dir = dir_entry.is_dir()
+        except OSError:
+            is_dir = False
+        return Entry(dir_entry.name, is_dir, dir_entry.is_symlink(), size, mtime_ns)
+
+    # --- публичный интерфейс ---
+
+    def scan(self, path):
+        """Записи директории (Entry): из кэша или потоково из os.scandir.
+
+        Снимок сохраняется, только если директория прочитана до конца.
+        """
+        path = os.path.abspath(path)
+        if not self.covers(path):
+            with os.scandir(path) as it:
+                for dir_entry in it:
+                    yield self._entry(dir_entry)
+            return
+        entries = self._lookup(path)
+        if entries is not None:
+            yield from list(entries.values())
+            return
+        yield from self._scan_uncached(path)
+
+    def _scan_uncached(self, path):
+        # mtime до чтения: изменение во время чтения сбросит снимок
+        mtime_ns = os.stat(path).st_mtime_ns
+        collected = {}
+        size = ENTRY_OVERHEAD
+        with os.scandir(path) as it:
+            for dir_entry in it:
+                entry = self._entry(dir_entry)
+                if collected is not None:
+                    size += ENTRY_OVERHEAD + len(entry.name)
+                    if size > self.max_bytes // 4:
+                        # Одна огромная директория не должна вытеснять весь кэш;
+                        # не кэшируется - не держим и записи (ls --limit потоковый)
+                        collected = None
+                    else:
+                        collected[entry.name] = entry
+                yield entry
+        if collected is not None:
+            self._store(path, collected, mtime_ns, size)
+
+    def listing(self, path):
+        """Все записи директории словарём имя -> Entry"""
+        path = os.path.abspath(path)
+        if self.covers(path):
+            entries = self._lookup(path)
+            if entries is not None:
+                return entries
+        return {entry.name: entry for entry in self._scan_uncached(path)}
+
+    def stat(self, path):
+        """Entry для пути по снимку родительской директории или None"""
+        path = os.path.abspath(path)
+        parent, name = os.path.split(path)
+        entries = self._lookup(parent) if name and self.covers(parent) else None
+        if entries is None:
+            # Родитель не в кэше: один stat дешевле чтения всей директории
+            return self._stat_entry(path, name or path)
+        entry = entries.get(name)
+        if entry is not None and entry.is_symlink:
+            # Для ссылки важна цель, а не сама ссылка
+            return self._stat_entry(path, name)
+        return entry
+
+    @staticmethod
+    def _stat_entry(path, name):
+        """Entry по os.stat (для ссылки - по цели) или None"""
+        try:
+            is_symlink = os.path.islink(path)
+            st = os.stat(path)
+        except OSError:
+            return None
+        return Entry(name, stat.S_ISDIR(st.st_mode), is_symlink, st.st_size, st.st_mtime_ns)
+
+    def exists(self, path):
+        return self.stat(path) is not None
+
+    def isdir(self, path):
+        entry = self.stat(path)
+        return entry is not None and entry.is_dir
+
+    def isfile(self, path):
+        entry = self.stat(path)
+        return entry is not None and not entry.is_dir
+
+    def getsize(self, path):
+        entry = self.stat(path)
+        if entry is None:
+            raise FileNotFoundError(errno.ENOENT, "Файл не существует", path)
+        return entry.size
+
+    def invalidate(self, *paths):
+        """Сбросить снимки путей и их родительских директорий"""
+        with self.lock:
+            for path in paths:
+                path = os.path.abspath(path)
+                self._drop(path)
+                self._drop(os.path.dirname(path))
+                self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'mode': self.mode,
+                'dirs': len(self.dirs),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'watches': len(self.watches),
+            }
+
+    def clear(self):
+        with self.lock:
+            for path in list(self.dirs):
+                self._drop(path)
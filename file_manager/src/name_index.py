@@ -0,0 +1,120 @@
+import os
+import bisect
+import fnmatch
+import threading
+
+
+WILDCARDS = '*?['
+
+
+class NameIndex:
+    """Индекс имён файлов для поиска без обращения к файловой системе.
+
+    Строится из персистентного индекса рабочей области и обновляется по
+    его событиям. Хранит отсортированный список имён (префиксы),
+    отсортированный список перевёрнутых имён (суффиксы) и словарь
+    расширений.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, workspace_index):
+        """Получить общий индекс имён для рабочей области"""
+        with cls._instances_lock:
+            index = cls._instances.get(workspace_index.root)
+            if index is None:
+                index = cls(workspace_index)
+                cls._instances[workspace_index.root] = index
+            return index
+
+    def __init__(self, workspace_index):
+        self.workspace_index = workspace_index
+        self.root = workspace_index.root
+        self.lock = threading.RLock()
+        with workspace_index.lock:
+            self.build(rel for rel, _ in workspace_index.files())
+            workspace_index.listeners.append(self.on_change)
+
+    @staticmethod
+    def _ext(name):
+        dot = name.rfind('.')
+        return name[dot:] if dot >= 0 else ''
+
+    def build(self, rel_paths):
+        """Построить индекс по списку относительных путей"""
+        with self.lock:
+            self.names = []
+            self.reversed_names = []
+            self.extensions = {}
+            for rel in rel_paths:
+                name = os.path.basename(rel)
+                self.names.append((name, rel))
+                self.reversed_names.append((name[::-1], rel))
+                self.extensions.setdefault(self._ext(name), set()).add(rel)
+            self.names.sort()
+            self.reversed_names.sort()
+
+    def add(self, rel):
+        name = os.path.basename(rel)
+        with self.lock:
+            bisect.insort(self.names, (name, rel))
+            bisect.insort(self.reversed_names, (name[::-1], rel))
+            self.extensions.setdefault(self._ext(name), set()).add(rel)
+
+    def remove(self, rel):
+        name = os.path.basename(rel)
+        with self.lock:
+            for items, key in ((self.names, (name, rel)), (self.reversed_names, (name[::-1], rel))):
+                pos = bisect.bisect_left(items, key)
+                if pos < len(items) and items[pos] == key:
+                    del items[pos]
+            paths = self.extensions.get(self._ext(name))
+            if paths is not None:
+                paths.discard(rel)
+                if not paths:
+                    del self.extensions[self._ext(name)]
+
+    def on_change(self, event, rel):
+        """Обработчик событий индекса рабочей области"""
+        if event == 'add':
+            self.add(rel)
+        elif event == 'remove':
+            self.remove(rel)
+
+    @staticmethod
+    def _range(items, prefix):
+        """Элементы отсортированного списка, ключ которых начинается с prefix"""
+        start = bisect.bisect_left(items, (prefix,))
+        for pos in range(start, len(items)):
+            key, rel = items[pos]
+            if not key.startswith(prefix):
+                break
+            yield rel
+
+    def _candidates(self, pattern):
+        """Кандидаты для шаблона, отобранные по структуре индекса"""
+        first = min((pattern.find(c) for c in WILDCARDS if c in pattern), default=-1)
+        if first < 0:
+            # Точное имя
+            return self._range(self.names, pattern)
+        rest = pattern[1:]
+        if pattern[0] == '*' and not any(c in rest for c in WILDCARDS):
+            # *.ext - по словарю расширений, *suffix - по перевёрнутым именам
+            if rest.startswith('.') and rest.count('.') == 1:
+                return list(self.extensions.get(rest, ()))
+            return self._range(self.reversed_names, rest[::-1])
+        # Общий случай: сужаем по буквальному префиксу шаблона
+        return self._range(self.names, pattern[:first])
+
+    def search(self, pattern, search_dir=None):
+        """Найти файлы по glob-шаблону имени, вернуть абсолютные пути"""
+        base = os.path.relpath(os.path.abspath(search_dir or self.root), self.root)
+        prefix = '' if base == '.' else base + os.sep
+        with self.lock:
+            matches = [
+                rel for rel in self._candidates(pattern)
+                if rel.startswith(prefix) and fnmatch.fnmatch(os.path.basename(rel), pattern)
+            ]
+        return sorted(os.path.join(self.root, rel) for rel in matches)
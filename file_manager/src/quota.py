@@ -0,0 +1,107 @@
+import os
+import threading
+from contextlib import contextmanager
+from . import tiering
+
+
+class QuotaExceededError(ValueError):
+    """Операция превысила бы квоту пользователя"""
+
+
+class QuotaManager:
+    """Учёт занятого места и проверка квоты до записи на диск.
+
+    Занятый объём берётся из индекса размеров (O(1)), а байты операций,
+    которые ещё выполняются, учитываются как резерв в памяти, чтобы
+    параллельные операции не превысили квоту вместе.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, size_index, limit):
+        """Получить общий учёт квоты для рабочей области"""
+        with cls._instances_lock:
+            quota = cls._instances.get(size_index.root)
+            if quota is None:
+                quota = cls(size_index, limit)
+                cls._instances[size_index.root] = quota
+            quota.limit = limit
+            return quota
+
+    def __init__(self, size_index, limit):
+        self.size_index = size_index
+        self.limit = limit
+        self.reserved = 0
+        self.lock = threading.Lock()
+        # Корзина: удалённое, но ещё не очищенное с диска, занимает квоту
+        self.trash = None
+
+    def used(self):
+        """Занятый объём в байтах"""
+        used = self.size_index.total() or 0
+        if self.trash is not None:
+            used += self.trash.pending_bytes()
+        return used
+
+    def available(self):
+        with self.lock:
+            return max(self.limit - self.used() - self.reserved, 0)
+
+    @contextmanager
+    def reserve(self, nbytes):
+        """Зарезервировать место под операцию или выбросить QuotaExceededError"""
+        nbytes = max(nbytes, 0)
+        with self.lock:
+            free = self.limit - self.used() - self.reserved
+            if nbytes > free:
+                raise QuotaExceededError(
+                    f"Превышена квота: требуется {nbytes / 1024:.1f} KB, "
+                    f"доступно {max(free, 0) / 1024:.1f} KB"
+                )
+            self.reserved += nbytes
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.reserved -= nbytes
+
+    @staticmethod
+    def file_size(path):
+        """Размер существующего файла или 0"""
+        try:
+            return os.path.getsize(path) if os.path.isfile(path) else 0
+        except OSError:
+            return 0
+
+    def write_delta(self, path, nbytes, append=False):
+        """Прирост занятого места при записи nbytes в файл"""
+        return nbytes if append else nbytes - self.file_size(path)
+
+    def copy_delta(self, src, dest):
+        """Прирост занятого места при копировании файла"""
+        if os.path.isdir(dest):
+            dest = os.path.join(dest, os.path.basename(src))
+        return self.file_size(src) - self.file_size(dest)
+
+    def extract_delta(self, zipf, target_dir):
+        """Прирост при распаковке по заявленным несжатым размерам архива"""
+        delta = 0
+        for info in zipf.infolist():
+            if info.is_dir():
+                continue
+            delta += info.file_size
+            delta -= self.file_size(os.path.join(target_dir, info.filename))
+        return delta
+
+    def archive_delta(self, entries, archive_path):
+        """Верхняя оценка размера архива по записям (путь, имя в архиве)"""
+        delta = 22  # запись конца центрального каталога
+        for path, arcname in entries:
+            name_len = len(arcname.encode('utf-8'))
+            # Локальный заголовок, запись каталога и запас на несжимаемые данные;
+            # холодный файл попадает в архив распакованным
+            size = tiering.logical_size(path) if os.path.isfile(path) else 0
+            delta += size + (size >> 10) + 76 + 2 * name_len
+        return delta - self.file_size(archive_path)
@@ -0,0 +1,125 @@
+import os
+import mmap
+import codecs
+from . import tiering
+
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_SIZE = 8192
+
+
+def is_binary(sample):
+    """Эвристика: нулевые байты или невалидный UTF-8 в начале файла"""
+    if b'\0' in sample:
+        return True
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # Обрезанный в конце выборки многобайтовый символ - не признак бинарности
+        return e.start < len(sample) - 3
+    return False
+
+
+def sniff(path):
+    with tiering.open_read(path) as f:
+        return is_binary(f.read(SNIFF_SIZE))
+
+
+def iter_chunks(f, length=None, chunk_size=CHUNK_SIZE):
+    """Читать открытый файл блоками фиксированного размера"""
+    remaining = length
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        chunk = f.read(size)
+        if not chunk:
+            break
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+
+def iter_text(chunks):
+    """Декодировать поток байтов в текст, не разрывая символы UTF-8"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def hexdump(chunks, offset=0):
+    """Строки шестнадцатеричного дампа по 16 байт"""
+    pending = b''
+    for chunk in chunks:
+        pending += chunk
+        while len(pending) >= 16:
+            line, pending = pending[:16], pending[16:]
+            yield _hex_line(offset, line)
+            offset += 16
+    if pending:
+        yield _hex_line(offset, pending)
+
+
+def _hex_line(offset, data):
+    hex_part = ' '.join(f"{b:02x}" for b in data)
+    text_part = ''.join(chr(b) if 32 <= b < 127 else '.' for b in data)
+    return f"{offset:08x}  {hex_part:<47}  {text_part}"
+
+
+def head_offset(f, lines):
+    """Смещение конца первых lines строк"""
+    count = 0
+    offset = 0
+    for chunk in iter_chunks(f):
+        start = 0
+        while count < lines:
+            pos = chunk.find(b'\n', start)
+            if pos < 0:
+                break
+            count += 1
+            start = pos + 1
+        if count >= lines:
+            return offset + start
+        offset += len(chunk)
+    return offset
+
+
+def tail_offset(f, lines):
+    """Смещение начала последних lines строк, чтение блоками с конца"""
+    end = f.seek(0, os.SEEK_END)
+    pos = end
+    count = 0
+    # Завершающий перевод строки не начинает новую строку
+    if end:
+        f.seek(end - 1)
+        if f.read(1) == b'\n':
+            count = -1
+    while pos > 0:
+        size = min(CHUNK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        chunk = f.read(size)
+        idx = len(chunk)
+        while True:
+            idx = chunk.rfind(b'\n', 0, idx)
+            if idx < 0:
+                break
+            count += 1
+            if count >= lines:
+                return pos + idx + 1
+    return 0
+
+
+def iter_mmap(path, offset, length, chunk_size=CHUNK_SIZE):
+    """Блоки диапазона файла через mmap (произвольный доступ без seek)"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if offset >= size or length <= 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = min(offset + length, size)
+            for pos in range(offset, end, chunk_size):
+                yield mm[pos:min(pos + chunk_size, end)]
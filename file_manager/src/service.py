@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from .core import FileManager
+from .capture import capture_output
+from . import tiering
+from . import upload
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+class FileService:
+    """Сетевой сервис файлового менеджера на asyncio.
+
+    Протокол строковый (UTF-8), каждый ответ - одна JSON-строка:
+        LOGIN <user> <password> | TOKEN <token>  - вход, в ответе токен сессии
+        GET <path>          - ответ {"ok", "size"}, затем size байт файла
+        PUT <path> <size> [@<offset>] - после строки клиент шлёт байты
+                              с offset до size, затем ответ
+        RESUME <path> <size> - ответ {"ok", "offset"}: с какого байта
+                              продолжить прерванный PUT того же размера
+        QUIT                - закрыть соединение
+        <команда менеджера> - ответ {"ok", "output", "ms"}
+
+    У каждого соединения свой FileManager (текущая директория, рабочая
+    область), блокирующие операции выполняются в ограниченном пуле потоков.
+    PUT пишет через upload.Upload: при обрыве соединения принятое
+    сохраняется, и клиент продолжает с RESUME-смещения.
+    """
+
+    def __init__(self, config, user_manager, workers=None):
+        self.config = config
+        self.user_manager = user_manager
+        service_config = config.get('service', {})
+        self.workers = workers or service_config.get('workers', 32)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.slots = None
+        # FileManager открытых соединений (у пользователя их может быть несколько)
+        self.managers = set()
+        # Назначения идущих PUT: две загрузки в один файл делили бы один .part
+        self.receiving = set()
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8765, backlog=1024):
+        # Семафор ограничивает число команд в очереди пула
+        self.slots = asyncio.Semaphore(self.workers * 2)
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=backlog,
+                                                 limit=CHUNK_SIZE)
+        return self.server
+
+    async def serve_forever(self, host='127.0.0.1', port=8765, backlog=1024):
+        server = await self.start(host, port, backlog)
+        print(f"Файловый сервис запущен на {host}:{server.sockets[0].getsockname()[1]}")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """Сохранить индексы пользователей и остановить пул"""
+        for manager in list(self.managers):
+            manager.close()
+        self.managers.clear()
+        self.executor.shutdown(wait=False)
+
+    async def run_blocking(self, func, *args):
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    @staticmethod
+    async def send(writer, payload):
+        writer.write(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        manager = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode('utf-8', errors='replace').strip()
+                if not line:
+                    continue
+                verb, _, rest = line.partition(' ')
+                verb = verb.upper()
+                if verb == 'QUIT':
+                    break
+                if manager is None:
+                    manager = await self.authenticate(verb, rest, writer)
+                elif verb == 'GET':
+                    await self.send_file(manager, rest, writer)
+                elif verb == 'PUT':
+                    await self.receive_file(manager, rest, reader, writer)
+                elif verb == 'RESUME':
+                    await self.resume_offset(manager, rest, writer)
+                else:
+                    await self.execute(manager, line, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            if manager is not None:
+                await self.close_manager(manager)
+
+    async def close_manager(self, manager):
+        """Сохранить индексы сессии и дождаться её фоновых задач"""
+        if manager not in self.managers:
+            return  # уже закрыт в FileService.close
+        self.managers.discard(manager)
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, manager.close)
+        except RuntimeError:
+            # Пул уже остановлен (сервис закрывается) - закрываем здесь же
+            manager.close()
+
+    async def authenticate(self, verb, rest, writer):
+        if verb == 'LOGIN':
+            username, _, password = rest.partition(' ')
+            verified = await self.run_blocking(self.user_manager.verify_password, username, password)
+            if not verified:
+                await self.send(writer, {'ok': False, 'error': "Неверное имя пользователя или пароль"})
+                return None
+        elif verb == 'TOKEN':
+            username = await self.run_blocking(self.user_manager.verify_token, rest)
+            if username is None:
+                await self.send(writer, {'ok': False, 'error': "Токен недействителен или истёк"})
+                return None
+        else:
+            await self.send(writer, {'ok': False, 'error': "Требуется вход: LOGIN или TOKEN"})
+            return None
+
+        user = self.user_manager.get_user(username)
+        manager = await self.run_blocking(FileManager, self.config, username, user.get('plan', 'default'))
+        manager.confined = True
+        self.managers.add(manager)
+        await self.send(writer, {'ok': True, 'user': username,
+                                 'token': self.user_manager.issue_token(username)})
+        return manager
+
+    def _execute(self, manager, line):
+        ok = True
+        with capture_output() as buffer:
+            try:
+                manager.execute(line)
+            except SystemExit:
+                pass
+            except Exception as e:
+                print(f"Ошибка: {str(e)}")
+                ok = False
+        output = buffer.getvalue()
+        if any(row.startswith('Ошибка') for row in output.splitlines()):
+            ok = False
+        return ok, output
+
+    async def execute(self, manager, line, writer):
+        start = time.perf_counter()
+        ok, output = await self.run_blocking(self._execute, manager, line)
+        await self.send(writer, {'ok': ok, 'output': output,
+                                 'ms': round((time.perf_counter() - start) * 1000, 3)})
+
+    async def send_file(self, manager, path_arg, writer):
+        """Отдать файл клиенту блоками, не загружая его в память целиком"""
+        try:
+            path = manager.process_path_args([path_arg])
+            # Холодный файл отдаётся распакованным
+            f = await self.run_blocking(tiering.open_read, path)
+        except Exception as e:
+            await self.send(writer, {'ok': False, 'error': str(e)})
+            return
+        try:
+            size = await self.run_blocking(f.seek, 0, os.SEEK_END)
+            await self.run_blocking(f.seek, 0)
+            await self.send(writer, {'ok': True, 'size': size})
+            remaining = size
+            while remaining > 0:
+                chunk = await self.run_blocking(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                writer.write(chunk)
+                await writer.drain()
+            # Файл укоротился во время чтения - дополняем, чтобы не сломать протокол
+            if remaining > 0:
+                writer.write(bytes(remaining))
+                await writer.drain()
+        finally:
+            f.close()
+
+    @staticmethod
+    def _parse_put(manager, rest):
+        """(путь, размер, смещение) из '<path> <size> [@<offset>]'"""
+        offset = 0
+        head, _, last = rest.rpartition(' ')
+        if last.startswith('@'):
+            offset = int(last[1:])
+            rest = head
+        path_arg, size = rest.rsplit(' ', 1)
+        size = int(size)
+        if not 0 <= offset <= size:
+            raise ValueError(f"Смещение {offset} вне файла размером {size}")
+        return manager.process_path_args([path_arg]), size, offset
+
+    async def resume_offset(self, manager, rest, writer):
+        try:
+            path, size, _ = self._parse_put(manager, rest)
+        except ValueError as e:
+            await self.send(writer, {'ok': False, 'error': f"Ожидается RESUME <path> <size>: {e}"})
+            return
+        offset = await self.run_blocking(upload.committed_offset, manager.upload_dir, path, size)
+        await self.send(writer, {'ok': True, 'offset': offset})
+
+    async def receive_file(self, manager, rest, reader, writer):
+        """Принять файл блоками в .part загрузки и атомарно заменить цель"""
+        try:
+            path, size, offset = self._parse_put(manager, rest)
+        except ValueError as e:
+            await self.send(writer, {'ok': False, 'error': f"Ожидается PUT <path> <size> [@<offset>]: {e}"})
+            return
+        quota = manager.quota_manager
+        received = offset
+        transfer = None
+        try:
+            if path in self.receiving:
+                raise ValueError(f"В {path} уже идёт загрузка")
+            self.receiving.add(path)
+            try:
+                with quota.reserve(quota.write_delta(path, size)):
+                    transfer = await self.run_blocking(upload.Upload, manager.upload_dir, path, size)
+                    if offset > transfer.offset:
+                        committed = transfer.offset
+                        # Принятое раньше остаётся - клиент продолжит с верного смещения
+                        await self.run_blocking(transfer.suspend)
+                        transfer = None
+                        raise ValueError(f"Принято только {committed} байт, продолжите с @{committed}")
+                    await self.run_blocking(transfer.truncate, offset)
+                    while received < size:
+                        chunk = await reader.readexactly(min(CHUNK_SIZE, size - received))
+                        await self.run_blocking(transfer.write, chunk)
+                        received += len(chunk)
+                    await self.run_blocking(self._commit_upload, manager, transfer)
+            finally:
+                self.receiving.discard(path)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # Обрыв соединения: принятое фиксируется для RESUME
+            if transfer is not None:
+                await self.run_blocking(transfer.suspend)
+            raise
+        except Exception as e:
+            if transfer is not None:
+                await self.run_blocking(transfer.abort)
+            # Клиент уже отправляет данные - дочитываем их, чтобы не сбить протокол
+            while received < size:
+                received += len(await reader.readexactly(min(CHUNK_SIZE, size - received)))
+            await self.send(writer, {'ok': False, 'error': str(e)})
+            return
+        await self.send(writer, {'ok': True, 'size': size})
+
+    @staticmethod
+    def _commit_upload(manager, transfer):
+        manager.prepare_write(transfer.dest)
+        transfer.commit()
+        manager.track_change(transfer.dest)
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from . import capture
+
+
+# Гистограмма задержек в духе HdrHistogram: значения в микросекундах,
+# каждая степень двойки делится на 2^SUB_BITS равных интервалов, поэтому
+# относительная ошибка перцентиля не больше 1/2^SUB_BITS (~3%) при любом
+# разбросе - от микросекунд до часов - и фиксированной памяти.
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS
+PERCENTILES = (50, 90, 99)
+
+_local = threading.local()
+_io_lock = threading.Lock()
+
+
+def _bucket(value):
+    """Номер интервала для значения (значения меньше 2 * SUB_COUNT - точные)"""
+    if value < 2 * SUB_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BITS - 1
+    return shift * SUB_COUNT + (value >> shift)
+
+
+def _bucket_range(index):
+    """Границы интервала [low, high] по его номеру"""
+    if index < 2 * SUB_COUNT:
+        return index, index
+    shift = index // SUB_COUNT - 1
+    mantissa = index - shift * SUB_COUNT
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    """Гистограмма задержек (микросекунды) с логарифмическими интервалами"""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        value = max(int(value), 0)
+        index = _bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def percentile(self, p):
+        """Значение, не меньше которого p% записей (верхняя граница интервала)"""
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * p // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_bucket_range(index)[1], self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def buckets(self):
+        """Непустые интервалы: [low, high, число записей]"""
+        return [[*_bucket_range(index), self.counts[index]] for index in sorted(self.counts)]
+
+
+def io_counters(scope='self'):
+    """Байты, прочитанные и записанные процессом (rchar, wchar из /proc).
+
+    Считаются на уровне системных вызовов, включая sendfile и
+    copy_file_range. scope='thread-self' - счётчики только текущего
+    потока. Возвращает (прочитано, записано, длина ответа /proc - её
+    чтение тоже попадает в rchar) или None вне Linux.
+    """
+    try:
+        fd = os.open(f'/proc/{scope}/io', os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        data = os.read(fd, 4096)
+    finally:
+        os.close(fd)
+    values = {}
+    for line in data.decode().splitlines():
+        name, _, value = line.partition(':')
+        values[name] = int(value)
+    return values.get('rchar', 0), values.get('wchar', 0), len(data)
+
+
+def touch(count=1):
+    """Отметить файлы, затронутые командой текущего потока"""
+    ops = getattr(_local, 'ops', None)
+    if ops:
+        ops[-1]['files'] += count
+
+
+def current_ops():
+    """Замеряемые команды текущего потока (для передачи в потоки пула)"""
+    return tuple(getattr(_local, 'ops', ()))
+
+
+def add_io(ops, nread, nwritten):
+    """Засчитать байты командам ops (вложенные команды - каждой)"""
+    with _io_lock:
+        for op in ops:
+            op['bytes_read'] += nread
+            op['bytes_written'] += nwritten
+
+
+@contextmanager
+def charge_io(ops):
+    """Засчитать командам ops ввод-вывод текущего потока за время блока.
+
+    Потоки пулов (run_bulk, распаковка) выполняют работу команды вне
+    её потока, поэтому их счётчики передаются командам явно.
+    """
+    before = io_counters('thread-self') if ops else None
+    try:
+        yield
+    finally:
+        after = io_counters('thread-self') if before is not None else None
+        if after is not None:
+            # Чтение /proc при замере начала тоже попало в rchar
+            add_io(ops, max(after[0] - before[0] - before[2], 0), max(after[1] - before[1], 0))
+
+
+class CommandStats:
+    """Накопленная статистика одной команды"""
+
+    def __init__(self):
+        self.histogram = Histogram()
+        self.errors = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.files = 0
+
+    def summary(self):
+        histogram = self.histogram
+        result = {
+            'count': histogram.count,
+            'errors': self.errors,
+            'total_ms': histogram.total / 1000,
+            'mean_ms': histogram.mean() / 1000,
+            'min_ms': (histogram.min or 0) / 1000,
+            'max_ms': histogram.max / 1000,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'files': self.files,
+        }
+        for p in PERCENTILES:
+            result[f'p{p}_ms'] = histogram.percentile(p) / 1000
+        return result
+
+
+class Stats:
+    """Задержки команд менеджера и ввод-вывод процесса, в памяти процесса.
+
+    Общая для всех сессий рабочей области (сервер обслуживает многих
+    пользователей одним процессом). Байты чтения и записи команды -
+    разница счётчиков её потока (/proc/thread-self/io) плюс байты
+    потоков пула, работавших на неё, поэтому чужие сессии и фоновые
+    задачи в неё не попадают. Ввод-вывод процесса целиком - process_io.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, root):
+        """Получить общую статистику для корня рабочих областей"""
+        root = os.path.abspath(root)
+        with cls._instances_lock:
+            stats = cls._instances.get(root)
+            if stats is None:
+                stats = cls()
+                cls._instances[root] = stats
+            return stats
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commands = {}
+        self.started = time.time()
+        self.io_start = io_counters()
+
+    def process_io(self):
+        """(прочитано, записано) байт всем процессом с запуска или reset, None вне Linux"""
+        now = io_counters()
+        start = self.io_start
+        if now is None or start is None:
+            return None
+        # Чтение /proc при замере начала тоже попало в rchar
+        return max(now[0] - start[0] - start[2], 0), max(now[1] - start[1], 0)
+
+    @contextmanager
+    def measure(self, command):
+        """Замерить выполнение команды в текущем потоке.
+
+        Команда неуспешна, если выбросила исключение или вывела строку,
+        начинающуюся с "Ошибка" (так операции сообщают о сбоях).
+        """
+        op = {'files': 0, 'bytes_read': 0, 'bytes_written': 0}
+        ops = _local.__dict__.setdefault('ops', [])
+        ops.append(op)
+        start = time.perf_counter()
+        ok = False
+        try:
+            with charge_io((op,)), capture.watch_errors() as errors:
+                yield op
+            ok = not errors.count
+        finally:
+            elapsed = time.perf_counter() - start
+            ops.pop()
+            self.record(command, elapsed, ok, op['files'], op['bytes_read'], op['bytes_written'])
+
+    def record(self, command, seconds, ok=True, files=0, bytes_read=0, bytes_written=0):
+        with self.lock:
+            entry = self.commands.get(command)
+            if entry is None:
+                entry = self.commands[command] = CommandStats()
+            entry.histogram.record(seconds * 1_000_000)
+            entry.errors += 0 if ok else 1
+            entry.bytes_read += bytes_read
+            entry.bytes_written += bytes_written
+            entry.files += files
+
+    def snapshot(self):
+        """Сводка по командам: имя -> словарь показателей"""
+        with self.lock:
+            return {command: entry.summary() for command, entry in sorted(self.commands.items())}
+
+    def reset(self):
+        with self.lock:
+            self.commands.clear()
+            self.started = time.time()
+            self.io_start = io_counters()
+
+    def dump(self, path):
+        """Дописать в файл по строке JSON на команду, вернуть число строк.
+
+        Кроме сводки строка содержит непустые интервалы гистограммы
+        (микросекунды), чтобы перцентили можно было пересчитать и
+        сложить гистограммы нескольких выгрузок. Первая строка (без
+        command) - ввод-вывод процесса за тот же период.
+        """
+        now = time.time()
+        io = self.process_io()
+        with self.lock:
+            lines = []
+            if io is not None:
+                lines.append(json.dumps({'time': now, 'since': self.started, 'process_bytes_read': io[0],
+                                         'process_bytes_written': io[1]}))
+            for command, entry in sorted(self.commands.items()):
+                record = {'time': now, 'since': self.started, 'command': command}
+                record.update(entry.summary())
+                record['buckets_us'] = entry.histogram.buckets()
+                lines.append(json.dumps(record, ensure_ascii=False))
+        with open(path, 'a', encoding='utf-8') as f:
+            for line in lines:
+                f.write(line + '\n')
+        return len(lines)
@@ -0,0 +1,203 @@
+import os
+import re
+import json
+import math
+import time
+import threading
+from . import tiering
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Разбить текст на токены в нижнем регистре"""
+    return TOKEN_RE.findall(text.lower())
+
+
+class TextIndex:
+    """Инвертированный индекс содержимого текстовых файлов.
+
+    На диске хранятся списки вхождений token -> {файл: [номера строк]}
+    и для каждого файла его размер и набор токенов, чтобы при изменении
+    файла удалить его старые вхождения. Обновляется по событиям индекса
+    рабочей области, поэтому подхватывает и изменения, найденные сверкой.
+    """
+
+    VERSION = 1
+    SAVE_INTERVAL = 5.0
+    MAX_FILE_SIZE = 4 * 1024 * 1024  # большие файлы не индексируются
+    SNIFF_SIZE = 8192
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, workspace_index, index_path):
+        """Получить общий полнотекстовый индекс для рабочей области"""
+        with cls._instances_lock:
+            index = cls._instances.get(workspace_index.root)
+            if index is None:
+                index = cls(workspace_index, index_path)
+                cls._instances[workspace_index.root] = index
+            return index
+
+    def __init__(self, workspace_index, index_path):
+        self.workspace_index = workspace_index
+        self.root = workspace_index.root
+        self.index_path = index_path
+        self.lock = threading.RLock()
+        self.postings = {}
+        self.files = {}
+        self.dirty = False
+        self.last_save = 0.0
+        self.load()
+        with workspace_index.lock:
+            self.sync(dict(workspace_index.files()))
+            workspace_index.listeners.append(self.on_change)
+
+    # --- Хранение ---
+
+    def load(self):
+        with self.lock:
+            if not os.path.exists(self.index_path):
+                return
+            try:
+                with open(self.index_path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return
+            if data.get('version') == self.VERSION and data.get('root') == self.root:
+                self.postings = data.get('postings', {})
+                self.files = data.get('files', {})
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': self.VERSION, 'root': self.root,
+                           'postings': self.postings, 'files': self.files}, f)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+            self.last_save = time.monotonic()
+
+    def maybe_save(self):
+        with self.lock:
+            if self.dirty and time.monotonic() - self.last_save >= self.SAVE_INTERVAL:
+                self.save()
+
+    def close(self):
+        with self.lock:
+            if self.dirty:
+                self.save()
+
+    # --- Обновление ---
+
+    def _read_lines(self, rel):
+        """Строки текстового файла или None для бинарных и больших файлов"""
+        path = os.path.join(self.root, rel)
+        try:
+            if os.path.getsize(path) > self.MAX_FILE_SIZE:
+                return None
+            with tiering.open_read(path) as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b'\0' in data[:self.SNIFF_SIZE]:
+            return None
+        return data.decode('utf-8', errors='ignore').splitlines()
+
+    def remove(self, rel):
+        with self.lock:
+            meta = self.files.pop(rel, None)
+            if meta is None:
+                return
+            for token in meta['tokens']:
+                entries = self.postings.get(token)
+                if entries is None:
+                    continue
+                entries.pop(rel, None)
+                if not entries:
+                    del self.postings[token]
+            self.dirty = True
+
+    def add(self, rel, size=None):
+        """Проиндексировать файл (повторно, если он уже в индексе)"""
+        with self.lock:
+            self.remove(rel)
+            lines = self._read_lines(rel)
+            if size is None:
+                try:
+                    size = os.path.getsize(os.path.join(self.root, rel))
+                except OSError:
+                    return
+            tokens = {}
+            for lineno, line in enumerate(lines or (), 1):
+                for token in set(tokenize(line)):
+                    tokens.setdefault(token, []).append(lineno)
+            for token, linenos in tokens.items():
+                self.postings.setdefault(token, {})[rel] = linenos
+            self.files[rel] = {'size': size, 'tokens': list(tokens)}
+            self.dirty = True
+
+    def sync(self, current_files):
+        """Сверить индекс с набором файлов {путь: размер}"""
+        with self.lock:
+            for rel in list(self.files):
+                if rel not in current_files:
+                    self.remove(rel)
+            for rel, size in current_files.items():
+                meta = self.files.get(rel)
+                if meta is None or meta['size'] != size:
+                    self.add(rel, size)
+
+    def on_change(self, event, rel):
+        """Обработчик событий индекса рабочей области"""
+        if event == 'remove':
+            self.remove(rel)
+        else:
+            self.add(rel)
+
+    # --- Поиск ---
+
+    def search(self, query, limit=50, directory=None):
+        """Найти файлы, содержащие все слова запроса.
+
+        Возвращает список (абсолютный путь, оценка, номера строк),
+        упорядоченный по убыванию оценки TF-IDF. С directory учитываются
+        только файлы внутри неё - до ранжирования и ограничения limit.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        prefix = ''
+        if directory is not None:
+            rel_dir = os.path.relpath(os.path.abspath(directory), self.root)
+            if rel_dir == os.pardir or rel_dir.startswith(os.pardir + os.sep):
+                return []
+            if rel_dir != os.curdir:
+                prefix = os.path.join(rel_dir, '')
+        with self.lock:
+            entries = [self.postings.get(term) for term in terms]
+            if not all(entries):
+                return []
+            entries.sort(key=len)
+            candidates = set(entries[0])
+            for postings in entries[1:]:
+                candidates &= postings.keys()
+            if prefix:
+                candidates = {rel for rel in candidates if rel.startswith(prefix)}
+
+            total = max(len(self.files), 1)
+            results = []
+            for rel in candidates:
+                score = 0.0
+                lines = set()
+                for postings in entries:
+                    linenos = postings[rel]
+                    score += len(linenos) * math.log(1 + total / len(postings))
+                    lines.update(linenos)
+                results.append((os.path.join(self.root, rel), score, sorted(lines)))
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results[:limit]
@@ -0,0 +1,377 @@
+import io
+import os
+import lzma
+import time
+import zlib
+import shutil
+import struct
+import threading
+
+try:
+    import zstandard
+except ImportError:  # необязательная зависимость: без неё сжатие lzma
+    zstandard = None
+
+
+# Холодный файл остаётся под своим именем, но начинается с заголовка:
+# сигнатура, версия, кодек, исходный размер и CRC32 этих полей.
+# Признак холодного файла - заголовок в самом файле, а не запись в
+# индексе, поэтому rename, move и копирование внутри рабочей области
+# его не теряют.
+MAGIC = b'\x89FMCOLD\r\n\x1a'
+VERSION = 1
+HEADER = struct.Struct('<10sBBQ')
+CRC = struct.Struct('<I')
+HEADER_SIZE = HEADER.size + CRC.size
+
+CODEC_LZMA = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {'lzma': CODEC_LZMA, 'zstd': CODEC_ZSTD}
+
+CHUNK_SIZE = 1024 * 1024
+SAMPLE_SIZE = 256 * 1024
+# Уже сжатые форматы не трогаем
+SKIP_EXTENSIONS = {'.zip', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.rar', '.lz4',
+                   '.jpg', '.jpeg', '.png', '.gif', '.webp', '.mp3', '.mp4', '.mkv', '.avi',
+                   '.docx', '.xlsx', '.pptx', '.pdf'}
+
+
+def resolve_codec(name):
+    """Кодек по имени из конфигурации: auto - zstd, если он установлен"""
+    name = (name or 'auto').lower()
+    if name == 'auto':
+        return CODEC_ZSTD if zstandard is not None else CODEC_LZMA
+    if name not in CODEC_NAMES:
+        raise ValueError(f"Неизвестный кодек: {name}. Доступны: auto, {', '.join(CODEC_NAMES)}")
+    if name == 'zstd' and zstandard is None:
+        raise ValueError("Для кодека zstd нужен пакет zstandard")
+    return CODEC_NAMES[name]
+
+
+def _compressor(codec, level=None):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=9 if level is None else level).compressobj()
+    return lzma.LZMACompressor(preset=6 if level is None else level)
+
+
+def _decompressed_chunks(f, codec):
+    """Функция, возвращающая следующий блок распакованных данных.
+
+    Блок не больше CHUNK_SIZE, поэтому хорошо сжатые данные не
+    разворачиваются в памяти целиком.
+    """
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise OSError("Файл сжат zstd, но пакет zstandard не установлен")
+        stream = zstandard.ZstdDecompressor().stream_reader(f, closefd=False)
+        return lambda: stream.read(CHUNK_SIZE)
+    decompressor = lzma.LZMADecompressor()
+
+    def next_chunk():
+        data = b''
+        if decompressor.needs_input:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                return b''
+        return decompressor.decompress(data, CHUNK_SIZE)
+
+    return next_chunk
+
+
+def _pack_header(codec, size):
+    header = HEADER.pack(MAGIC, VERSION, codec, size)
+    return header + CRC.pack(zlib.crc32(header))
+
+
+def read_header(f):
+    """(кодек, исходный размер) из начала открытого файла или None"""
+    data = f.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE or not data.startswith(MAGIC):
+        return None
+    magic, version, codec, size = HEADER.unpack_from(data)
+    if version != VERSION or codec not in CODEC_NAMES.values():
+        return None
+    if CRC.unpack_from(data, HEADER.size)[0] != zlib.crc32(data[:HEADER.size]):
+        return None
+    return codec, size
+
+
+def is_cold(path):
+    """Сжат ли файл в холодном хранилище"""
+    try:
+        with open(path, 'rb') as f:
+            return read_header(f) is not None
+    except (IsADirectoryError, FileNotFoundError):
+        return False
+
+
+def logical_size(path):
+    """Размер содержимого файла (для холодного - до сжатия)"""
+    with open(path, 'rb') as f:
+        header = read_header(f)
+        return header[1] if header is not None else os.fstat(f.fileno()).st_size
+
+
+def open_read(path, buffering=-1):
+    """Открыть файл на чтение; холодный файл распаковывается на лету"""
+    f = open(path, 'rb', buffering=buffering)
+    try:
+        header = read_header(f)
+    except BaseException:
+        f.close()
+        raise
+    if header is None:
+        f.seek(0)
+        return f
+    return io.BufferedReader(ColdReader(f, *header), CHUNK_SIZE)
+
+
+class ColdReader(io.RawIOBase):
+    """Поток распакованного содержимого холодного файла.
+
+    Чтение идёт блоками по мере надобности. Исходный размер хранится в
+    заголовке, поэтому seek и tell ничего не распаковывают: seek только
+    запоминает позицию, и узнать размер через seek(0, SEEK_END) ничего
+    не стоит. Распаковка до нужной позиции происходит при следующем
+    чтении: вперёд - с текущего места, назад - заново с начала потока
+    (сжатый поток нельзя читать с произвольного места). Поэтому tail
+    распаковывает файл один раз целиком.
+    """
+
+    def __init__(self, f, codec, size):
+        self.file = f
+        self.codec = codec
+        self.size = size
+        self.name = f.name
+        self._restart()
+        self.target = 0
+
+    def _restart(self):
+        self.file.seek(HEADER_SIZE)
+        self.next_chunk = _decompressed_chunks(self.file, self.codec)
+        self.pending = b''
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.target != self.pos:
+            self._skip_to(self.target)
+        n = self._read_decompressed(buffer)
+        self.target = self.pos
+        return n
+
+    def _read_decompressed(self, buffer):
+        while not self.pending and self.pos < self.size:
+            self.pending = self.next_chunk()
+            if not self.pending and self.file.tell() >= os.fstat(self.file.fileno()).st_size:
+                raise OSError(f"Холодный файл повреждён: {self.name}")
+        n = min(len(buffer), len(self.pending))
+        buffer[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        self.pos += n
+        return n
+
+    def _skip_to(self, target):
+        """Распаковать и отбросить данные до позиции target"""
+        if target < self.pos:
+            self._restart()
+        skip = bytearray(CHUNK_SIZE)
+        while self.pos < min(target, self.size):
+            if not self._read_decompressed(memoryview(skip)[:min(CHUNK_SIZE, target - self.pos)]):
+                break
+        self.pos = max(self.pos, target)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.target
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.target = max(offset, 0)
+        return self.target
+
+    def tell(self):
+        return self.target
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+def _write_tmp(tmp_path, source, header=b'', compressor=None):
+    """Записать поток source (через compressor) во временный файл"""
+    with open(tmp_path, 'wb') as out:
+        out.write(header)
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            out.write(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            out.write(compressor.flush())
+        return out.tell()
+
+
+def _tmp_name(path, suffix):
+    return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{suffix}.tmp")
+
+
+def compress_file(path, codec, level=None, max_ratio=0.8):
+    """Сжать файл на месте. Возвращает (было, стало) байт или None.
+
+    None - файл плохо сжимается (больше max_ratio от исходного) или
+    изменился во время сжатия; тогда он остаётся как есть. Права и
+    время доступа и изменения сохраняются.
+    """
+    before = os.stat(path)
+    tmp_path = _tmp_name(path, 'cold')
+    try:
+        with open(path, 'rb') as f:
+            if read_header(f) is not None:
+                return None
+            f.seek(0)
+            compressed = _write_tmp(tmp_path, f, _pack_header(codec, before.st_size),
+                                    _compressor(codec, level))
+        after = os.stat(path)
+        if compressed > before.st_size * max_ratio or \
+                (after.st_ino, after.st_size, after.st_mtime_ns) != \
+                (before.st_ino, before.st_size, before.st_mtime_ns):
+            os.remove(tmp_path)
+            return None
+        shutil.copystat(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return before.st_size, compressed
+
+
+def worth_compressing(path, codec, level=None, max_ratio=0.8):
+    """Быстрая оценка по началу файла: сжатие пробы не хуже max_ratio"""
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+    if not sample:
+        return False
+    compressor = _compressor(codec, level)
+    size = len(compressor.compress(sample)) + len(compressor.flush())
+    return size <= len(sample) * max_ratio
+
+
+def decompress_to(src, dest):
+    """Распаковать холодный файл в dest (директория - под тем же именем).
+
+    Возвращает путь результата. dest пишется через временный файл и
+    rename, время изменения берётся у исходного файла.
+    """
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(src))
+    tmp_path = _tmp_name(dest, 'thaw')
+    try:
+        with open_read(src) as f:
+            _write_tmp(tmp_path, f)
+        shutil.copystat(src, tmp_path)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return dest
+
+
+def thaw(path):
+    """Вернуть холодный файл в обычный вид на месте (перед изменением)"""
+    if not is_cold(path):
+        return False
+    decompress_to(path, path)
+    return True
+
+
+class Tiering:
+    """Фоновое сжатие давно не читавшихся файлов рабочей области.
+
+    Раз в interval секунд обходит рабочую область и сжимает файлы,
+    к которым не обращались (atime) и которые не менялись (mtime)
+    дольше min_age секунд. Пропускаются мелкие файлы, уже сжатые
+    форматы, файлы с несколькими жёсткими ссылками (блобы дедупликации)
+    и плохо сжимаемые по пробе. Чтение холодных файлов распаковывает
+    их на лету (open_read), поэтому команды работают как прежде, а
+    квота считает физически занятые байты.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, root, settings, on_change=None):
+        """Получить общий фоновый компрессор для рабочей области"""
+        root = os.path.abspath(root)
+        with cls._instances_lock:
+            tiering = cls._instances.get(root)
+            if tiering is None:
+                tiering = cls(root, settings, on_change)
+                cls._instances[root] = tiering
+            return tiering
+
+    def __init__(self, root, settings, on_change=None):
+        self.root = os.path.abspath(root)
+        self.min_age = settings.get('min_age_days', 30) * 86400
+        self.min_size = settings.get('min_size', 4096)
+        self.interval = settings.get('interval', 3600)
+        self.codec = resolve_codec(settings.get('codec', 'auto'))
+        self.level = settings.get('level')
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.last_sweep = None
+        if self.interval:
+            threading.Thread(target=self._sweep_loop, daemon=True, name='tiering-sweeper').start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sweep()
+            except OSError:
+                pass
+
+    def _candidate(self, path, st, now):
+        if st.st_nlink > 1 or st.st_size < self.min_size:
+            return False
+        if os.path.splitext(path)[1].lower() in SKIP_EXTENSIONS:
+            return False
+        return now - max(st.st_atime, st.st_mtime) >= self.min_age
+
+    def sweep(self):
+        """Один проход по рабочей области, вернуть статистику"""
+        stats = {'scanned': 0, 'compressed': 0, 'before': 0, 'after': 0}
+        with self.lock:
+            now = time.time()
+            for dirpath, _, files in os.walk(self.root):
+                for name in files:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.lstat(path)
+                        stats['scanned'] += 1
+                        if not os.path.isfile(path) or os.path.islink(path):
+                            continue
+                        if not self._candidate(path, st, now):
+                            continue
+                        if not worth_compressing(path, self.codec, self.level):
+                            continue
+                        result = compress_file(path, self.codec, self.level)
+                    except OSError:
+                        continue
+                    if result is None:
+                        continue
+                    stats['compressed'] += 1
+                    stats['before'] += result[0]
+                    stats['after'] += result[1]
+                    if self.on_change is not None:
+                        self.on_change(path)
+            self.last_sweep = dict(stats, time=now)
+        return stats
@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import uuid
+import threading
+
+
+class Trash:
+    """Корзина пользователя с фоновой очисткой.
+
+    Удаление - это rename цели в каталог корзины (O(1) при любом размере
+    дерева). Фоновый поток удаляет содержимое элементов, чей срок
+    хранения истёк или которые очищены командой purge, пачками по
+    batch файлов с паузой pause между пачками, чтобы не забивать диск.
+    Байты элементов, ещё не удалённых с диска, учитываются в квоте и
+    освобождаются по мере очистки.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, trash_dir, retention=300, batch=1000, pause=0.01, on_reclaimed=None):
+        """Получить общую корзину для каталога (один фоновый поток на корзину)"""
+        trash_dir = os.path.abspath(trash_dir)
+        with cls._instances_lock:
+            trash = cls._instances.get(trash_dir)
+            if trash is None:
+                trash = cls(trash_dir, retention, batch, pause, on_reclaimed)
+                cls._instances[trash_dir] = trash
+            return trash
+
+    def __init__(self, trash_dir, retention=300, batch=1000, pause=0.01, on_reclaimed=None):
+        self.trash_dir = os.path.abspath(trash_dir)
+        self.items_dir = os.path.join(self.trash_dir, 'items')
+        self.meta_dir = os.path.join(self.trash_dir, 'meta')
+        self.manifest_path = os.path.join(self.trash_dir, 'trash.json')
+        self.retention = retention
+        self.batch = max(int(batch), 1)
+        self.pause = pause
+        self.on_reclaimed = on_reclaimed
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        os.makedirs(self.items_dir, exist_ok=True)
+        os.makedirs(self.meta_dir, exist_ok=True)
+        self.items = self._load()
+        self.reclaiming = None  # id элемента, который сейчас удаляется
+        threading.Thread(target=self._reclaim_loop, daemon=True, name='trash-reclaimer').start()
+
+    # --- манифест ---
+    #
+    # Каждый элемент описывается своим маленьким файлом meta/<id>.json,
+    # поэтому удаление в корзину стоит O(1) независимо от её размера.
+
+    def _load(self):
+        items = {}
+        for name in os.listdir(self.meta_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.meta_dir, name), 'r') as f:
+                    items[name[:-len('.json')]] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        items.update(self._migrate_manifest(items))
+        # Элементы, которых уже нет на диске, забываем
+        for item_id in [item_id for item_id in items if not os.path.lexists(self._item_path(item_id))]:
+            del items[item_id]
+            self._drop_meta(item_id)
+        return items
+
+    def _migrate_manifest(self, known):
+        """Перенести общий trash.json прежних версий в файлы meta/"""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        migrated = {item_id: item for item_id, item in legacy.items() if item_id not in known}
+        for item_id, item in migrated.items():
+            self._write_meta(item_id, item)
+        os.remove(self.manifest_path)
+        return migrated
+
+    def _meta_path(self, item_id):
+        return os.path.join(self.meta_dir, item_id + '.json')
+
+    def _write_meta(self, item_id, item):
+        meta_path = self._meta_path(item_id)
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(item, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def _drop_meta(self, item_id):
+        try:
+            os.remove(self._meta_path(item_id))
+        except FileNotFoundError:
+            pass
+
+    def _item_path(self, item_id):
+        return os.path.join(self.items_dir, item_id)
+
+    # --- операции ---
+
+    def put(self, path, size):
+        """Переместить путь в корзину, вернуть id элемента.
+
+        size - занятый объём (для учёта в квоте до очистки). Если
+        корзина на другой файловой системе, выбрасывает OSError(EXDEV).
+        """
+        item_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        os.rename(path, self._item_path(item_id))
+        with self.lock:
+            self.items[item_id] = {
+                'original': os.path.abspath(path),
+                'deleted_at': time.time(),
+                'size': size,
+                'reclaimed': 0,
+                'purge': False,
+            }
+            self._write_meta(item_id, self.items[item_id])
+        self.wakeup.set()
+        return item_id
+
+    def list(self):
+        with self.lock:
+            return sorted(((item_id, dict(item)) for item_id, item in self.items.items()),
+                          key=lambda pair: pair[1]['deleted_at'])
+
+    def find_exists(self, key):
+        """Есть ли элемент с таким id (или началом id)"""
+        with self.lock:
+            return any(item_id.startswith(key) for item_id in self.items)
+
+    def find(self, key):
+        """Элемент по id (или его началу) или по исходному пути"""
+        with self.lock:
+            if key in self.items:
+                return key
+            prefixed = sorted(item_id for item_id in self.items if item_id.startswith(key))
+            by_path = [item_id for item_id, item in self.items.items()
+                       if item['original'] == os.path.abspath(key)]
+        if len(prefixed) > 1:
+            raise ValueError(f"Начало id {key} подходит к нескольким элементам: {', '.join(prefixed)}")
+        if prefixed:
+            return prefixed[0]
+        if not by_path:
+            raise ValueError(f"В корзине нет элемента: {key}")
+        # Одинаковый исходный путь удалялся несколько раз - берём последний
+        return max(by_path)
+
+    def restore(self, key, dest=None):
+        """Вернуть элемент на исходное место (или в dest), вернуть путь"""
+        item_id = self.find(key)
+        with self.lock:
+            if self.reclaiming == item_id:
+                raise ValueError("Элемент уже удаляется с диска, восстановление невозможно")
+            item = self.items[item_id]
+            if item['reclaimed']:
+                raise ValueError("Элемент частично удалён с диска, восстановление невозможно")
+            target = os.path.abspath(dest or item['original'])
+            if os.path.lexists(target):
+                raise ValueError(f"Путь уже существует: {target}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.rename(self._item_path(item_id), target)
+            del self.items[item_id]
+            self._drop_meta(item_id)
+        return target
+
+    def purge(self, key=None):
+        """Отметить элемент (или всю корзину) для немедленной очистки"""
+        with self.lock:
+            item_ids = list(self.items) if key is None else []
+        if key is not None:
+            item_ids = [self.find(key)]
+        with self.lock:
+            for item_id in item_ids:
+                item = self.items.get(item_id)
+                if item is not None and not item['purge']:
+                    item['purge'] = True
+                    self._write_meta(item_id, item)
+        self.wakeup.set()
+        return len(item_ids)
+
+    def pending_bytes(self):
+        """Байты элементов корзины, ещё не удалённые с диска"""
+        with self.lock:
+            return sum(max(item['size'] - item['reclaimed'], 0) for item in self.items.values())
+
+    def flush(self, timeout=None):
+        """Дождаться очистки всех отмеченных для удаления элементов"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                busy = self.reclaiming is not None or any(self._due(item) for item in self.items.values())
+            if not busy:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    # --- фоновая очистка ---
+
+    def _due(self, item, now=None):
+        now = time.time() if now is None else now
+        return item['purge'] or item['deleted_at'] + self.retention <= now
+
+    def _next_due(self):
+        """id следующего элемента для очистки и время ожидания до него"""
+        now = time.time()
+        with self.lock:
+            waiting = []
+            for item_id, item in self.items.items():
+                if self._due(item, now):
+                    self.reclaiming = item_id
+                    return item_id, 0
+                waiting.append(item['deleted_at'] + self.retention - now)
+        return None, min(waiting, default=None)
+
+    def _reclaim_loop(self):
+        while True:
+            item_id, delay = self._next_due()
+            if item_id is None:
+                self.wakeup.wait(delay)
+                self.wakeup.clear()
+                continue
+            try:
+                self._reclaim(item_id)
+            except OSError:
+                # Повторим позже, не блокируя остальные элементы
+                with self.lock:
+                    item = self.items.get(item_id)
+                    if item is not None:
+                        item['deleted_at'] = time.time()
+                        item['purge'] = False
+                        self._write_meta(item_id, item)
+            finally:
+                with self.lock:
+                    self.reclaiming = None
+
+    def _reclaim(self, item_id):
+        path = self._item_path(item_id)
+        removed = 0
+        freed = 0
+        for size in _iter_unlink(path):
+            removed += 1
+            freed += size
+            if removed % self.batch == 0:
+                self._credit(item_id, freed)
+                freed = 0
+                time.sleep(self.pause)
+        with self.lock:
+            self.items.pop(item_id, None)
+            self._drop_meta(item_id)
+        if self.on_reclaimed is not None:
+            self.on_reclaimed()
+
+    def _credit(self, item_id, nbytes):
+        with self.lock:
+            item = self.items.get(item_id)
+            if item is not None:
+                item['reclaimed'] += nbytes
+                self._write_meta(item_id, item)
+
+
+def _iter_unlink(path):
+    """Удалять дерево по одному файлу, выдавая размер каждого удалённого.
+
+    Обход в глубину со стеком: директория удаляется после содержимого.
+    Уже отсутствующие пути пропускаются, поэтому прерванную очистку
+    можно продолжить.
+    """
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if not os.path.isdir(path) or os.path.islink(path):
+        os.unlink(path)
+        yield st.st_size
+        return
+    stack = [(path, False)]
+    while stack:
+        current, visited = stack.pop()
+        if visited:
+            try:
+                os.rmdir(current)
+            except FileNotFoundError:
+                pass
+            yield 0
+            continue
+        stack.append((current, True))
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, False))
+                    continue
+                try:
+                    size = entry.stat(follow_symlinks=False).st_size
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    continue
+                yield size
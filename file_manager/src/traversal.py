@@ -0,0 +1,110 @@
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+DEFAULT_WORKERS = 8
+
+DirScan = namedtuple('DirScan', ['path', 'mtime_ns', 'files', 'dirs'])
+
+
+def scan_dir(path, stat_files=True):
+    """Прочитать одну директорию через os.scandir.
+
+    Возвращает DirScan: файлы как {имя: размер} (размер None, если
+    stat_files=False) и список поддиректорий (симлинки не раскрываются).
+    """
+    files = {}
+    dirs = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.name)
+                elif entry.is_file():
+                    files[entry.name] = entry.stat().st_size if stat_files else None
+            except OSError:
+                continue
+    return DirScan(path, os.stat(path).st_mtime_ns, files, dirs)
+
+
+def _run_parallel(root, task, workers, ignore_errors=True):
+    """Обойти дерево, выполняя task(path) для каждой директории в пуле.
+
+    task возвращает (результат, список поддиректорий). Одновременно
+    в работе не больше 2 * workers директорий, остальные ждут в очереди.
+    """
+    workers = max(int(workers or 1), 1)
+    queue = deque([root])
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        while queue or pending:
+            while queue and len(pending) < 2 * workers:
+                pending.add(executor.submit(task, queue.popleft()))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result, subdirs = future.result()
+                except OSError:
+                    if not ignore_errors:
+                        raise
+                    # Как и os.walk, пропускаем недоступные директории
+                    continue
+                queue.extend(subdirs)
+                yield result
+
+
+def scan_tree(root, workers=DEFAULT_WORKERS, stat_files=True):
+    """Параллельный обход дерева, выдаёт DirScan для каждой директории.
+
+    Порядок директорий не определён.
+    """
+    def task(path):
+        scan = scan_dir(path, stat_files)
+        return scan, [os.path.join(path, name) for name in scan.dirs]
+
+    return _run_parallel(root, task, workers)
+
+
+def walk(root, workers=DEFAULT_WORKERS):
+    """Аналог os.walk на пуле потоков: (dirpath, dirnames, filenames)"""
+    for scan in scan_tree(root, workers, stat_files=False):
+        yield scan.path, scan.dirs, list(scan.files)
+
+
+def tree_size(root, workers=DEFAULT_WORKERS):
+    """Суммарный размер файлов в дереве"""
+    return sum(sum(scan.files.values()) for scan in scan_tree(root, workers))
+
+
+def rmtree(root, workers=DEFAULT_WORKERS, progress=None):
+    """Параллельное удаление дерева.
+
+    Файлы удаляются потоками пула прямо во время обхода, затем
+    директории удаляются уровнями, начиная с самых глубоких.
+    progress(файлы, байты) вызывается после каждой директории.
+    """
+    if os.path.islink(root):
+        raise OSError("Нельзя удалить символическую ссылку как директорию")
+
+    def task(path):
+        subdirs = []
+        removed = 0
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                else:
+                    os.unlink(entry.path)
+                    removed += 1
+        if progress:
+            progress(removed, 0)
+        return path, subdirs
+
+    levels = {}
+    for path in _run_parallel(root, task, workers, ignore_errors=False):
+        levels.setdefault(path.count(os.sep), []).append(path)
+
+    with ThreadPoolExecutor(max_workers=max(int(workers or 1), 1)) as executor:
+        for depth in sorted(levels, reverse=True):
+            list(executor.map(os.rmdir, levels[depth]))
@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import errno
+import hashlib
+import tempfile
+from . import copy_engine
+
+
+CHUNK_SIZE = 4 * 1024 * 1024
+# Данные фиксируются (fsync + запись смещения) не реже, чем раз в столько байт
+COMMIT_BYTES = 64 * 1024 * 1024
+# Загрузка, которую не продолжали столько секунд, удаляется (expire)
+EXPIRE_SECONDS = 24 * 3600
+
+
+def _state_paths(state_dir, dest):
+    """Пути .part и файла состояния загрузки в dest"""
+    key = hashlib.sha1(os.path.abspath(dest).encode('utf-8', 'surrogateescape')).hexdigest()[:16]
+    return os.path.join(state_dir, key + '.part'), os.path.join(state_dir, key + '.json')
+
+
+def fsync_dir(path):
+    """Сохранить на диск запись директории (после rename внутри неё)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # Windows: директории не открываются
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def replace_durably(tmp_path, dest):
+    """Атомарно заменить dest готовым файлом и сохранить rename на диск"""
+    try:
+        st = os.stat(dest)
+    except FileNotFoundError:
+        pass
+    else:
+        # Замена не должна менять владельца и права существующего файла
+        if hasattr(os, 'chown') and (st.st_uid, st.st_gid) != (os.getuid(), os.getgid()):
+            try:
+                os.chown(tmp_path, st.st_uid, st.st_gid)
+            except PermissionError:
+                # Не root: группу можно сменить только на свою
+                try:
+                    os.chown(tmp_path, -1, st.st_gid)
+                except PermissionError:
+                    pass
+        os.chmod(tmp_path, st.st_mode & 0o7777)
+    os.replace(tmp_path, dest)
+    fsync_dir(os.path.dirname(os.path.abspath(dest)))
+
+
+def atomic_write(path, data):
+    """Записать файл целиком: временный файл, fsync, rename.
+
+    При сбое на диске остаётся либо прежнее содержимое, либо новое,
+    но не обрезанный файл. Символьная ссылка сохраняется - заменяется
+    файл, на который она указывает.
+    """
+    path = os.path.realpath(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        replace_durably(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Upload:
+    """Возобновляемая загрузка в файл.
+
+    Данные пишутся в .part в служебном каталоге (не в рабочей области,
+    чтобы недописанный файл не попал в индексы). Раз в commit_bytes
+    .part сбрасывается на диск fsync, а смещение записывается в файл
+    состояния; после сбоя загрузка с тем же назначением, размером и
+    источником продолжается с последнего зафиксированного смещения.
+    commit переносит .part на место назначения атомарным rename.
+    """
+
+    def __init__(self, state_dir, dest, size=None, source=None, commit_bytes=COMMIT_BYTES):
+        os.makedirs(state_dir, exist_ok=True)
+        self.dest = os.path.abspath(dest)
+        self.size = size
+        self.source = source
+        self.commit_bytes = commit_bytes
+        self.part_path, self.state_path = _state_paths(state_dir, self.dest)
+        self.offset = committed_offset(state_dir, self.dest, size, source)
+        self.uncommitted = 0
+        self.file = open(self.part_path, 'r+b' if self.offset else 'wb')
+        # Всё, что записано после последней фиксации, могло не дойти до диска
+        self.file.truncate(self.offset)
+        self.file.seek(self.offset)
+
+    def _save_state(self):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'dest': self.dest, 'size': self.size, 'source': self.source,
+                       'offset': self.offset, 'updated': time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+
+    def truncate(self, offset):
+        """Продолжить с меньшего смещения (отправитель повторяет хвост)"""
+        if offset > self.offset:
+            raise ValueError(f"Получено только {self.offset} байт, продолжить с {offset} нельзя")
+        self.file.truncate(offset)
+        self.file.seek(offset)
+        self.offset = offset
+        self.uncommitted = 0
+
+    def write(self, data):
+        """Дописать блок; при накоплении commit_bytes - зафиксировать"""
+        if self.size is not None and self.offset + len(data) > self.size:
+            raise ValueError(f"Данных больше заявленного размера {self.size} байт")
+        self.file.write(data)
+        self.offset += len(data)
+        self.uncommitted += len(data)
+        if self.uncommitted >= self.commit_bytes:
+            self.checkpoint()
+
+    def write_stream(self, stream, chunk_size=CHUNK_SIZE, progress=None):
+        """Переписать поток до конца блоками через один буфер.
+
+        Память ограничена chunk_size при любом размере данных.
+        progress(файлы, байты) вызывается после каждого блока.
+        """
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            n = stream.readinto(buffer)
+            if not n:
+                break
+            self.write(view[:n])
+            if progress:
+                progress(0, n)
+
+    def checkpoint(self):
+        """Сбросить данные на диск и записать зафиксированное смещение"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._save_state()
+        self.uncommitted = 0
+
+    def suspend(self):
+        """Прервать с сохранением: следующая загрузка продолжит отсюда"""
+        if not self.file.closed:
+            self.checkpoint()
+            self.file.close()
+
+    def abort(self):
+        """Прервать и удалить недописанные данные"""
+        self.file.close()
+        _remove(self.part_path, self.state_path)
+
+    def commit(self):
+        """Проверить размер и атомарно заменить назначение"""
+        if self.size is not None and self.offset != self.size:
+            raise ValueError(f"Получено {self.offset} из {self.size} байт")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        try:
+            replace_durably(self.part_path, self.dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Служебный каталог на другой файловой системе - копия рядом с целью
+            tmp_path = os.path.join(os.path.dirname(self.dest), f".{os.path.basename(self.dest)}.upload.tmp")
+            copy_engine.copy_file(self.part_path, tmp_path)
+            with open(tmp_path, 'rb+') as f:
+                os.fsync(f.fileno())
+            replace_durably(tmp_path, self.dest)
+            os.remove(self.part_path)
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove(*paths):
+    removed = False
+    for path in paths:
+        try:
+            os.remove(path)
+            removed = True
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def committed_offset(state_dir, dest, size=None, source=None):
+    """Сколько байт прерванной загрузки в dest можно не передавать заново.
+
+    0, если загрузки нет или она была с другим размером или источником.
+    """
+    dest = os.path.abspath(dest)
+    part_path, state_path = _state_paths(state_dir, dest)
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        part_size = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        return 0
+    if state.get('dest') != dest or state.get('size') != size or state.get('source') != source:
+        return 0
+    return min(state.get('offset', 0), part_size)
+
+
+def discard(state_dir, dest):
+    """Отменить незавершённую загрузку в dest; False, если её нет"""
+    return _remove(*_state_paths(state_dir, dest))
+
+
+def expire(state_dir, max_age=EXPIRE_SECONDS):
+    """Удалить загрузки, которые не продолжались дольше max_age секунд.
+
+    Идущая загрузка постоянно обновляет время изменения .part, поэтому
+    не удаляется. Возвращает число удалённых загрузок.
+    """
+    try:
+        names = os.listdir(state_dir)
+    except FileNotFoundError:
+        return 0
+    latest = {}
+    for name in names:
+        key = name.split('.', 1)[0]
+        try:
+            mtime = os.stat(os.path.join(state_dir, name)).st_mtime
+        except FileNotFoundError:
+            continue
+        latest[key] = max(latest.get(key, 0), mtime)
+    cutoff = time.time() - max_age
+    expired = 0
+    for name in names:
+        key = name.split('.', 1)[0]
+        if latest.get(key, cutoff) < cutoff:
+            _remove(os.path.join(state_dir, name))
+            if name.endswith('.part'):
+                expired += 1
+    return expired
+
+
+def pending(state_dir):
+    """Незавершённые загрузки: [(назначение, получено, размер)]"""
+    result = []
+    try:
+        names = os.listdir(state_dir)
+    except FileNotFoundError:
+        return result
+    for name in sorted(names):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(state_dir, name), 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        result.append((state['dest'], state['offset'], state.get('size')))
+    return result
@@ -0,0 +1,168 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+
+class UserExistsError(ValueError):
+    """Пользователь с таким именем уже зарегистрирован"""
+
+
+@contextmanager
+def file_lock(path, exclusive=True):
+    """Межпроцессная блокировка через flock на отдельном файле"""
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class JsonUserStore:
+    """Пользователи в одном JSON-файле (исходный формат .users.json).
+
+    Запись атомарна (временный файл, fsync, rename) и выполняется под
+    блокировкой с перечитыванием файла, поэтому параллельные процессы
+    не теряют регистрации друг друга. Каждая запись переписывает файл
+    целиком, так что для больших баз подходит SqliteUserStore.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.users = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, users):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(users, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def get(self, username):
+        user = self.users.get(username)
+        if user is None:
+            # Пользователь мог быть добавлен другим процессом
+            with file_lock(self.lock_path, exclusive=False):
+                self.users = self._read()
+            user = self.users.get(username)
+        return user
+
+    def add(self, username, record):
+        with file_lock(self.lock_path):
+            self.users = self._read()
+            if username in self.users:
+                raise UserExistsError("Пользователь уже существует")
+            self.users[username] = record
+            self._write(self.users)
+
+    def count(self):
+        return len(self.users)
+
+    def items(self):
+        return list(self.users.items())
+
+
+class SqliteUserStore:
+    """Пользователи во встроенной базе SQLite с индексом по имени.
+
+    Регистрация и вход - это вставка и поиск по первичному ключу, их
+    время не зависит от числа пользователей. Транзакции SQLite атомарны
+    и переживают сбои, блокировки между процессами обеспечивает сама
+    база (журнал WAL, ожидание занятой базы).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL)"
+            )
+
+    def _connect(self):
+        """Соединение текущего потока (sqlite3 не делит их между потоками)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, username):
+        row = self._connect().execute(
+            "SELECT data FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add(self, username, record):
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT INTO users (username, data) VALUES (?, ?)",
+                             (username, json.dumps(record)))
+        except sqlite3.IntegrityError:
+            raise UserExistsError("Пользователь уже существует")
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def items(self):
+        rows = self._connect().execute("SELECT username, data FROM users ORDER BY username")
+        return [(username, json.loads(data)) for username, data in rows]
+
+    def import_users(self, users):
+        """Импорт словаря пользователей, существующие записи не меняются.
+
+        Возвращает число добавленных пользователей.
+        """
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, data) VALUES (?, ?)",
+                ((username, json.dumps(record)) for username, record in users.items())
+            )
+            return conn.total_changes - before
+
+
+def migrate_json(json_path, sqlite_path):
+    """Перенести пользователей из .users.json в базу SQLite"""
+    with open(json_path, 'r') as f:
+        users = json.load(f)
+    store = SqliteUserStore(sqlite_path)
+    return store.import_users(users), len(users)
+
+
+def open_user_store(config):
+    """Хранилище пользователей по настройке users.backend (json | sqlite)"""
+    workspace = config['workspace']
+    os.makedirs(workspace, exist_ok=True)
+    json_path = os.path.join(workspace, '.users.json')
+    backend = config.get('users', {}).get('backend', 'json')
+    if backend == 'json':
+        return JsonUserStore(json_path)
+    if backend == 'sqlite':
+        sqlite_path = os.path.join(workspace, '.users.db')
+        if not os.path.exists(sqlite_path) and os.path.exists(json_path):
+            # Первый запуск с SQLite - переносим существующих пользователей
+            migrate_json(json_path, sqlite_path)
+        return SqliteUserStore(sqlite_path)
+    raise ValueError(f"Неизвестное хранилище пользователей: {backend}")
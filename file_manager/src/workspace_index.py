@@ -0,0 +1,319 @@
+import os
+import json
+import time
+import threading
+from . import traversal
+
+
+class WorkspaceIndex:
+    """Персистентный индекс размеров рабочей области пользователя.
+
+    Для каждой директории хранятся её mtime, размеры файлов, список
+    поддиректорий и суммарный размер поддерева, поэтому запрос квоты
+    выполняется за O(1). Операции менеджера обновляют индекс точечно
+    через touch(), а reconcile() по mtime директорий подхватывает
+    изменения, сделанные в обход менеджера.
+
+    Подписчики (listeners) получают события ('add' | 'remove' | 'change',
+    относительный путь файла) при каждом изменении набора файлов.
+    """
+
+    VERSION = 1
+    SAVE_INTERVAL = 5.0  # секунд между сохранениями на диск
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, root, index_path, workers=traversal.DEFAULT_WORKERS):
+        """Получить общий экземпляр индекса для рабочей области"""
+        key = (os.path.abspath(root), os.path.abspath(index_path))
+        with cls._instances_lock:
+            index = cls._instances.get(key)
+            if index is None:
+                index = cls(root, index_path, workers)
+                cls._instances[key] = index
+            return index
+
+    def __init__(self, root, index_path, workers=traversal.DEFAULT_WORKERS):
+        self.root = os.path.abspath(root)
+        self.index_path = index_path
+        self.workers = workers
+        self.lock = threading.RLock()
+        self.dirs = {}
+        self.dirty = False
+        self.last_save = 0.0
+        self.listeners = []
+        self.refresh_thread = None
+        self.load()
+        self.reconcile()
+
+    # --- Пути ---
+
+    def _rel(self, path):
+        """Относительный путь внутри рабочей области или None"""
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        if rel == '..' or rel.startswith('..' + os.sep):
+            return None
+        return rel
+
+    def _abs(self, rel):
+        return self.root if rel == '.' else os.path.join(self.root, rel)
+
+    @staticmethod
+    def _child(rel, name):
+        return name if rel == '.' else os.path.join(rel, name)
+
+    @staticmethod
+    def _parent(rel):
+        return os.path.dirname(rel) or '.'
+
+    def _emit(self, event, rel):
+        for listener in self.listeners:
+            listener(event, rel)
+
+    def _emit_files(self, event, rel, names):
+        if self.listeners:
+            for name in names:
+                self._emit(event, self._child(rel, name))
+
+    def files(self):
+        """Перечислить (относительный путь, размер) всех файлов индекса"""
+        with self.lock:
+            for rel, record in self.dirs.items():
+                for name, size in record['files'].items():
+                    yield self._child(rel, name), size
+
+    # --- Хранение ---
+
+    def load(self):
+        """Загрузка индекса с диска"""
+        with self.lock:
+            self.dirs = {}
+            if not os.path.exists(self.index_path):
+                return
+            try:
+                with open(self.index_path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return
+            if data.get('version') == self.VERSION and data.get('root') == self.root:
+                self.dirs = data.get('dirs', {})
+
+    def save(self):
+        """Атомарное сохранение индекса на диск"""
+        with self.lock:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': self.VERSION, 'root': self.root, 'dirs': self.dirs}, f)
+            os.replace(tmp_path, self.index_path)
+            self.dirty = False
+            self.last_save = time.monotonic()
+
+    def maybe_save(self):
+        """Сохранить индекс, если он изменён и интервал сохранения истёк"""
+        with self.lock:
+            if self.dirty and time.monotonic() - self.last_save >= self.SAVE_INTERVAL:
+                self.save()
+
+    def close(self):
+        with self.lock:
+            if self.dirty:
+                self.save()
+
+    # --- Построение ---
+
+    def _build(self, rel):
+        """Построить записи для поддерева и вернуть его суммарный размер"""
+        scans = {}
+        for scan in traversal.scan_tree(self._abs(rel), self.workers):
+            scans[self._rel(scan.path)] = scan
+        if rel not in scans:
+            return 0
+
+        # Собираем записи снизу вверх, чтобы итоги детей были готовы
+        def depth(r):
+            return -1 if r == '.' else r.count(os.sep)
+
+        for current in sorted(scans, key=depth, reverse=True):
+            scan = scans[current]
+            record = {'mtime_ns': scan.mtime_ns, 'files': scan.files, 'dirs': [],
+                      'total': sum(scan.files.values())}
+            for name in scan.dirs:
+                child = self.dirs.get(self._child(current, name))
+                if child is not None and self._child(current, name) in scans:
+                    record['dirs'].append(name)
+                    record['total'] += child['total']
+            self.dirs[current] = record
+            self._emit_files('add', current, scan.files)
+        self.dirty = True
+        return self.dirs[rel]['total']
+
+    def _drop(self, rel):
+        """Удалить записи поддерева и вернуть его суммарный размер"""
+        record = self.dirs.get(rel)
+        if record is None:
+            return 0
+        stack = [rel]
+        while stack:
+            current = stack.pop()
+            removed = self.dirs.pop(current, None)
+            if removed:
+                self._emit_files('remove', current, removed['files'])
+                stack.extend(self._child(current, name) for name in removed['dirs'])
+        self.dirty = True
+        return record['total']
+
+    def _add_delta(self, rel, delta):
+        """Распространить изменение размера вверх до корня"""
+        if not delta:
+            return
+        while True:
+            record = self.dirs.get(rel)
+            if record is not None:
+                record['total'] += delta
+            if rel == '.':
+                break
+            rel = self._parent(rel)
+        self.dirty = True
+
+    def _attach(self, rel):
+        """Построить новую поддиректорию и учесть её у родителя"""
+        total = self._build(rel)
+        if rel not in self.dirs:
+            return
+        parent = self.dirs.get(self._parent(rel))
+        name = os.path.basename(rel)
+        if parent is not None and name not in parent['dirs']:
+            parent['dirs'].append(name)
+        self._add_delta(self._parent(rel), total)
+
+    def _detach(self, rel):
+        """Удалить поддиректорию из индекса и у родителя"""
+        total = self._drop(rel)
+        parent = self.dirs.get(self._parent(rel))
+        name = os.path.basename(rel)
+        if parent is not None and name in parent['dirs']:
+            parent['dirs'].remove(name)
+        self._add_delta(self._parent(rel), -total)
+
+    # --- Публичный интерфейс ---
+
+    def reconcile(self):
+        """Сверка с диском по mtime директорий.
+
+        Перечитываются только директории, у которых изменился mtime,
+        то есть добавленные, удалённые или переименованные записи.
+        """
+        with self.lock:
+            if '.' not in self.dirs:
+                self._build('.')
+                return
+            stack = ['.']
+            while stack:
+                rel = stack.pop()
+                record = self.dirs.get(rel)
+                if record is None:
+                    continue
+                try:
+                    mtime_ns = os.stat(self._abs(rel)).st_mtime_ns
+                except OSError:
+                    self._detach(rel)
+                    continue
+                if mtime_ns != record['mtime_ns']:
+                    self._rescan(rel)
+                stack.extend(self._child(rel, name) for name in record['dirs'])
+
+    def _rescan(self, rel):
+        """Перечитать содержимое одной директории, сохранив поддеревья"""
+        record = self.dirs[rel]
+        try:
+            mtime_ns, files, subdirs = traversal.scan_dir(self._abs(rel))[1:]
+        except OSError:
+            self._detach(rel)
+            return
+        old_files = record['files']
+        delta = sum(files.values()) - sum(old_files.values())
+        record['files'] = files
+        self._emit_files('remove', rel, old_files.keys() - files.keys())
+        self._emit_files('add', rel, files.keys() - old_files.keys())
+        self._emit_files('change', rel, [name for name in files.keys() & old_files.keys()
+                                         if files[name] != old_files[name]])
+        record['mtime_ns'] = mtime_ns
+        self._add_delta(rel, delta)
+        self.dirty = True
+
+        old_dirs = set(record['dirs'])
+        new_dirs = set(subdirs)
+        for name in old_dirs - new_dirs:
+            self._detach(self._child(rel, name))
+        for name in new_dirs - old_dirs:
+            self._attach(self._child(rel, name))
+
+    def touch(self, path):
+        """Обновить индекс для пути, изменённого операцией менеджера"""
+        with self.lock:
+            rel = self._rel(path)
+            if rel is None:
+                return
+            if rel == '.':
+                self.reconcile()
+                return
+
+            parent_rel = self._parent(rel)
+            parent = self.dirs.get(parent_rel)
+            if parent is None:
+                # Родитель создан только что (например, makedirs или unzip)
+                if os.path.isdir(self._abs(parent_rel)):
+                    self.touch(self._abs(parent_rel))
+                return
+
+            name = os.path.basename(rel)
+            abs_path = self._abs(rel)
+            is_dir = os.path.isdir(abs_path) and not os.path.islink(abs_path)
+            is_file = not is_dir and os.path.isfile(abs_path)
+            if rel in self.dirs:
+                self._detach(rel)
+            old_size = parent['files'].pop(name, None)
+            if old_size is not None:
+                self._add_delta(parent_rel, -old_size)
+                self.dirty = True
+                if not is_file:
+                    self._emit('remove', rel)
+
+            if is_dir:
+                self._attach(rel)
+            elif is_file:
+                size = os.path.getsize(abs_path)
+                parent['files'][name] = size
+                self._add_delta(parent_rel, size)
+                self.dirty = True
+                self._emit('add' if old_size is None else 'change', rel)
+            # mtime родителя не обновляем: следующая сверка перечитает
+            # директорию и заметит изменения, сделанные в обход менеджера
+
+    def start_refresh(self, interval):
+        """Запустить фоновую сверку с диском раз в interval секунд"""
+        with self.lock:
+            if self.refresh_thread is not None or interval <= 0:
+                return
+
+            def refresh_loop():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.reconcile()
+                        self.maybe_save()
+                    except OSError:
+                        continue
+
+            self.refresh_thread = threading.Thread(target=refresh_loop, daemon=True)
+            self.refresh_thread.start()
+
+    def total(self, path=None):
+        """Суммарный размер поддерева за O(1) или None, если путь не в индексе"""
+        with self.lock:
+            rel = '.' if path is None else self._rel(path)
+            record = self.dirs.get(rel) if rel is not None else None
+            return record['total'] if record is not None else None
@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import FileManager
+from src.capture import capture_output
+from src.auth import UserManager
+from src.service import FileService
+
+
+def make_config(root, **overrides):
+    """Конфигурация для тестов: без фонового обновления индекса и корзины"""
+    config = {
+        'workspace': str(root),
+        'index_refresh_interval': 0,
+        'quota': {'default': 100 * 1024 * 1024},
+        'trash': {'retention': 0},
+        'meta_cache': {'inotify': False},
+    }
+    config.update(overrides)
+    return config
+
+
+@pytest.fixture
+def config(tmp_path):
+    return make_config(tmp_path / 'root')
+
+
+@pytest.fixture
+def manager(config):
+    fm = FileManager(config, 'alice')
+    yield fm
+    fm.close()
+
+
+@pytest.fixture
+def run(manager):
+    """Выполнить команду и вернуть её вывод"""
+    def run_command(line, fm=manager):
+        with capture_output() as out:
+            fm.execute(line)
+        return out.getvalue()
+    return run_command
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+    return path
+
+
+@pytest.fixture
+def service(tmp_path):
+    config = make_config(tmp_path / 'root')
+    user_manager = UserManager(config)
+    with capture_output():
+        user_manager.register('bob', 'secret')
+    service = FileService(config, user_manager, workers=4)
+    yield service
+    service.close()
+
+
+async def request(reader, writer, line):
+    writer.write(line.encode('utf-8') + b'\n')
+    return json.loads(await reader.readline())
+
+
+async def login(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    assert (await request(reader, writer, 'LOGIN bob secret'))['ok']
+    return reader, writer
+
+
+async def wait_for(condition, timeout=10):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return True
+        await asyncio.sleep(0.01)
+    return condition()
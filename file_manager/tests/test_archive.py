@@ -0,0 +1,89 @@
+import os
+import zipfile
+
+import pytest
+
+from conftest import write
+from src import archive
+
+
+def make_flat_archive(path, dirs=20, files_per_dir=5):
+    """Архив без записей директорий: только файлы во вложенных путях"""
+    with zipfile.ZipFile(path, 'w') as zipf:
+        for d in range(dirs):
+            for f in range(files_per_dir):
+                zipf.writestr(f"top/d{d}/sub/f{f}.txt", f"{d}-{f}\n" * 100)
+
+
+@pytest.mark.parametrize('attempt', range(10))
+def test_extract_without_directory_entries(tmp_path, attempt):
+    archive_path = str(tmp_path / 'flat.zip')
+    make_flat_archive(archive_path)
+    target = str(tmp_path / 'out')
+    names = archive.extract_archive(archive_path, target, workers=8)
+    assert len(names) == 100
+    with open(os.path.join(target, 'top', 'd7', 'sub', 'f3.txt')) as f:
+        assert f.read() == "7-3\n" * 100
+
+
+def test_extract_sanitizes_paths(tmp_path):
+    archive_path = str(tmp_path / 'evil.zip')
+    with zipfile.ZipFile(archive_path, 'w') as zipf:
+        zipf.writestr('../../escape.txt', 'x')
+        zipf.writestr('/abs/file.txt', 'y')
+    target = str(tmp_path / 'out')
+    archive.extract_archive(archive_path, target, workers=2)
+    assert os.path.exists(os.path.join(target, 'escape.txt'))
+    assert os.path.exists(os.path.join(target, 'abs', 'file.txt'))
+    assert not os.path.exists(str(tmp_path / 'escape.txt'))
+
+
+@pytest.mark.parametrize('method', sorted(archive.METHODS))
+def test_create_and_extract_roundtrip(tmp_path, method):
+    src = tmp_path / 'src'
+    small = write(str(src / 'small.txt'), 'hello\n' * 10)
+    big = write(str(src / 'nested' / 'big.bin'), os.urandom(100 * 1024) + b'\0' * 200 * 1024)
+    os.makedirs(str(src / 'empty'))
+    archive_path = str(tmp_path / 'a.zip')
+    archive.create_archive(archive.collect_entries([str(src)]), archive_path,
+                           archive.resolve_method(method), workers=2)
+    with zipfile.ZipFile(archive_path) as zipf:
+        assert zipf.testzip() is None
+    out = str(tmp_path / 'out')
+    archive.extract_archive(archive_path, out, workers=2)
+    for path in (small, big):
+        with open(path, 'rb') as f, open(os.path.join(out, 'src', os.path.relpath(path, str(src))), 'rb') as g:
+            assert f.read() == g.read()
+    assert os.path.isdir(os.path.join(out, 'src', 'empty'))
+
+
+def test_fallback_without_raw_write(tmp_path, monkeypatch):
+    from src import tiering
+    monkeypatch.setattr(archive, 'raw_write_supported', lambda: False)
+    text = 'cold line\n' * 10000
+    plain = write(str(tmp_path / 'src' / 'plain.txt'), 'plain\n')
+    cold = write(str(tmp_path / 'src' / 'cold.txt'), text)
+    assert tiering.compress_file(cold, tiering.CODEC_LZMA) is not None
+    archive_path = str(tmp_path / 'a.zip')
+    archive.create_archive(archive.collect_entries([plain, cold]), archive_path,
+                           zipfile.ZIP_DEFLATED, level=9, workers=2)
+    with zipfile.ZipFile(archive_path) as zipf:
+        assert zipf.read('cold.txt').decode() == text
+        assert zipf.getinfo('cold.txt').compress_type == zipfile.ZIP_DEFLATED
+        assert zipf.read('plain.txt') == b'plain\n'
+
+
+def test_lzma_level_rejected(tmp_path):
+    src = write(str(tmp_path / 'f.txt'), 'x')
+    with pytest.raises(ValueError):
+        archive.create_archive(archive.collect_entries([src]), str(tmp_path / 'a.zip'),
+                               zipfile.ZIP_LZMA, level=5)
+    assert not os.path.exists(str(tmp_path / 'a.zip'))
+
+
+def test_zip_command_lzma_level(manager, run):
+    write(os.path.join(manager.workspace, 'f.txt'), 'data\n' * 100)
+    assert 'Ошибка' in run('zip -m lzma -l 5 f.txt a.zip')
+    manager.archive_settings = {'method': 'lzma', 'level': 6}
+    output = run('zip f.txt b.zip')
+    assert 'Предупреждение' in output and 'Архив создан' in output
@@ -0,0 +1,98 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+NET_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'net_app')
+sys.path.insert(0, NET_APP)
+
+from servers import async_server
+from servers.async_server import AsyncServer, read_frame, write_frame
+
+
+def serve(test, protocol='plain', **options):
+    """Запустить сервер с одним протоколом на свободном порту и выполнить test(port)"""
+    async def main():
+        server = AsyncServer(**options)
+        await server.start([(protocol, 0)])
+        port = server.servers[0].sockets[0].getsockname()[1]
+        try:
+            return await test(port, server)
+        finally:
+            for listener in server.servers:
+                listener.close()
+                await listener.wait_closed()
+    return asyncio.run(main())
+
+
+def test_plain_echo(capsys):
+    async def test(port, server):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'hello ')
+        writer.write(b'world')
+        data = b''
+        while len(data) < 11:
+            data += await reader.read(100)
+        writer.close()
+        return data
+
+    assert serve(test) == b'hello world'
+
+
+def test_framed_echo_and_concurrent_clients(capsys):
+    async def client(port, n):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        replies = []
+        for i in range(5):
+            write_frame(writer, f'{n}:{i}'.encode())
+            replies.append(await read_frame(reader))
+        writer.close()
+        return replies
+
+    async def test(port, server):
+        results = await asyncio.gather(*(client(port, n) for n in range(20)))
+        await asyncio.sleep(0.05)
+        return results, server.total_connections, server.peak_connections
+
+    results, total, peak = serve(test, 'framed')
+    assert results[7] == [f'7:{i}'.encode() for i in range(5)]
+    assert total == 20 and 1 <= peak <= 20
+
+
+def test_oversized_frame_closes_connection(capsys):
+    async def test(port, server):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write((1024).to_bytes(async_server.FRAME_HEADER, 'big') + b'x' * 1024)
+        data = await reader.read()
+        writer.close()
+        return data
+
+    assert serve(test, 'framed', max_frame=100) == b''
+    assert 'больше допустимых' in capsys.readouterr().out
+
+
+def test_unknown_protocol():
+    async def main():
+        await AsyncServer().start([('gopher', 0)])
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+@pytest.mark.skipif(async_server.crypto_utils is None, reason="нужен пакет cryptography")
+def test_secure_echo(capsys):
+    crypto_utils = async_server.crypto_utils
+
+    async def test(port, server):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        server_key = crypto_utils.deserialize_public_key(await read_frame(reader))
+        private_key, public_key = crypto_utils.generate_dh_key_pair()
+        write_frame(writer, crypto_utils.serialize_public_key(public_key))
+        shared_key = crypto_utils.derive_shared_key(private_key, server_key)
+        write_frame(writer, crypto_utils.encrypt_message(shared_key, 'привет'))
+        reply = crypto_utils.decrypt_message(shared_key, await read_frame(reader))
+        writer.close()
+        return reply
+
+    assert serve(test, 'secure') == 'ECHO: привет'
@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.auth import UserManager
+from src.capture import capture_output
+from conftest import make_config
+
+
+@pytest.fixture
+def users(tmp_path):
+    config = make_config(tmp_path / 'root', auth={'workers': 2, 'token_ttl': 60})
+    manager = UserManager(config)
+    with capture_output():
+        manager.register('alice', 'secret')
+    return manager
+
+
+def test_register_and_login(users):
+    assert users.verify_password('alice', 'secret') is True
+    assert users.verify_password('alice', 'wrong') is False
+    assert users.verify_password('bob', 'secret') is None
+    with capture_output():
+        with pytest.raises(ValueError):
+            users.register('alice', 'other')
+
+
+def test_tokens(users):
+    token = users.issue_token('alice')
+    assert users.verify_token(token) == 'alice'
+    # Токен подписан ключом рабочей области - новый экземпляр его принимает
+    assert UserManager(users.config).verify_token(token) == 'alice'
+    encoded, signature = token.rsplit('.', 1)
+    assert users.verify_token(encoded + '.' + '0' * len(signature)) is None
+    assert users.verify_token('garbage') is None
+    assert users.verify_token(users.issue_token('alice', ttl=-1)) is None
+    assert users.verify_token(users.issue_token('ghost')) is None
+
+
+def test_parallel_logins(users):
+    # PBKDF2 считается в пуле процессов, потоки входа его только ждут
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(lambda password: users.verify_password('alice', password),
+                                    ['secret', 'wrong'] * 4))
+    assert results == [True, False] * 4
+
+
+@pytest.mark.parametrize('username', ['', '.blobs', '.trash', '.index', '..', '../bob', 'a/b', 'a\\b'])
+def test_reserved_usernames_are_rejected(users, username):
+    with pytest.raises(ValueError):
+        users.register(username, 'secret')
+    assert users.get_user(username) is None
+
+
+def test_legacy_reserved_username_cannot_log_in(users):
+    record = users.get_user('alice')
+    users.store.add('.blobs', dict(record, home='.blobs'))
+    assert users.verify_password('.blobs', 'secret') is None
+    assert users.verify_token(users.issue_token('.blobs')) is None
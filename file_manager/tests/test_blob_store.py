@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from src.blob_store import BlobStore
+from src.core import FileManager
+from conftest import make_config, write
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path / '.blobs'))
+
+
+def test_link_copy_shares_content(store, tmp_path):
+    src = write(str(tmp_path / 'a.txt'), 'data')
+    dest = store.link_copy(src, str(tmp_path / 'b.txt'))
+    assert os.path.samefile(src, dest)
+    assert store.refcount(store.blob_for(src)) == 2
+
+
+def test_link_copy_keeps_metadata_of_other_links(store, tmp_path):
+    src = write(str(tmp_path / 'a.txt'), 'data')
+    other = write(str(tmp_path / 'other.txt'), 'data')
+    os.chmod(other, 0o600)
+    os.utime(other, (1000, 1000))
+    blob = store.ingest(other)
+    # Такое же содержимое с другими правами не связывается с блобом
+    dest = store.link_copy(src, str(tmp_path / 'b.txt'))
+    assert store.blob_for(src) is None
+    assert not os.path.samefile(dest, other)
+    st = os.stat(other)
+    assert (st.st_mode & 0o777, st.st_mtime) == (0o600, 1000)
+    assert os.stat(dest).st_mode & 0o777 == os.stat(src).st_mode & 0o777
+    assert store.refcount(blob) == 1
+
+
+def test_same_content_same_mode_is_deduplicated(store, tmp_path):
+    first = write(str(tmp_path / 'a.txt'), 'data')
+    second = write(str(tmp_path / 'b.txt'), 'data')
+    assert store.ingest(first) == store.ingest(second)
+    assert os.path.samefile(first, second)
+
+
+def test_release_and_collect(store, tmp_path):
+    path = write(str(tmp_path / 'a.txt'), 'data')
+    blob = store.ingest(path)
+    os.remove(path)
+    assert store.collect() == 1
+    assert not os.path.exists(blob)
+
+
+def test_dedup_copy_then_write_detaches(tmp_path):
+    config = make_config(tmp_path / 'root', storage={'mode': 'dedup'})
+    fm = FileManager(config, 'alice')
+    try:
+        fm.execute('write a.txt original')
+        fm.execute('copy a.txt b.txt')
+        a, b = (os.path.join(fm.workspace, name) for name in ('a.txt', 'b.txt'))
+        assert os.path.samefile(a, b)
+        fm.execute('write b.txt changed')
+        with open(a) as f:
+            assert f.read() == 'original'
+        with open(b) as f:
+            assert f.read() == 'changed'
+    finally:
+        fm.close()
@@ -0,0 +1,79 @@
+import os
+
+from src import bulk
+from conftest import write
+
+
+def tree(root):
+    for name in ('a.log', 'b.log', 'c.txt', 'sub/d.log', 'sub/deep/e.log'):
+        write(os.path.join(root, name), name)
+    return str(root)
+
+
+def test_pattern_base_and_recursive_pattern(tmp_path):
+    root = tree(tmp_path)
+    assert bulk.pattern_base(os.path.join(root, 'sub', '*.log')) == os.path.join(root, 'sub')
+    assert bulk.recursive_pattern(os.path.join(root, '*.log')) == os.path.join(root, '**', '*.log')
+    assert bulk.recursive_pattern(os.path.join(root, 'sub')) == os.path.join(root, 'sub', '**')
+
+
+def test_iter_matches(tmp_path):
+    root = tree(tmp_path)
+    pattern = os.path.join(root, '*.log')
+    names = sorted(os.path.relpath(path, root) for path, _ in bulk.iter_matches([pattern]))
+    assert names == ['a.log', 'b.log']
+    recursive = sorted(os.path.relpath(path, root) for path, _ in bulk.iter_matches([pattern], True))
+    assert recursive == ['a.log', 'b.log', os.path.join('sub', 'd.log'), os.path.join('sub', 'deep', 'e.log')]
+    # Пересекающиеся шаблоны не выдают файл дважды
+    both = list(bulk.iter_matches([pattern, os.path.join(root, 'a.*')]))
+    assert len(both) == 2
+
+
+def test_overlapping_patterns_yield_each_file_once(tmp_path):
+    root = tree(tmp_path)
+    write(os.path.join(root, '.hidden.log'), 'h')
+    patterns = [os.path.join(root, '**', '*.log'), os.path.join(root, 'sub', '*'),
+                os.path.join(root, 'a.log'), os.path.join(root, '.*'), os.path.join(root, '*.log', '**')]
+    names = [os.path.relpath(path, root) for path, _ in bulk.iter_matches(patterns)]
+    assert sorted(names) == ['.hidden.log', 'a.log', 'b.log', os.path.join('sub', 'd.log'),
+                             os.path.join('sub', 'deep', 'e.log')]
+    # Несуществующий путь без подстановок попадает в итог как ошибка
+    missing = os.path.join(root, 'missing.log')
+    assert [path for path, _ in bulk.iter_matches([patterns[0], missing])][-1] == missing
+
+
+def test_match_pattern_follows_glob_rules():
+    def w(*parts):
+        return os.path.join(os.sep, 'w', *parts)
+
+    assert bulk.match_pattern(w('a', 'b', 'c.txt'), w('**', '*.txt'))
+    assert bulk.match_pattern(w('c.txt'), w('**', '*.txt'))
+    assert not bulk.match_pattern(w('.git', 'c.txt'), w('**', '*.txt'))
+    assert not bulk.match_pattern(w('.c.txt'), w('*.txt'))
+    assert bulk.match_pattern(w('.c.txt'), w('.*'))
+    # Последний ** без компонентов выдаёт только директорию
+    assert not bulk.match_pattern(w('c.txt'), w('*.txt', '**'))
+    assert bulk.match_pattern(w('d.txt'), w('*.txt', '**'), is_dir=True)
+
+
+def test_run_bulk_counts_failures():
+    def func(item):
+        if item % 5 == 0:
+            raise OSError(f"сбой {item}")
+        return item
+
+    result = bulk.run_bulk(range(1, 101), func, workers=4)
+    assert (result.files, result.failed) == (80, 20)
+    assert result.bytes == sum(i for i in range(1, 101) if i % 5)
+    assert len(result.failures) == bulk.MAX_REPORTED_FAILURES
+
+
+def test_bulk_commands_keep_structure(manager, run):
+    tree(manager.workspace)
+    out = run('copy -r *.log backup')
+    assert 'Скопировано: 4 файлов' in out
+    assert os.path.isfile(os.path.join(manager.workspace, 'backup', 'sub', 'deep', 'e.log'))
+    out = run('delete *.log')
+    assert 'Удалено: 2 файлов' in out
+    assert os.path.exists(os.path.join(manager.workspace, 'c.txt'))
+    assert os.path.exists(os.path.join(manager.workspace, 'sub', 'd.log'))
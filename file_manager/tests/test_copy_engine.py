@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pytest
+
+from conftest import write
+from src import copy_engine
+
+
+@pytest.mark.parametrize('method', copy_engine.METHODS)
+def test_copy_file_each_method(tmp_path, method):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    src = write(str(tmp_path / 'src.bin'), data)
+    dst = str(tmp_path / 'dst.bin')
+    used = copy_engine.copy_file(src, dst, methods=(method, 'buffered'))
+    assert used in (method, 'buffered')
+    with open(dst, 'rb') as f:
+        assert f.read() == data
+
+
+def test_short_kernel_copy_falls_back_to_buffered(tmp_path, monkeypatch):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    src = write(str(tmp_path / 'src.bin'), data)
+    dst = str(tmp_path / 'dst.bin')
+    real_sendfile = os.sendfile
+    calls = []
+
+    def short_sendfile(out_fd, in_fd, offset, count):
+        # Первый блок копируется, затем источник будто закончился
+        calls.append(offset)
+        return real_sendfile(out_fd, in_fd, offset, 1024 * 1024) if len(calls) == 1 else 0
+
+    monkeypatch.setattr(os, 'sendfile', short_sendfile)
+    assert copy_engine.copy_file(src, dst, methods=('sendfile', 'buffered')) == 'buffered'
+    with open(dst, 'rb') as f:
+        assert f.read() == data
+
+
+def test_copy_file_onto_itself_keeps_content(tmp_path):
+    src = write(str(tmp_path / 's.txt'), 'content')
+    with pytest.raises(shutil.SameFileError):
+        copy_engine.copy_file(src, src)
+    with pytest.raises(shutil.SameFileError):
+        copy_engine.copy2(src, str(tmp_path))
+    with open(src) as f:
+        assert f.read() == 'content'
+
+
+def test_copy_command_onto_itself(manager, run):
+    path = write(os.path.join(manager.workspace, 's.txt'), 'content')
+    for line in ('copy s.txt s.txt', 'copy s.txt ./'):
+        output = run(line)
+        assert 'Ошибка' in output and 'Скопировано' not in output
+    with open(path) as f:
+        assert f.read() == 'content'
+
+
+def test_copy_command_onto_itself_dedup(tmp_path, run):
+    from conftest import make_config
+    from src.core import FileManager
+    fm = FileManager(make_config(tmp_path / 'root', storage={'mode': 'dedup'}), 'bob')
+    try:
+        path = write(os.path.join(fm.workspace, 's.txt'), 'content')
+        assert 'Скопировано' in run('copy s.txt t.txt', fm)
+        # Вторая копия поверх ссылки на тот же блоб - не ошибка
+        assert 'Скопировано' in run('copy s.txt t.txt', fm)
+        assert 'Ошибка' in run('copy s.txt s.txt', fm)
+        with open(path) as f:
+            assert f.read() == 'content'
+    finally:
+        fm.close()
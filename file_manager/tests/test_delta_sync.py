@@ -0,0 +1,58 @@
+import os
+import random
+
+from src import delta_sync
+from conftest import write
+
+
+def data(size, seed=1):
+    return random.Random(seed).randbytes(size)
+
+
+def test_sync_file_actions(tmp_path):
+    src = write(str(tmp_path / 'src.bin'), data(300000))
+    dest = str(tmp_path / 'out' / 'dest.bin')
+    assert delta_sync.sync_file(src, dest) == ('copy', 300000, 300000)
+    assert delta_sync.sync_file(src, dest)[0] == 'skip'
+
+    with open(src, 'r+b') as f:
+        f.seek(100000)
+        f.write(b'x' * 100)
+    action, written, size = delta_sync.sync_file(src, dest, block_size=4096)
+    assert action == 'delta'
+    assert written <= 2 * 4096
+    with open(src, 'rb') as a, open(dest, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_delta_handles_shifted_data(tmp_path):
+    body = data(200000)
+    dest = write(str(tmp_path / 'dest.bin'), body)
+    src = write(str(tmp_path / 'src.bin'), b'inserted' + body[:150000] + body[160000:])
+    # Сдвинутые блоки находятся скользящей суммой - литералов почти нет
+    ops = list(delta_sync.delta(src, delta_sync.signature(dest, 4096), 4096))
+    assert sum(len(op[1]) for op in ops if op[0] == 'data') < 3 * 4096
+    assert delta_sync.sync_file(src, dest, block_size=4096)[0] == 'delta'
+    with open(src, 'rb') as a, open(dest, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    src = write(str(tmp_path / 'src.bin'), data(50000))
+    dest = write(str(tmp_path / 'dest.bin'), data(50000, seed=2))
+    action, written, _ = delta_sync.sync_file(src, dest, dry_run=True)
+    assert action == 'delta' and written > 0
+    with open(dest, 'rb') as f:
+        assert f.read() == data(50000, seed=2)
+
+
+def test_sync_command_tree(manager, run, tmp_path):
+    ext = tmp_path / 'ext'
+    for i in range(3):
+        write(str(ext / 'tree' / 'sub' / f'f{i}.bin'), data(20000, seed=i))
+    out = run(f'sync {ext / "tree"} mirror')
+    assert 'новых 3, изменённых 0, без изменений 0' in out
+    out = run(f'sync {ext / "tree"} mirror')
+    assert 'новых 0, изменённых 0, без изменений 3' in out
+    with open(os.path.join(manager.workspace, 'mirror', 'sub', 'f1.bin'), 'rb') as f:
+        assert f.read() == data(20000, seed=1)
@@ -0,0 +1,66 @@
+import os
+import hashlib
+
+import pytest
+
+from src import hashing
+from conftest import write
+
+
+def test_hash_file_matches_hashlib(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    path = write(str(tmp_path / 'a.bin'), data)
+    assert hashing.hash_file(path, chunk_size=64 * 1024) == (hashlib.sha256(data).hexdigest(), len(data))
+    assert hashing.hash_file(path, 'blake2b')[0] == hashlib.blake2b(data).hexdigest()
+    with pytest.raises(ValueError):
+        hashing.resolve_algorithm('md5')
+
+
+def test_parse_manifest(tmp_path):
+    sha = 'a' * 64
+    blake = 'B' * 128
+    manifest = write(str(tmp_path / 'sums.txt'), f"# comment\n{sha}  x.txt\n{blake} *sub/y.bin\n")
+    assert hashing.parse_manifest(manifest) == [
+        ('sha256', sha, str(tmp_path / 'x.txt')),
+        ('blake2b', blake.lower(), str(tmp_path / 'sub' / 'y.bin')),
+    ]
+    write(manifest, 'short  x.txt\n')
+    with pytest.raises(ValueError):
+        hashing.parse_manifest(manifest)
+
+
+def test_digest_cache_skips_unchanged_files(manager):
+    path = write(os.path.join(manager.workspace, 'a.txt'), 'content')
+    # Недавно изменённый файл не кэшируется - делаем его старым
+    os.utime(path, (1000, 1000))
+    cache = manager.digest_cache
+    first = cache.digest(path)
+    assert first[1] == 7
+    assert cache.digest(path) == (first[0], 0, 7)
+    write(path, 'changed')
+    os.utime(path, (2000, 2000))
+    assert cache.digest(path)[1] == 7
+
+
+def test_hash_and_verify_commands(manager, run):
+    for name in ('a.txt', 'b.txt'):
+        write(os.path.join(manager.workspace, name), name)
+    run('hash --out sums.txt *.txt')
+    assert 'Все 2 файлов совпадают' in run('verify sums.txt')
+    write(os.path.join(manager.workspace, 'b.txt'), 'tampered')
+    out = run('verify --no-cache sums.txt')
+    assert 'не прошли проверку' in out and 'b.txt' in out
+
+
+def test_verify_rejects_entries_outside_workspace(manager, run, tmp_path):
+    secret = write(str(tmp_path / 'secret.txt'), 'secret')
+    write(os.path.join(manager.workspace, 'a.txt'), 'a')
+    run('hash --out sums.txt a.txt')
+    escape = os.path.relpath(secret, manager.workspace)
+    with open(os.path.join(manager.workspace, 'sums.txt'), 'a') as f:
+        f.write(f"{hashlib.sha256(b'secret').hexdigest()}  {escape}\n")
+    manager.confined = True
+    out = run('verify sums.txt')
+    assert 'не прошли проверку (из 2): 1' in out and 'Доступ запрещён' in out
+    manager.confined = False
+    assert 'Все 2 файлов совпадают' in run('verify sums.txt')
@@ -0,0 +1,86 @@
+import os
+import threading
+
+from src.jobs import PathLocks, JobQueue
+from src.capture import capture_output
+from conftest import write
+
+
+def test_job_locks_only_path_arguments(manager, run):
+    write(os.path.join(manager.workspace, 'f.txt'), 'line\n' * 10)
+    out = run('head f.txt 3 &')
+    assert out.startswith('[1]')
+    job = manager.jobs.wait(1, timeout=10)
+    assert job.status == 'done'
+    assert job.paths == [os.path.join(manager.workspace, 'f.txt')]
+    assert job.output.getvalue().count('line') == 3
+
+
+def test_ampersand_is_job_suffix_only_as_separate_token(manager, run):
+    run('write song.txt rock &')
+    run('write duo.txt rock&roll')
+    run('create "a &"')
+    for name, content in (('song.txt', 'rock &'), ('duo.txt', 'rock&roll')):
+        with open(os.path.join(manager.workspace, name)) as f:
+            assert f.read() == content
+    assert os.path.exists(os.path.join(manager.workspace, 'a &'))
+    assert manager.jobs.list() == []
+
+
+def test_job_paths_skip_option_values(manager):
+    ws = manager.workspace
+    assert manager.job_paths('zip', ['-m', 'deflate', '-l', '5', 'a', 'b.zip']) == \
+        [os.path.join(ws, 'a'), os.path.join(ws, 'b.zip')]
+    assert manager.job_paths('hash', ['--algo', 'md5', '--out', 'm.txt', '*.py']) == \
+        [os.path.join(ws, 'm.txt'), os.path.join(ws, '*.py')]
+    assert manager.job_paths('head', ['log.txt', '20']) == [os.path.join(ws, 'log.txt')]
+    assert manager.job_paths('search', ['*.txt', 'docs']) == [os.path.join(ws, 'docs')]
+    assert manager.job_paths('find-text', ['some', 'words']) == []
+    assert manager.job_paths('profile', ['--out', 'p.prof', 'write', 'f.txt', 'x']) == \
+        [os.path.join(ws, 'p.prof'), os.path.join(ws, 'f.txt')]
+
+
+def test_background_commands_run_in_submit_directory(manager, run):
+    run('mkdir sub')
+    run('cd sub')
+    run('create a.txt &')
+    run('cd ..')
+    assert manager.jobs.wait(1, timeout=10).status == 'done'
+    assert os.path.exists(os.path.join(manager.workspace, 'sub', 'a.txt'))
+
+
+def test_exclusive_locks_serialize_overlapping_paths(tmp_path):
+    locks = PathLocks()
+    held = locks.acquire([str(tmp_path / 'dir')])
+    cancelled = threading.Event()
+    cancelled.set()
+    # Вложенный путь занят, задача отменена - захват не ждёт
+    assert locks.acquire([str(tmp_path / 'dir' / 'file')], cancelled=cancelled) is None
+    # Соседний путь и разделяемый захват другого пути свободны
+    other = locks.acquire([str(tmp_path / 'dir2')], exclusive=False)
+    assert other is not None
+    locks.release(other)
+    locks.release(held)
+    assert locks.acquire([str(tmp_path / 'dir' / 'file')], cancelled=cancelled) is not None
+
+
+def test_cancel_queued_job():
+    started = threading.Event()
+    release = threading.Event()
+
+    def run(command):
+        started.set()
+        release.wait(10)
+        print(command)
+
+    queue = JobQueue(run, workers=1)
+    with capture_output():
+        first = queue.submit('first', ['/a'])
+        second = queue.submit('second', ['/b'])
+        assert started.wait(10)
+        queue.cancel(second.id)
+        release.set()
+        assert queue.wait(first.id, 10).status == 'done'
+        assert queue.wait(second.id, 10).status == 'cancelled'
+    assert first.output.getvalue() == 'first\n'
+    queue.executor.shutdown()
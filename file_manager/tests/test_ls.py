@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from conftest import write
+
+
+@pytest.fixture
+def listing(manager):
+    for i, name in enumerate(['c.txt', 'a.txt', 'e.txt', 'b.txt', 'd.txt']):
+        path = write(os.path.join(manager.workspace, 'files', name), 'x' * (10 * (i + 1)))
+        os.utime(path, (1000 + i, 1000 + i))
+    return os.path.join(manager.workspace, 'files')
+
+
+def names(out):
+    return out.split()
+
+
+def test_sorting(run, listing):
+    assert names(run('ls files')) == ['a.txt', 'b.txt', 'c.txt', 'd.txt', 'e.txt']
+    assert names(run('ls -r files')) == ['e.txt', 'd.txt', 'c.txt', 'b.txt', 'a.txt']
+    assert names(run('ls --sort size files')) == ['c.txt', 'a.txt', 'e.txt', 'b.txt', 'd.txt']
+    assert names(run('ls --sort mtime -r files')) == ['d.txt', 'b.txt', 'e.txt', 'a.txt', 'c.txt']
+    assert sorted(names(run('ls --sort none files'))) == ['a.txt', 'b.txt', 'c.txt', 'd.txt', 'e.txt']
+
+
+def test_pagination(run, listing):
+    out = run('ls --limit 2 files').splitlines()
+    assert out[:2] == ['a.txt', 'b.txt']
+    assert out[2].endswith('--offset 2')
+    out = run('ls --limit 2 --offset 2 --sort size -r files').splitlines()
+    assert out[:2] == ['e.txt', 'a.txt']
+    # Последняя страница - без подсказки
+    assert run('ls --limit 2 --offset 4 files').splitlines() == ['e.txt']
+
+
+def test_long_format_marks_directories(run, manager, listing):
+    os.makedirs(os.path.join(listing, 'sub'))
+    lines = run('ls -l files').splitlines()
+    assert lines[-1].startswith('d ') and lines[-1].endswith(' sub/')
+    first = lines[0].split()
+    assert (first[0], first[1], first[-1]) == ('-', '20', 'a.txt')
+
+
+def test_unknown_sort_key(run, listing):
+    with pytest.raises(ValueError):
+        run('ls --sort color files')
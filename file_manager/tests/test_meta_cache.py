@@ -0,0 +1,91 @@
+import os
+import tracemalloc
+
+import pytest
+
+from conftest import write
+from src.meta_cache import MetaCache, ENTRY_OVERHEAD
+
+
+@pytest.fixture
+def scandir_calls(monkeypatch):
+    calls = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        calls.append(os.path.abspath(path))
+        return scandir(path)
+    monkeypatch.setattr(os, 'scandir', counting_scandir)
+    return calls
+
+
+def make_dir(root, count):
+    os.makedirs(root)
+    for i in range(count):
+        open(os.path.join(root, f"f{i:06}"), 'w').close()
+    return root
+
+
+@pytest.mark.parametrize('use_inotify', [False, True])
+def test_stat_does_not_scan_uncached_parent(tmp_path, scandir_calls, use_inotify):
+    cache = MetaCache(str(tmp_path), use_inotify=use_inotify)
+    big = make_dir(str(tmp_path / 'big'), 500)
+    for _ in range(5):
+        entry = cache.stat(os.path.join(big, 'f000007'))
+        assert entry is not None and not entry.is_dir and entry.name == 'f000007'
+    assert cache.stat(os.path.join(big, 'missing')) is None
+    assert cache.isdir(big)
+    assert scandir_calls == []
+
+
+def test_stat_uses_cached_parent(tmp_path, scandir_calls):
+    cache = MetaCache(str(tmp_path), use_inotify=False)
+    path = write(str(tmp_path / 'd' / 'a.txt'), 'abc')
+    assert [entry.name for entry in cache.scan(str(tmp_path / 'd'))] == ['a.txt']
+    hits = cache.hits
+    assert cache.getsize(path) == 3
+    assert cache.hits == hits + 1
+    assert len(scandir_calls) == 1
+    # Изменение директории сбрасывает снимок по mtime
+    os.remove(path)
+    assert not cache.exists(path)
+
+
+def test_stat_follows_symlinks(tmp_path):
+    cache = MetaCache(str(tmp_path), use_inotify=False)
+    target = str(tmp_path / 'target')
+    os.makedirs(target)
+    os.symlink(target, str(tmp_path / 'link'))
+    os.symlink(str(tmp_path / 'nowhere'), str(tmp_path / 'broken'))
+    list(cache.scan(str(tmp_path)))
+    for cached in (True, False):
+        if not cached:
+            cache.invalidate(str(tmp_path / 'link'))
+        entry = cache.stat(str(tmp_path / 'link'))
+        assert entry.is_dir and entry.is_symlink
+        assert cache.stat(str(tmp_path / 'broken')) is None
+
+
+def test_huge_directory_not_collected(tmp_path):
+    count = 20000
+    big = make_dir(str(tmp_path / 'big'), count)
+    # Кэш вмещает не больше 100 записей одной директории
+    cache = MetaCache(str(tmp_path), max_bytes=4 * 100 * (ENTRY_OVERHEAD + 7), use_inotify=False)
+    tracemalloc.start()
+    try:
+        seen = sum(1 for _ in cache.scan(big))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert seen == count
+    assert big not in cache.dirs
+    # Все записи в памяти заняли бы несколько мегабайт
+    assert peak < 1024 * 1024
+
+
+def test_small_directory_cached(tmp_path):
+    small = make_dir(str(tmp_path / 'small'), 10)
+    cache = MetaCache(str(tmp_path), use_inotify=False)
+    assert len(list(cache.scan(small))) == 10
+    assert small in cache.dirs
+    assert cache.stats()['bytes'] == ENTRY_OVERHEAD + sum(ENTRY_OVERHEAD + 7 for _ in range(10))
@@ -0,0 +1,48 @@
+import os
+
+from src.workspace_index import WorkspaceIndex
+from src.name_index import NameIndex
+from conftest import write
+
+
+NAMES = ['report.txt', 'report.txt.bak', 'notes.md', 'docs/report.txt', 'docs/old/readme.md',
+         'src/main.py', 'src/test_main.py']
+
+
+def open_indexes(tmp_path):
+    root = str(tmp_path / 'ws')
+    for rel in NAMES:
+        write(os.path.join(root, rel), rel)
+    workspace_index = WorkspaceIndex(root, str(tmp_path / 'sizes.json'))
+    return workspace_index, NameIndex(workspace_index)
+
+
+def rels(index, paths):
+    return [os.path.relpath(path, index.root) for path in paths]
+
+
+def test_lookups(tmp_path):
+    _, index = open_indexes(tmp_path)
+    assert rels(index, index.search('report.txt')) == ['docs/report.txt', 'report.txt']
+    assert rels(index, index.search('*.md')) == ['docs/old/readme.md', 'notes.md']
+    assert rels(index, index.search('*main.py')) == ['src/main.py', 'src/test_main.py']
+    assert rels(index, index.search('rep*')) == ['docs/report.txt', 'report.txt', 'report.txt.bak']
+    assert rels(index, index.search('?otes.*')) == ['notes.md']
+    assert index.search('missing.txt') == []
+
+
+def test_search_dir_limits_results(tmp_path):
+    _, index = open_indexes(tmp_path)
+    docs = os.path.join(index.root, 'docs')
+    assert rels(index, index.search('*.md', docs)) == ['docs/old/readme.md']
+    assert rels(index, index.search('report.txt', docs)) == ['docs/report.txt']
+
+
+def test_follows_workspace_index_changes(tmp_path):
+    workspace_index, index = open_indexes(tmp_path)
+    added = write(os.path.join(index.root, 'docs', 'new.md'), 'new')
+    workspace_index.touch(added)
+    assert 'docs/new.md' in rels(index, index.search('*.md'))
+    os.remove(os.path.join(index.root, 'notes.md'))
+    workspace_index.touch(os.path.join(index.root, 'notes.md'))
+    assert rels(index, index.search('*.md')) == ['docs/new.md', 'docs/old/readme.md']
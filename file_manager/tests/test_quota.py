@@ -0,0 +1,64 @@
+import os
+import zipfile
+import threading
+
+import pytest
+
+from src.core import FileManager
+from src.quota import QuotaExceededError
+from conftest import make_config, write
+
+
+@pytest.fixture
+def small(tmp_path):
+    return FileManager(make_config(tmp_path / 'small', quota={'default': 1000}), 'alice')
+
+
+def test_write_and_copy_respect_quota(small, capsys):
+    a, b = (os.path.join(small.workspace, name) for name in ('a.txt', 'b.txt'))
+    small.file_ops.write_file(a, 'x' * 600)
+    small.file_ops.copy_file(a, b)
+    assert 'Превышена квота' in capsys.readouterr().out
+    assert not os.path.exists(b)
+    # Перезапись учитывает освобождаемый размер старого файла
+    small.file_ops.write_file(a, 'y' * 900)
+    assert 'Записано' in capsys.readouterr().out
+    assert small.quota_manager.used() == 900
+
+
+def test_reservations_add_up(small):
+    quota = small.quota_manager
+    with quota.reserve(600):
+        assert quota.available() == 400
+        with pytest.raises(QuotaExceededError):
+            with quota.reserve(500):
+                pass
+    assert quota.available() == 1000
+
+
+def test_parallel_writes_do_not_overshoot(small):
+    paths = [os.path.join(small.workspace, f'f{i}.txt') for i in range(6)]
+    threads = [threading.Thread(target=small.file_ops.write_file, args=(path, 'z' * 300)) for path in paths]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    written = sum(os.path.exists(path) for path in paths)
+    assert 1 <= written <= 3
+    assert small.quota_manager.used() == 300 * written
+
+
+def test_unzip_checks_declared_sizes(small, tmp_path, capsys):
+    archive = str(tmp_path / 'a.zip')
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr('a.txt', 'a' * 700)
+        zipf.writestr('sub/b.txt', 'b' * 500)
+    target = os.path.join(small.workspace, 'out')
+    write(os.path.join(target, 'a.txt'), 'old')
+    with zipfile.ZipFile(archive) as zipf:
+        # Заменяемый файл освобождает свой размер
+        assert small.quota_manager.extract_delta(zipf, target) == 1200 - 3
+    # Сжатый архив мал, но распакованный не помещается в квоту
+    small.file_ops.unzip_file(archive, target)
+    assert 'Превышена квота' in capsys.readouterr().out
+    assert not os.path.exists(os.path.join(target, 'sub'))
@@ -0,0 +1,60 @@
+import io
+import os
+
+import pytest
+
+from src import reader
+from conftest import write
+
+
+LINES = ''.join(f'строка {i}\n' for i in range(1, 101))
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Маленький блок - строки и символы UTF-8 попадают на границы блоков
+    monkeypatch.setattr(reader, 'CHUNK_SIZE', 7)
+
+
+def test_head_and_tail_offsets(small_chunks):
+    data = LINES.encode('utf-8')
+    f = io.BytesIO(data)
+    assert data[:reader.head_offset(f, 3)].decode() == 'строка 1\nстрока 2\nстрока 3\n'
+    assert data[reader.tail_offset(f, 2):].decode() == 'строка 99\nстрока 100\n'
+    assert reader.tail_offset(f, 1000) == 0
+    # Без завершающего перевода строки последняя строка тоже считается
+    f = io.BytesIO(b'a\nb\nc')
+    assert f.getvalue()[reader.tail_offset(f, 2):] == b'b\nc'
+
+
+def test_iter_text_keeps_multibyte_characters():
+    data = 'ёжик в тумане'.encode('utf-8')
+    chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+    assert ''.join(reader.iter_text(chunks)) == 'ёжик в тумане'
+
+
+def test_is_binary_and_hexdump():
+    assert reader.is_binary(b'abc\0def')
+    assert not reader.is_binary('текст'.encode('utf-8')[:-1])
+    lines = list(reader.hexdump([b'\x00\x01ABCDEFGHIJKLMNOP'], offset=16))
+    assert lines[0].startswith('00000010  00 01 41')
+    assert lines[1].startswith('00000020  4f 50') and lines[1].endswith('OP')
+
+
+def test_head_tail_range_commands(manager, capsys):
+    path = write(os.path.join(manager.workspace, 'log.txt'), LINES)
+    manager.file_ops.head_file(path, 2)
+    assert capsys.readouterr().out == 'строка 1\nстрока 2\n'
+    manager.file_ops.tail_file(path, 1)
+    assert capsys.readouterr().out == 'строка 100\n'
+    manager.file_ops.read_range(path, len('строка 1\n'.encode()), len('строка 2'.encode()))
+    assert capsys.readouterr().out == 'строка 2\n'
+    for use_mmap in (False, True):
+        manager.file_ops.read_range(path, 0, 6, use_mmap)
+        assert capsys.readouterr().out == 'стр\n'
+
+
+def test_binary_range_is_dumped(manager, capsys):
+    path = write(os.path.join(manager.workspace, 'data.bin'), bytes(range(64)))
+    manager.file_ops.read_range(path, 32, 16)
+    assert capsys.readouterr().out.startswith('00000020  20 21 22')
@@ -0,0 +1,61 @@
+import os
+import json
+import asyncio
+
+from conftest import request, login, wait_for
+
+
+def test_protocol_and_session_cleanup(service):
+    async def scenario():
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        assert not (await request(reader, writer, 'LOGIN bob wrong'))['ok']
+        assert not (await request(reader, writer, 'ls'))['ok']
+        reply = await request(reader, writer, 'LOGIN bob secret')
+        assert reply['ok'] and reply['token']
+
+        data = os.urandom(300000)
+        writer.write(f"PUT up.bin {len(data)}\n".encode() + data)
+        assert json.loads(await reader.readline()) == {'ok': True, 'size': len(data)}
+        header = await request(reader, writer, 'GET up.bin')
+        assert header['size'] == len(data)
+        assert await reader.readexactly(header['size']) == data
+        assert 'up.bin' in (await request(reader, writer, 'ls'))['output']
+        # Выход за рабочую область запрещён
+        assert not (await request(reader, writer, 'GET ../../etc/passwd'))['ok']
+
+        # Второе соединение того же пользователя - отдельная сессия
+        reader2, writer2 = await asyncio.open_connection('127.0.0.1', port)
+        assert (await request(reader2, writer2, f"TOKEN {reply['token']}"))['ok']
+        assert len(service.managers) == 2
+
+        writer.write(b'QUIT\n')
+        await writer.drain()
+        assert await wait_for(lambda: len(service.managers) == 1)
+        writer2.close()
+        assert await wait_for(lambda: not service.managers)
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(scenario())
+
+
+def test_closed_session_saves_indexes(service):
+    closed = []
+
+    async def scenario():
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await login(port)
+        manager = next(iter(service.managers))
+        close = manager.close
+        manager.close = lambda: closed.append(manager) or close()
+        assert (await request(reader, writer, 'write a.txt hello'))['ok']
+        writer.close()
+        assert await wait_for(lambda: closed)
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(scenario())
+    assert len(closed) == 1
@@ -0,0 +1,125 @@
+import os
+import json
+import threading
+
+import pytest
+
+from src import bulk, stats
+from src.stats import Histogram, Stats
+
+
+def test_histogram_percentiles_within_bucket_error():
+    histogram = Histogram()
+    for value in range(1, 100001):
+        histogram.record(value)
+    for p in (50, 90, 99):
+        exact = 100000 * p / 100
+        assert exact <= histogram.percentile(p) <= exact * (1 + 1 / stats.SUB_COUNT)
+    assert histogram.percentile(100) == 100000
+    assert sum(count for _, _, count in histogram.buckets()) == 100000
+
+
+def test_measure_counts_errors_and_files():
+    collected = Stats()
+    with collected.measure('write'):
+        stats.touch(2)
+    with collected.measure('write'):
+        print("Ошибка: нет места")
+    snapshot = collected.snapshot()['write']
+    assert snapshot['count'] == 2 and snapshot['errors'] == 1 and snapshot['files'] == 2
+
+
+def test_touch_counts_only_own_thread():
+    collected = Stats()
+    inside = threading.Event()
+    release = threading.Event()
+
+    def other_session():
+        with collected.measure('copy'):
+            inside.set()
+            release.wait(5)
+            stats.touch(1)
+
+    thread = threading.Thread(target=other_session)
+    thread.start()
+    inside.wait(5)
+    with collected.measure('ls'):
+        stats.touch(100)
+    release.set()
+    thread.join()
+    snapshot = collected.snapshot()
+    assert snapshot['ls']['files'] == 100 and snapshot['copy']['files'] == 1
+
+
+needs_thread_io = pytest.mark.skipif(stats.io_counters('thread-self') is None,
+                                     reason="нет /proc/thread-self/io")
+
+
+@needs_thread_io
+def test_command_io_excludes_other_threads(tmp_path):
+    collected = Stats()
+    inside = threading.Event()
+    done = threading.Event()
+
+    def other_session():
+        inside.wait(5)
+        with open(tmp_path / 'other.bin', 'wb') as f:
+            f.write(b'y' * 4 * 1024 * 1024)
+        done.set()
+
+    thread = threading.Thread(target=other_session)
+    thread.start()
+    with collected.measure('write'):
+        inside.set()
+        with open(tmp_path / 'own.bin', 'wb') as f:
+            f.write(b'x' * 1024 * 1024)
+        done.wait(5)
+    thread.join()
+    written = collected.snapshot()['write']['bytes_written']
+    assert 1024 * 1024 <= written < 2 * 1024 * 1024
+
+
+@needs_thread_io
+def test_pool_io_is_charged_to_command(tmp_path):
+    collected = Stats()
+    paths = [str(tmp_path / f'{i}.bin') for i in range(4)]
+    for path in paths:
+        with open(path, 'wb') as f:
+            f.write(os.urandom(256 * 1024))
+
+    def read(path):
+        with open(path, 'rb') as f:
+            return len(f.read())
+
+    with collected.measure('hash'):
+        bulk.run_bulk(paths, read, workers=2)
+    snapshot = collected.snapshot()['hash']
+    assert snapshot['bytes_read'] >= 1024 * 1024 and snapshot['files'] == 4
+
+
+def test_process_io_and_dump(tmp_path):
+    collected = Stats()
+    with open(tmp_path / 'data.bin', 'wb') as f:
+        f.write(b'x' * 1024 * 1024)
+    with collected.measure('read'):
+        pass
+    io = collected.process_io()
+    if io is not None:
+        assert io[1] >= 1024 * 1024
+    path = tmp_path / 'stats.jsonl'
+    collected.dump(str(path))
+    lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    commands = [line for line in lines if 'command' in line]
+    assert [line['command'] for line in commands] == ['read']
+    assert commands[0]['buckets_us'] and 'bytes_read' in commands[0]
+    collected.reset()
+    assert collected.snapshot() == {}
+
+
+def test_stats_command(run):
+    run('stats reset')
+    run('ls')
+    run('read missing.txt')
+    output = run('stats')
+    assert 'ls' in output and 'read' in output
+    assert 'Ввод-вывод процесса' in output
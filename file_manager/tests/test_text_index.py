@@ -0,0 +1,39 @@
+import os
+
+from conftest import write
+
+
+def populate(manager, run):
+    run('mkdir other')
+    run('mkdir sub')
+    for i in range(60):
+        run(f'write other/f{i}.txt needle needle needle haystack')
+    run('write sub/target.txt needle once')
+
+
+def test_find_text_in_directory_not_cut_by_limit(manager, run):
+    populate(manager, run)
+    run('cd sub')
+    output = run('find-text needle')
+    assert 'target.txt' in output and 'other' not in output
+
+
+def test_search_directory_filter_before_limit(manager, run):
+    populate(manager, run)
+    index = manager.text_index
+    everywhere = index.search('needle')
+    assert len(everywhere) == 50
+    assert all('target.txt' not in path for path, _, _ in everywhere)
+    in_sub = index.search('needle', directory=os.path.join(manager.workspace, 'sub'))
+    assert [os.path.basename(path) for path, _, _ in in_sub] == ['target.txt']
+    assert len(index.search('needle', limit=100, directory=manager.workspace)) == 61
+    assert index.search('needle', directory=os.path.dirname(manager.workspace)) == []
+
+
+def test_find_text_requires_all_words(manager, run):
+    write(os.path.join(manager.workspace, 'a.txt'), 'alpha beta\ngamma\n')
+    write(os.path.join(manager.workspace, 'b.txt'), 'alpha\n')
+    manager.track_change(os.path.join(manager.workspace, 'a.txt'), os.path.join(manager.workspace, 'b.txt'))
+    output = run('find-text alpha gamma')
+    assert 'a.txt' in output and 'b.txt' not in output
+    assert 'строки: 1, 2' in output
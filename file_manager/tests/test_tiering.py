@@ -0,0 +1,105 @@
+import io
+import os
+import time
+import random
+
+import pytest
+
+from conftest import make_config, write
+from src import tiering
+from src.core import FileManager
+
+
+TEXT = ''.join(f"line {i} of a rarely read log file\n" for i in range(30000)).encode()
+
+
+@pytest.fixture
+def cold_file(tmp_path):
+    path = write(str(tmp_path / 'cold.log'), TEXT)
+    assert tiering.compress_file(path, tiering.CODEC_LZMA, level=1) is not None
+    return path
+
+
+@pytest.fixture
+def chunk_counter(monkeypatch):
+    counter = {'chunks': 0}
+    make_chunks = tiering._decompressed_chunks
+
+    def counting(f, codec):
+        next_chunk = make_chunks(f, codec)
+
+        def counted():
+            counter['chunks'] += 1
+            return next_chunk()
+        return counted
+    monkeypatch.setattr(tiering, '_decompressed_chunks', counting)
+    return counter
+
+
+def test_cold_file_round_trip(cold_file):
+    assert tiering.is_cold(cold_file)
+    assert tiering.logical_size(cold_file) == len(TEXT)
+    assert os.path.getsize(cold_file) < len(TEXT) // 5
+    with tiering.open_read(cold_file) as f:
+        assert f.read() == TEXT
+    assert tiering.thaw(cold_file)
+    with open(cold_file, 'rb') as f:
+        assert f.read() == TEXT
+
+
+def test_seek_end_does_not_decompress(cold_file, chunk_counter):
+    with tiering.open_read(cold_file) as f:
+        assert f.seek(0, io.SEEK_END) == len(TEXT)
+        assert f.tell() == len(TEXT)
+        assert f.seek(0) == 0
+        assert chunk_counter['chunks'] == 0
+        assert f.read(10) == TEXT[:10]
+
+
+def test_tail_decompresses_once(cold_file, chunk_counter):
+    with tiering.open_read(cold_file) as f:
+        size = f.seek(0, io.SEEK_END)
+        f.seek(size - 100)
+        assert f.read() == TEXT[-100:]
+    full_pass = chunk_counter['chunks']
+    # Один проход: распакованные блоки по CHUNK_SIZE плюс подкачка входа
+    assert full_pass <= 2 * (len(TEXT) // tiering.CHUNK_SIZE + 2)
+
+
+def test_random_seeks(cold_file):
+    rng = random.Random(1)
+    with tiering.open_read(cold_file) as f:
+        for _ in range(30):
+            offset = rng.randrange(len(TEXT))
+            whence = rng.choice([io.SEEK_SET, io.SEEK_CUR, io.SEEK_END])
+            base = {io.SEEK_SET: 0, io.SEEK_CUR: f.tell(), io.SEEK_END: len(TEXT)}[whence]
+            position = f.seek(offset - base, whence)
+            assert position == offset
+            assert f.read(50) == TEXT[offset:offset + 50]
+        assert f.seek(len(TEXT) + 10) == len(TEXT) + 10
+        assert f.read(5) == b''
+
+
+def test_commands_on_cold_file(tmp_path):
+    config = make_config(tmp_path / 'root', tiering={'enabled': True, 'min_age_days': 1,
+                                                     'interval': 0, 'codec': 'lzma',
+                                                     'level': 1})
+    manager = FileManager(config, 'carol')
+    try:
+        path = write(os.path.join(manager.workspace, 'app.log'), TEXT)
+        old = time.time() - 5 * 86400
+        os.utime(path, (old, old))
+        assert manager.tiering.sweep()['compressed'] == 1
+        from src.capture import capture_output
+        with capture_output() as out:
+            manager.execute('tail app.log 2')
+            manager.execute('head app.log 1')
+        assert 'line 29999 of' in out.getvalue() and 'line 0 of' in out.getvalue()
+        # Изменение возвращает файл в обычный вид
+        with capture_output():
+            manager.file_ops.write_file(path, 'appended\n', 'a')
+        with open(path, 'rb') as f:
+            assert f.read() == TEXT + b'appended\n'
+        assert not tiering.is_cold(path)
+    finally:
+        manager.close()
@@ -0,0 +1,73 @@
+import os
+import json
+
+import pytest
+
+from src.trash import Trash
+from conftest import write
+
+
+@pytest.fixture
+def trash(tmp_path):
+    return Trash(str(tmp_path / 'trash'), retention=3600)
+
+
+def test_restore_by_id_prefix_and_path(trash, tmp_path):
+    path = write(str(tmp_path / 'a.txt'), 'first')
+    first = trash.put(path, 5)
+    write(path, 'second')
+    second = trash.put(path, 6)
+    assert not os.path.exists(path)
+    # По исходному пути - последний удалённый
+    assert trash.find(path) == second
+    assert trash.find(first[:-3]) == first
+    trash.restore(first, str(tmp_path / 'b.txt'))
+    with open(tmp_path / 'b.txt') as f:
+        assert f.read() == 'first'
+
+
+def test_ambiguous_id_prefix_lists_candidates(trash, tmp_path):
+    ids = [trash.put(write(str(tmp_path / f'{i}.txt'), 'x'), 1) for i in range(2)]
+    prefix = os.path.commonprefix(ids)
+    with pytest.raises(ValueError) as error:
+        trash.find(prefix)
+    for item_id in ids:
+        assert item_id in str(error.value)
+
+
+def test_missing_item(trash):
+    with pytest.raises(ValueError):
+        trash.find('nothing')
+
+
+def test_items_survive_reopen(trash, tmp_path):
+    ids = [trash.put(write(str(tmp_path / f'{i}.txt'), 'x'), 1) for i in range(3)]
+    # Каждый элемент описан своим файлом, общий манифест не переписывается
+    assert sorted(os.listdir(trash.meta_dir)) == sorted(f'{item_id}.json' for item_id in ids)
+    trash.restore(ids[0])
+    reopened = Trash(trash.trash_dir, retention=3600)
+    assert [item_id for item_id, _ in reopened.list()] == ids[1:]
+
+
+def test_legacy_manifest_is_migrated(tmp_path):
+    trash_dir = tmp_path / 'trash'
+    os.makedirs(trash_dir / 'items')
+    write(str(trash_dir / 'items' / '1-old'), 'x')
+    item = {'original': str(tmp_path / 'old.txt'), 'deleted_at': 0,
+            'size': 1, 'reclaimed': 0, 'purge': False}
+    with open(trash_dir / 'trash.json', 'w') as f:
+        json.dump({'1-old': item, '2-gone': item}, f)
+    trash = Trash(str(trash_dir), retention=3600)
+    assert [item_id for item_id, _ in trash.list()] == ['1-old']
+    assert not os.path.exists(trash_dir / 'trash.json')
+    assert os.listdir(trash.meta_dir) == ['1-old.json']
+
+
+def test_rmdir_refuses_files(manager, run):
+    path = write(os.path.join(manager.workspace, 'a.txt'), 'keep')
+    with pytest.raises(ValueError, match='не директория'):
+        run('rmdir a.txt')
+    assert os.path.exists(path) and manager.trash.list() == []
+    run('mkdir sub')
+    assert 'в корзине' in run('rmdir sub')
+    assert not os.path.exists(os.path.join(manager.workspace, 'sub'))
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from src import traversal
+from conftest import write
+
+
+def make_tree(root, width=3, depth=3):
+    """Дерево width^depth директорий, в каждой по файлу"""
+    total = 0
+    paths = [str(root)]
+    for level in range(depth):
+        paths = [os.path.join(path, f'd{i}') for path in paths for i in range(width)]
+        for path in paths:
+            write(os.path.join(path, 'f.bin'), b'x' * (level + 1))
+            total += level + 1
+    return total
+
+
+def test_scan_tree_matches_os_walk(tmp_path):
+    total = make_tree(tmp_path / 'tree')
+    root = str(tmp_path / 'tree')
+    scans = {scan.path: scan for scan in traversal.scan_tree(root, workers=4)}
+    walked = {dirpath: (sorted(dirs), sorted(files)) for dirpath, dirs, files in os.walk(root)}
+    assert set(scans) == set(walked)
+    for path, scan in scans.items():
+        assert (sorted(scan.dirs), sorted(scan.files)) == walked[path]
+    assert traversal.tree_size(root, workers=4) == total
+
+
+def test_scan_tree_does_not_follow_symlinks(tmp_path):
+    make_tree(tmp_path / 'tree', width=1, depth=1)
+    os.symlink(str(tmp_path / 'tree'), str(tmp_path / 'tree' / 'd0' / 'loop'))
+    paths = [scan.path for scan in traversal.scan_tree(str(tmp_path / 'tree'))]
+    assert len(paths) == 2
+
+
+def test_rmtree_removes_everything(tmp_path):
+    make_tree(tmp_path / 'tree', width=4, depth=3)
+    traversal.rmtree(str(tmp_path / 'tree'), workers=4)
+    assert not os.path.exists(tmp_path / 'tree')
+
+
+def test_rmtree_keeps_symlink_targets(tmp_path):
+    target = write(str(tmp_path / 'keep' / 'file.txt'), 'keep')
+    write(str(tmp_path / 'tree' / 'a.txt'), 'a')
+    os.symlink(str(tmp_path / 'keep'), str(tmp_path / 'tree' / 'link'))
+    traversal.rmtree(str(tmp_path / 'tree'))
+    assert os.path.exists(target)
+    link = str(tmp_path / 'tree-link')
+    os.symlink(str(tmp_path / 'keep'), link)
+    with pytest.raises(OSError):
+        traversal.rmtree(link)
+    assert os.path.exists(target)
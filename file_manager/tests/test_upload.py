@@ -0,0 +1,175 @@
+import io
+import os
+import json
+import time
+import asyncio
+
+import pytest
+
+from conftest import write, request, login
+from src import upload
+
+
+DATA = os.urandom(3 * 1024 * 1024 + 123)
+
+
+class Stop(Exception):
+    pass
+
+
+def interrupted_upload(state_dir, dest, data, stop_at, source=None):
+    transfer = upload.Upload(state_dir, dest, len(data), source, commit_bytes=1024 * 1024)
+
+    def progress(files, nbytes):
+        if transfer.offset >= stop_at:
+            raise Stop()
+    try:
+        transfer.write_stream(io.BytesIO(data), 256 * 1024, progress)
+    except Stop:
+        transfer.suspend()
+    return transfer.offset
+
+
+def test_resume_after_interrupt(tmp_path):
+    state_dir = str(tmp_path / 'state')
+    dest = str(tmp_path / 'dest.bin')
+    interrupted_upload(state_dir, dest, DATA, 2 * 1024 * 1024, ['src', 1])
+    assert upload.pending(state_dir) == [(dest, 2 * 1024 * 1024, len(DATA))]
+    # Другой источник - загрузка начинается заново
+    assert upload.committed_offset(state_dir, dest, len(DATA), ['src', 2]) == 0
+    transfer = upload.Upload(state_dir, dest, len(DATA), ['src', 1])
+    assert transfer.offset == 2 * 1024 * 1024
+    transfer.write_stream(io.BytesIO(DATA[transfer.offset:]))
+    transfer.commit()
+    with open(dest, 'rb') as f:
+        assert f.read() == DATA
+    assert upload.pending(state_dir) == []
+    assert os.listdir(state_dir) == []
+
+
+def test_commit_checks_size_and_keeps_mode(tmp_path):
+    state_dir = str(tmp_path / 'state')
+    dest = write(str(tmp_path / 'dest.bin'), b'old')
+    os.chmod(dest, 0o640)
+    transfer = upload.Upload(state_dir, dest, 10)
+    transfer.write(b'12345')
+    with pytest.raises(ValueError):
+        transfer.commit()
+    transfer = upload.Upload(state_dir, dest, 10)
+    with pytest.raises(ValueError):
+        transfer.write(b'x' * 11)
+    transfer.write(b'0123456789')
+    transfer.commit()
+    with open(dest, 'rb') as f:
+        assert f.read() == b'0123456789'
+    assert os.stat(dest).st_mode & 0o777 == 0o640
+
+
+def test_truncate_and_discard(tmp_path):
+    state_dir = str(tmp_path / 'state')
+    dest = str(tmp_path / 'dest.bin')
+    offset = interrupted_upload(state_dir, dest, DATA, 1024 * 1024)
+    transfer = upload.Upload(state_dir, dest, len(DATA))
+    with pytest.raises(ValueError):
+        transfer.truncate(offset + 1)
+    transfer.truncate(100)
+    transfer.suspend()
+    assert upload.committed_offset(state_dir, dest, len(DATA)) == 100
+    assert upload.discard(state_dir, dest)
+    assert not upload.discard(state_dir, dest)
+    assert upload.pending(state_dir) == []
+
+
+def test_expire_stale_uploads(tmp_path):
+    state_dir = str(tmp_path / 'state')
+    stale = str(tmp_path / 'stale.bin')
+    fresh = str(tmp_path / 'fresh.bin')
+    interrupted_upload(state_dir, stale, DATA, 1024 * 1024)
+    interrupted_upload(state_dir, fresh, DATA, 1024 * 1024)
+    old = time.time() - 2 * 86400
+    for path in upload._state_paths(state_dir, stale):
+        os.utime(path, (old, old))
+    assert upload.expire(state_dir, 86400) == 1
+    assert [dest for dest, _, _ in upload.pending(state_dir)] == [fresh]
+
+
+def test_atomic_write_leaves_no_temp_files(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    upload.atomic_write(path, b'one')
+    upload.atomic_write(path, b'two')
+    with open(path, 'rb') as f:
+        assert f.read() == b'two'
+    assert os.listdir(str(tmp_path)) == ['a.txt']
+
+
+def test_atomic_write_keeps_symlink(tmp_path):
+    target = write(str(tmp_path / 'data' / 'real.txt'), 'old')
+    link = str(tmp_path / 'link.txt')
+    os.symlink(target, link)
+    upload.atomic_write(link, b'new')
+    assert os.path.islink(link)
+    with open(target, 'rb') as f:
+        assert f.read() == b'new'
+
+
+@pytest.mark.skipif(not hasattr(os, 'geteuid') or os.geteuid() != 0, reason="нужен root для chown")
+def test_atomic_write_keeps_owner(tmp_path):
+    path = write(str(tmp_path / 'a.txt'), 'old')
+    os.chown(path, 1234, 5678)
+    upload.atomic_write(path, b'new')
+    st = os.stat(path)
+    assert (st.st_uid, st.st_gid) == (1234, 5678)
+
+
+def test_upload_command_resume_and_abort(manager, run, tmp_path):
+    src = write(str(tmp_path / 'src.bin'), DATA)
+    st = os.stat(src)
+    dest = os.path.join(manager.workspace, 'big.bin')
+    interrupted_upload(manager.upload_dir, dest, DATA, 1024 * 1024,
+                       [os.path.abspath(src), st.st_size, st.st_mtime_ns])
+    assert 'big.bin' in run('upload')
+    output = run(f'upload {src} big.bin')
+    assert 'продолжено с 1.0 MB' in output
+    with open(dest, 'rb') as f:
+        assert f.read() == DATA
+    assert 'Незавершённых загрузок нет' in run('upload')
+
+    interrupted_upload(manager.upload_dir, os.path.join(manager.workspace, 'other.bin'), DATA, 1024 * 1024)
+    assert 'Загрузка отменена' in run('upload --abort other.bin')
+    with pytest.raises(ValueError):
+        run('upload --abort other.bin')
+    assert 'Незавершённых загрузок нет' in run('upload')
+
+
+def test_put_resumes_after_dropped_connection(service):
+    async def scenario():
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await login(port)
+        half = len(DATA) // 2
+        writer.write(f"PUT big.bin {len(DATA)}\n".encode() + DATA[:half])
+        await writer.drain()
+        writer.close()
+        await asyncio.sleep(0.2)
+
+        reader, writer = await login(port)
+        for _ in range(100):
+            reply = await request(reader, writer, f"RESUME big.bin {len(DATA)}")
+            if reply['offset']:
+                break
+            await asyncio.sleep(0.05)
+        offset = reply['offset']
+        assert 0 < offset <= half
+        # Продолжить дальше принятого нельзя
+        writer.write(f"PUT big.bin {len(DATA)} @{offset + 1}\n".encode() + DATA[offset + 1:])
+        assert not json.loads(await reader.readline())['ok']
+        writer.write(f"PUT big.bin {len(DATA)} @{offset}\n".encode() + DATA[offset:])
+        assert json.loads(await reader.readline()) == {'ok': True, 'size': len(DATA)}
+        header = await request(reader, writer, 'GET big.bin')
+        assert await reader.readexactly(header['size']) == DATA
+        assert (await request(reader, writer, f"RESUME big.bin {len(DATA)}"))['offset'] == 0
+        writer.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(scenario())
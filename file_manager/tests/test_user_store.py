@@ -0,0 +1,62 @@
+import json
+import threading
+
+import pytest
+
+from src.user_store import JsonUserStore, SqliteUserStore, UserExistsError, open_user_store
+from conftest import make_config
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, tmp_path):
+    return open_user_store(make_config(tmp_path / 'root', users={'backend': request.param}))
+
+
+def test_add_get_and_duplicates(store):
+    store.add('alice', {'plan': 'default'})
+    assert store.get('alice') == {'plan': 'default'}
+    assert store.get('bob') is None
+    with pytest.raises(UserExistsError):
+        store.add('alice', {})
+    assert store.count() == 1
+    assert store.items() == [('alice', {'plan': 'default'})]
+
+
+def test_parallel_registrations_are_not_lost(store):
+    def add(i):
+        store.add(f'user{i}', {'n': i})
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.count() == 20
+    assert store.get('user7') == {'n': 7}
+
+
+def test_json_store_sees_other_writers(tmp_path):
+    path = str(tmp_path / '.users.json')
+    first, second = JsonUserStore(path), JsonUserStore(path)
+    first.add('alice', {})
+    assert second.get('alice') == {}
+    second.add('bob', {})
+    with open(path) as f:
+        assert set(json.load(f)) == {'alice', 'bob'}
+
+
+def test_sqlite_backend_migrates_json_users(tmp_path):
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / '.users.json').write_text(json.dumps({'alice': {'plan': 'pro'}}))
+    store = open_user_store(make_config(root, users={'backend': 'sqlite'}))
+    assert isinstance(store, SqliteUserStore)
+    assert store.get('alice') == {'plan': 'pro'}
+    # Повторный импорт не меняет существующие записи
+    assert store.import_users({'alice': {'plan': 'default'}, 'bob': {}}) == 1
+    assert store.get('alice') == {'plan': 'pro'}
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        open_user_store(make_config(tmp_path / 'root', users={'backend': 'ldap'}))
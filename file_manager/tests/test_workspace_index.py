@@ -0,0 +1,66 @@
+import os
+import shutil
+
+from src.workspace_index import WorkspaceIndex
+from conftest import write
+
+
+def make_tree(root):
+    write(os.path.join(root, 'a.txt'), 'a' * 10)
+    write(os.path.join(root, 'sub', 'b.txt'), 'b' * 20)
+    write(os.path.join(root, 'sub', 'deep', 'c.txt'), 'c' * 30)
+    return str(root)
+
+
+def open_index(tmp_path):
+    return WorkspaceIndex(make_tree(tmp_path / 'ws'), str(tmp_path / 'index' / 'sizes.json'))
+
+
+def test_build_totals(tmp_path):
+    index = open_index(tmp_path)
+    assert index.total() == 60
+    assert index.total(os.path.join(index.root, 'sub')) == 50
+    assert index.total(os.path.join(index.root, 'sub', 'deep')) == 30
+    assert index.total(str(tmp_path)) is None
+
+
+def test_touch_updates_sizes_up_to_root(tmp_path):
+    index = open_index(tmp_path)
+    root = index.root
+    index.touch(write(os.path.join(root, 'sub', 'deep', 'new.txt'), 'n' * 5))
+    assert (index.total(), index.total(os.path.join(root, 'sub'))) == (65, 55)
+    index.touch(write(os.path.join(root, 'a.txt'), 'a' * 100))
+    assert index.total() == 155
+    os.remove(os.path.join(root, 'sub', 'b.txt'))
+    index.touch(os.path.join(root, 'sub', 'b.txt'))
+    assert index.total(os.path.join(root, 'sub')) == 35
+    shutil.rmtree(os.path.join(root, 'sub'))
+    index.touch(os.path.join(root, 'sub'))
+    assert index.total() == 100
+    # Новая директория вместе с содержимым
+    write(os.path.join(root, 'new', 'x', 'y.txt'), 'y' * 7)
+    index.touch(os.path.join(root, 'new'))
+    assert index.total() == 107
+
+
+def test_reconcile_picks_up_external_changes(tmp_path):
+    index = open_index(tmp_path)
+    root = index.root
+    write(os.path.join(root, 'sub', 'deep', 'ext.txt'), 'e' * 40)
+    os.makedirs(os.path.join(root, 'added'))
+    write(os.path.join(root, 'added', 'f.txt'), 'f' * 3)
+    os.remove(os.path.join(root, 'a.txt'))
+    index.reconcile()
+    assert index.total(os.path.join(root, 'sub', 'deep')) == 70
+    assert index.total(os.path.join(root, 'added')) == 3
+    assert index.total() == 20 + 70 + 3
+
+
+def test_saved_index_is_reused(tmp_path):
+    index = open_index(tmp_path)
+    index.touch(write(os.path.join(index.root, 'more.txt'), 'm' * 15))
+    index.save()
+    reopened = WorkspaceIndex(index.root, index.index_path)
+    assert {rel: (record['files'], record['total']) for rel, record in reopened.dirs.items()} == \
+        {rel: (record['files'], record['total']) for rel, record in index.dirs.items()}
+    assert reopened.total() == 75
@@ -0,0 +1,161 @@
+"""Число соединений и сообщений в секунду: asyncio против потоков.
+
+Каждый сервер запускается в отдельном процессе на свободном порту:
+
+    threaded - servers.tcp_threaded_server (поток на подключение)
+    pool     - TestServer.start_tcp_threaded (пул из 10 потоков)
+    async    - servers.async_server, протокол plain
+    framed   - servers.async_server, протокол framed (4 байта длины)
+
+Нагрузка - N клиентов на asyncio, открытых одновременно; каждый
+отправляет M сообщений по очереди и ждёт эхо. Печатается, сколько
+клиентов обслужено за --timeout секунд, сообщений в секунду и время до
+первого ответа (p50/p99): у пула 11-й клиент ждёт, пока освободится
+один из 10 потоков, у потоков на подключение растут затраты на потоки,
+а у listen() по умолчанию очередь 128 - при тысячах одновременных
+подключений часть SYN отбрасывается и клиент повторяет их через секунду.
+
+Запуск из каталога net_app:
+    python -m benchmarks.bench_echo --clients 100,1000,10000 --messages 20 --servers threaded,pool,async
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+from servers.async_server import raise_fd_limit
+
+
+NET_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'threaded': "from servers.tcp_threaded_server import run_server; run_server('127.0.0.1', {port})",
+    'pool': ("from servers.test_server import TestServer; server = TestServer(); "
+             "server.servers['tcp_threaded']['port'] = {port}; server.start_tcp_threaded()"),
+    'async': ("from servers.async_server import run_server; "
+              "run_server('127.0.0.1', [('plain', {port})], backlog={backlog})"),
+    'framed': ("from servers.async_server import run_server; "
+               "run_server('127.0.0.1', [('framed', {port})], backlog={backlog})"),
+}
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(name, backlog):
+    """Запустить сервер в отдельном процессе и дождаться открытия порта"""
+    port = free_port()
+    process = subprocess.Popen([sys.executable, '-c', SERVERS[name].format(port=port, backlog=backlog)],
+                               cwd=NET_APP, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            error = process.stderr.read().decode(errors='replace').strip().splitlines()
+            raise RuntimeError(error[-1] if error else "сервер завершился")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("порт не открылся за 10 с")
+
+
+def stop_server(process):
+    process.kill()
+    process.wait()
+
+
+async def run_client(port, messages, payload, framed, first_replies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        start = time.perf_counter()
+        for i in range(messages):
+            if framed:
+                writer.write(len(payload).to_bytes(4, 'big') + payload)
+                length = int.from_bytes(await reader.readexactly(4), 'big')
+                reply = await reader.readexactly(length)
+            else:
+                writer.write(payload)
+                reply = await reader.readexactly(len(payload))
+            if reply != payload:
+                raise ValueError("Ответ не совпадает с сообщением")
+            if i == 0:
+                first_replies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(port, clients, messages, size, framed, timeout):
+    payload = os.urandom(size // 2).hex().encode()[:size]
+    first_replies = []
+    start = time.perf_counter()
+    tasks = [asyncio.ensure_future(run_client(port, messages, payload, framed, first_replies))
+             for _ in range(clients)]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    seconds = time.perf_counter() - start
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    failed = [task for task in done if task.exception() is not None]
+    served = len(done) - len(failed)
+    first_replies.sort()
+    return {
+        'served': served,
+        'failed': len(failed),
+        'timed_out': len(pending),
+        'error': str(failed[0].exception()) if failed else '',
+        'seconds': seconds,
+        'rate': served * messages / seconds,
+        'first_p50': first_replies[len(first_replies) // 2] if first_replies else None,
+        'first_p99': first_replies[int(len(first_replies) * 0.99)] if first_replies else None,
+    }
+
+
+def ms(value):
+    return f"{value * 1000:9.1f}" if value is not None else f"{'-':>9}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--servers', default='threaded,pool,async,framed',
+                        help=f"через запятую: {', '.join(SERVERS)}")
+    parser.add_argument('--clients', default='10,100,1000', help="числа одновременных клиентов через запятую")
+    parser.add_argument('--messages', type=int, default=20, help="сообщений от каждого клиента")
+    parser.add_argument('--size', type=int, default=64, help="размер сообщения, байт")
+    parser.add_argument('--backlog', type=int, default=4096, help="очередь подключений async-сервера")
+    parser.add_argument('--timeout', type=float, default=30, help="предел на один прогон, с")
+    args = parser.parse_args()
+
+    limit = raise_fd_limit()
+    if limit is not None:
+        print(f"Лимит открытых файлов: {limit}")
+    print(f"{'сервер':>9} {'клиентов':>9} {'обслужено':>10} {'ошибок':>7} {'не успели':>10} "
+          f"{'сообщ./с':>10} {'1-й ответ p50, мс':>18} {'p99, мс':>9}")
+    for name in args.servers.split(','):
+        for clients in (int(n) for n in args.clients.split(',')):
+            try:
+                process, port = start_server(name, args.backlog)
+            except RuntimeError as e:
+                print(f"{name:>9}: не запущен - {e}")
+                break
+            try:
+                result = asyncio.run(run_load(port, clients, args.messages, args.size,
+                                              name == 'framed', args.timeout))
+            finally:
+                stop_server(process)
+            print(f"{name:>9} {clients:9} {result['served']:10} {result['failed']:7} "
+                  f"{result['timed_out']:10} {result['rate']:10.0f} {ms(result['first_p50']):>18} "
+                  f"{ms(result['first_p99'])}")
+            if result['error']:
+                print(f"{'':>9} первая ошибка: {result['error']}")
+
+
+if __name__ == "__main__":
+    main()
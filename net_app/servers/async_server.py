@@ -0,0 +1,215 @@
+"""Эхо-сервер на asyncio: все протоколы на одном цикле событий.
+
+Вместо потока на каждое подключение (tcp_threaded_server, secure_server)
+или пула из 10 потоков (TestServer.start_tcp_threaded) все соединения
+обслуживает один поток, поэтому число клиентов ограничено дескрипторами,
+а не потоками. Протоколы:
+
+    plain  - эхо байтов без разметки (как tcp_threaded и selector)
+    framed - эхо сообщений: 4 байта длины (big-endian) + данные
+    secure - обмен ключами DH и эхо зашифрованных сообщений с той же
+             разметкой длиной (как secure_server / secure_client)
+
+У каждого соединения ограничены буферы: чтение приостанавливается,
+когда клиент прислал больше read_limit необработанных данных, а ответ
+не пишется дальше, пока в буфере записи больше write_high байт
+(клиент не читает). Размер сообщения ограничен max_frame.
+
+Запуск из каталога net_app:
+    python -m servers.async_server --listen plain:12345 --listen plain:12347 --listen secure:12348 --backlog 4096
+"""
+import asyncio
+import argparse
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    from utils import crypto_utils
+except ImportError:  # нет пакета cryptography - защищённый протокол недоступен
+    crypto_utils = None
+
+
+FRAME_HEADER = 4
+MAX_FRAME = 1024 * 1024
+READ_LIMIT = 64 * 1024
+WRITE_HIGH = 256 * 1024
+WRITE_LOW = 64 * 1024
+
+DEFAULT_LISTENERS = [('plain', 12345), ('plain', 12347), ('secure', 12348), ('framed', 12349)]
+
+
+def raise_fd_limit():
+    """Поднять мягкий лимит открытых файлов до жёсткого (по сокету на клиента)"""
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+async def read_frame(reader, max_frame=MAX_FRAME):
+    """Прочитать сообщение с длиной; None - клиент закрыл соединение между сообщениями"""
+    try:
+        header = await reader.readexactly(FRAME_HEADER)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    length = int.from_bytes(header, 'big')
+    if length > max_frame:
+        raise ValueError(f"Сообщение {length} байт больше допустимых {max_frame}")
+    return await reader.readexactly(length)
+
+
+def write_frame(writer, data):
+    writer.write(len(data).to_bytes(FRAME_HEADER, 'big') + data)
+
+
+class AsyncServer:
+    def __init__(self, host='127.0.0.1', backlog=1024, read_limit=READ_LIMIT,
+                 write_high=WRITE_HIGH, write_low=WRITE_LOW, max_frame=MAX_FRAME, verbose=False):
+        self.host = host
+        self.backlog = backlog
+        self.read_limit = read_limit
+        self.write_high = write_high
+        self.write_low = write_low
+        self.max_frame = max_frame
+        self.verbose = verbose
+        self.handlers = {
+            'plain': self.handle_plain,
+            'framed': self.handle_framed,
+            'secure': self.handle_secure
+        }
+        self.servers = []
+        self.connections = 0
+        self.peak_connections = 0
+        self.total_connections = 0
+
+    def log(self, message):
+        # Вывод на каждое сообщение стоит дороже самого эха - только по запросу
+        if self.verbose:
+            print(message)
+
+    async def start(self, listeners=DEFAULT_LISTENERS):
+        """Открыть слушающие сокеты [(протокол, порт)]"""
+        for protocol, port in listeners:
+            if protocol not in self.handlers:
+                raise ValueError(f"Неизвестный протокол: {protocol}. Доступны: {', '.join(self.handlers)}")
+            if protocol == 'secure' and crypto_utils is None:
+                print(f"Протокол secure на порту {port} пропущен: нужен пакет cryptography")
+                continue
+            handler = self.handlers[protocol]
+            server = await asyncio.start_server(
+                lambda reader, writer, handler=handler: self.serve_connection(handler, reader, writer),
+                self.host, port, backlog=self.backlog, limit=self.read_limit, reuse_address=True)
+            self.servers.append(server)
+            print(f"Асинхронный сервер ({protocol}) запущен на {self.host}:{port}")
+
+    async def serve_forever(self, listeners=DEFAULT_LISTENERS):
+        await self.start(listeners)
+        if not self.servers:
+            raise ValueError("Нет ни одного слушающего сокета")
+        await asyncio.gather(*(server.serve_forever() for server in self.servers))
+
+    async def serve_connection(self, handler, reader, writer):
+        addr = writer.get_extra_info('peername')
+        writer.transport.set_write_buffer_limits(high=self.write_high, low=self.write_low)
+        self.connections += 1
+        self.total_connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        self.log(f"Подключен клиент {addr}")
+        try:
+            await handler(reader, writer, addr)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"Ошибка с клиентом {addr}: {e}")
+        finally:
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.log(f"Клиент {addr} отключен")
+
+    async def handle_plain(self, reader, writer, addr):
+        while True:
+            data = await reader.read(self.read_limit)
+            if not data:
+                break
+            writer.write(data)
+            # Ждём, только если клиент не забирает ответы и буфер записи полон
+            await writer.drain()
+
+    async def handle_framed(self, reader, writer, addr):
+        while True:
+            data = await read_frame(reader, self.max_frame)
+            if data is None:
+                break
+            write_frame(writer, data)
+            await writer.drain()
+
+    async def handle_secure(self, reader, writer, addr):
+        loop = asyncio.get_running_loop()
+        # Арифметика DH занимает миллисекунды - не в цикле событий
+        private_key, public_key = await loop.run_in_executor(None, crypto_utils.generate_dh_key_pair)
+        write_frame(writer, crypto_utils.serialize_public_key(public_key))
+        await writer.drain()
+
+        peer_key = await read_frame(reader, self.max_frame)
+        if peer_key is None:
+            return
+        peer_public_key = crypto_utils.deserialize_public_key(peer_key)
+        shared_key = await loop.run_in_executor(None, crypto_utils.derive_shared_key,
+                                                private_key, peer_public_key)
+        self.log(f"Установлено безопасное соединение с {addr}")
+
+        while True:
+            encrypted_data = await read_frame(reader, self.max_frame)
+            if encrypted_data is None:
+                break
+            message = crypto_utils.decrypt_message(shared_key, encrypted_data)
+            self.log(f"[{addr}] Получено: {message}")
+            write_frame(writer, crypto_utils.encrypt_message(shared_key, f"ECHO: {message}"))
+            await writer.drain()
+
+
+def parse_listener(text):
+    protocol, _, port = text.partition(':')
+    return protocol, int(port)
+
+
+def run_server(host='127.0.0.1', listeners=DEFAULT_LISTENERS, **options):
+    raise_fd_limit()
+    server = AsyncServer(host, **options)
+    try:
+        asyncio.run(server.serve_forever(listeners))
+    except KeyboardInterrupt:
+        print(f"\nСервер остановлен. Подключений: {server.total_connections}, "
+              f"одновременно до {server.peak_connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--listen', action='append', type=parse_listener,
+                        help="протокол:порт, можно несколько раз (plain, framed, secure)")
+    parser.add_argument('--backlog', type=int, default=1024, help="очередь ещё не принятых подключений")
+    parser.add_argument('--read-limit', type=int, default=READ_LIMIT, help="буфер чтения соединения, байт")
+    parser.add_argument('--write-high', type=int, default=WRITE_HIGH, help="буфер записи соединения, байт")
+    parser.add_argument('--max-frame', type=int, default=MAX_FRAME, help="наибольшее сообщение, байт")
+    parser.add_argument('--verbose', action='store_true', help="выводить подключения и сообщения")
+    args = parser.parse_args()
+    run_server(args.host, args.listen or DEFAULT_LISTENERS, backlog=args.backlog,
+               read_limit=args.read_limit, write_high=args.write_high,
+               write_low=min(WRITE_LOW, args.write_high), max_frame=args.max_frame,
+               verbose=args.verbose)
+
+
+if __name__ == "__main__":
+    main()